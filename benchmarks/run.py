@@ -0,0 +1,266 @@
+"""
+Scanner benchmarks on a deterministic synthetic tree.
+
+    python -m benchmarks.run [--depth 4 --fanout 6 --files 40] [--engines parallel,junk]
+                             [--repeat 3] [--out result.json] [--compare baseline.json]
+
+Every engine runs in a fresh process per repetition, so its peak RSS is its
+own and no cache of a previous engine carries over. One untimed warm-up scan
+fills the OS file cache first; the numbers are warm-cache throughput, which
+is what the code (not the disk) decides.
+
+The result JSON holds the tree spec, the machine and the commit, and per
+engine the median entries/s, time to first result and the highest peak RSS.
+With --compare, engines whose throughput dropped by more than --tolerance
+against an earlier result are reported and the exit code is 1.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_tree import DEFAULT_SPEC, generate_tree
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), "vision_bench_tree")
+DEFAULT_RESULTS_DIR = os.path.join(REPO, "benchmarks", "results")
+
+
+class Measurement:
+    """Start and first-result times of one run, filled in by the engine"""
+
+    def __init__(self):
+        self.started = None
+        self.first = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def first_result(self):
+        if self.first is None:
+            self.first = time.perf_counter() - self.started
+
+
+def _walker(root, workers, measurement, lister=None, **options):
+    from core.disk_scanner import ParallelWalker, list_directory
+
+    # partial_interval=0 reports the first listing, then partial results stop
+    def on_partial(tree):
+        measurement.first_result()
+        walker.partial_interval = 3600
+
+    walker = ParallelWalker(root, workers=workers, lister=lister or list_directory,
+                            on_partial=on_partial, partial_interval=0, **options)
+    measurement.start()
+    tree = walker.run()
+    return len(tree) + sum(count for count, size in tree.omitted.values())
+
+
+def bench_parallel(root, workdir, measurement):
+    from core.disk_scanner import DEFAULT_WORKERS
+    return _walker(root, DEFAULT_WORKERS, measurement)
+
+
+def bench_serial(root, workdir, measurement):
+    return _walker(root, 1, measurement)
+
+
+def bench_large_volume(root, workdir, measurement):
+    """External-memory mode: 10 files per folder in the table, the rest spilled"""
+    from core.disk_scanner import DEFAULT_WORKERS
+    return _walker(root, DEFAULT_WORKERS, measurement, keep_files=10, spill_dir=workdir)
+
+
+def bench_incremental(root, workdir, measurement):
+    """Rescan with an up-to-date scan index: every listing comes from SQLite"""
+    from core.disk_scanner import DEFAULT_WORKERS
+    from core.scan_index import ScanIndex
+    index = ScanIndex(os.path.join(workdir, "index.db"))
+    _walker(root, DEFAULT_WORKERS, Measurement(), index.list_directory)
+    index.flush()
+    count = _walker(root, DEFAULT_WORKERS, measurement, index.list_directory)
+    index.close()
+    return count
+
+
+def bench_multi_drive(root, workdir, measurement):
+    """The top-level folders scanned as separate drives"""
+    from core.disk_scanner import MultiDriveWalker
+    drives = sorted(entry.path for entry in os.scandir(root) if entry.is_dir())
+    walker = MultiDriveWalker(drives, "bench", on_progress=lambda drives: measurement.first_result(),
+                              progress_every=1)
+    measurement.start()
+    return len(walker.run())
+
+
+def bench_junk(root, workdir, measurement):
+    """JunkCleaner.scan_junk with the synthetic tree as the only temp folder"""
+    from core.cleaner import JunkCleaner
+    os.environ['TEMP'] = root
+    os.environ['SystemRoot'] = os.environ['LOCALAPPDATA'] = os.path.join(workdir, "missing")
+    measurement.start()
+    return len(JunkCleaner.scan_junk())  # No partial results, first_result stays None
+
+
+ENGINES = {
+    'parallel': bench_parallel,
+    'serial': bench_serial,
+    'large_volume': bench_large_volume,
+    'incremental': bench_incremental,
+    'multi_drive': bench_multi_drive,
+    'junk': bench_junk,
+}
+
+
+def peak_rss():
+    """Highest resident memory of this process so far, in bytes"""
+    if os.name == 'nt':
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_engine(name, root, queue):
+    """Child process: one timed run of one engine"""
+    import psutil
+    with tempfile.TemporaryDirectory() as workdir:
+        base_rss = psutil.Process().memory_info().rss
+        measurement = Measurement()
+        entries = ENGINES[name](root, workdir, measurement)
+        seconds = time.perf_counter() - measurement.started
+        queue.put({'entries': entries, 'seconds': seconds, 'first_result': measurement.first,
+                   'base_rss': base_rss, 'peak_rss': peak_rss()})
+
+
+def run_engine(name, root):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_engine, args=(name, root, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def summarize(name, runs):
+    seconds = statistics.median(run['seconds'] for run in runs)
+    firsts = [run['first_result'] for run in runs if run['first_result'] is not None]
+    return {
+        'engine': name,
+        'entries': runs[0]['entries'],
+        'seconds': round(seconds, 4),
+        'entries_per_s': round(runs[0]['entries'] / seconds) if seconds else None,
+        'first_result_s': round(statistics.median(firsts), 4) if firsts else None,
+        'peak_rss': max(run['peak_rss'] for run in runs),
+        'base_rss': max(run['base_rss'] for run in runs),
+        'runs': runs,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Prints the throughput change per engine; returns the engines that regressed"""
+    old = {entry['engine']: entry for entry in baseline['results']}
+    regressed = []
+    for entry in results['results']:
+        before = old.get(entry['engine'])
+        if not before or not before['entries_per_s'] or not entry['entries_per_s']:
+            continue
+        change = entry['entries_per_s'] / before['entries_per_s'] - 1
+        mark = ""
+        if change < -tolerance:
+            mark = "  REGRESSION"
+            regressed.append(entry['engine'])
+        print(f"{entry['engine']:<12} {before['entries_per_s']:>10,} -> {entry['entries_per_s']:>10,} entries/s"
+              f" ({change:+.1%}){mark}")
+    if baseline.get('tree') != results['tree']:
+        print("Note: the baseline was measured on a different tree spec", file=sys.stderr)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Scanner benchmarks")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Where the synthetic tree is generated (reused)")
+    parser.add_argument("--fanout", type=int, default=DEFAULT_SPEC['fanout'])
+    parser.add_argument("--depth", type=int, default=DEFAULT_SPEC['depth'])
+    parser.add_argument("--files", type=int, default=DEFAULT_SPEC['files'], help="Files per folder")
+    parser.add_argument("--sizes", choices=("lognormal", "pareto", "fixed"), default=DEFAULT_SPEC['sizes'])
+    parser.add_argument("--mean-size", type=int, default=DEFAULT_SPEC['mean_size'])
+    parser.add_argument("--seed", type=int, default=DEFAULT_SPEC['seed'])
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma separated, from: " + ", ".join(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed throughput drop for --compare")
+    args = parser.parse_args(argv)
+
+    engines = [name.strip() for name in args.engines.split(",") if name.strip()]
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"Unknown engine: {', '.join(unknown)}")
+
+    print(f"Generating tree in {args.root}...", file=sys.stderr)
+    started = time.perf_counter()
+    try:
+        tree = generate_tree(args.root, fanout=args.fanout, depth=args.depth, files=args.files, sizes=args.sizes,
+                             mean_size=args.mean_size, seed=args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f"{tree['folder_count']:,} folders, {tree['file_count']:,} files ({time.perf_counter() - started:.1f} s)",
+          file=sys.stderr)
+
+    run_engine('parallel', args.root)  # Warm-up: fills the file cache
+    results = {
+        'commit': _commit(),
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'tree': {key: tree[key] for key in DEFAULT_SPEC},
+        'results': []
+    }
+    for name in engines:
+        runs = []
+        for i in range(args.repeat):
+            runs.append(run_engine(name, args.root))
+            print(f"{name} {i + 1}/{args.repeat}: {runs[-1]['seconds']:.3f} s", file=sys.stderr)
+        entry = summarize(name, runs)
+        results['results'].append(entry)
+        first = f"{entry['first_result_s'] * 1000:.1f} ms" if entry['first_result_s'] is not None else "-"
+        print(f"{name:<12} {entry['entries_per_s']:>10,} entries/s  first result {first:>9}  "
+              f"peak RSS {entry['peak_rss'] / 1024 ** 2:.0f} MB")
+
+    out = args.out
+    if not out:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        out = os.path.join(DEFAULT_RESULTS_DIR, f"{results['commit'] or 'local'}-{stamp}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Deterministic synthetic directory trees for the scanner benchmarks.
+
+The same spec and seed always produce the same names, sizes and times, so
+runs on different machines and versions scan identical trees. Files are
+created sparse (truncated to their size, nothing written), which keeps a
+tree of a few hundred thousand files quick to create and small on disk
+while stat() still reports the full size.
+"""
+import json
+import math
+import os
+import random
+import shutil
+
+SPEC_FILE = ".synthetic.json"
+DAY = 86400
+EPOCH = 1700000000  # Fixed "now" for file times, so ages do not drift between runs
+
+DEFAULT_SPEC = {
+    'fanout': 6,  # Subfolders per folder
+    'depth': 4,  # Folder levels below the root
+    'files': 40,  # Files per folder
+    'sizes': 'lognormal',  # lognormal, pareto or fixed
+    'mean_size': 64 * 1024,
+    'seed': 0,
+}
+
+EXTENSIONS = ['.txt', '.jpg', '.mp4', '.log', '.tmp', '.py', '.dll', '.zip', '.pdf', '.dat', '']
+
+
+def _file_size(rng, distribution, mean):
+    if distribution == 'fixed':
+        return mean
+    if distribution == 'pareto':
+        # Heavy tail: a few files hold most of the bytes, like real disks
+        alpha = 1.5
+        return int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+    sigma = 1.5
+    return int(rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma))
+
+
+def generate_tree(root, **spec):
+    """
+    Creates the tree described by spec (see DEFAULT_SPEC) under root and
+    returns the spec with its 'folder_count', 'file_count' and 'bytes' totals.
+    A tree already generated from the same spec is reused as it is, one
+    generated from another spec is replaced. Only folders marked as generated
+    (SPEC_FILE) are ever deleted: a non-empty root without the marker raises
+    ValueError rather than losing real files to a mistyped path.
+    """
+    spec = dict(DEFAULT_SPEC, **spec)
+    spec_path = os.path.join(root, SPEC_FILE)
+    try:
+        with open(spec_path, encoding='utf-8') as f:
+            existing = json.load(f)
+        if {key: existing.get(key) for key in spec} == spec:
+            return existing
+    except (OSError, ValueError):
+        pass
+
+    if os.path.exists(spec_path):
+        shutil.rmtree(root)
+    elif os.path.isdir(root) and os.listdir(root):
+        raise ValueError(f"{root} is not empty and was not generated by the benchmarks; refusing to delete it")
+    os.makedirs(root, exist_ok=True)
+    # Marked before anything is written, so an interrupted run can be replaced
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump({'incomplete': True}, f)
+
+    rng = random.Random(spec['seed'])
+    folders = files = total = 0
+    stack = [(root, 0)]
+    while stack:
+        path, level = stack.pop()
+        folders += 1
+        for i in range(spec['files']):
+            size = _file_size(rng, spec['sizes'], spec['mean_size'])
+            name = f"file_{i:04d}_{rng.getrandbits(32):08x}{rng.choice(EXTENSIONS)}"
+            file_path = os.path.join(path, name)
+            with open(file_path, 'wb') as f:
+                f.truncate(size)
+            used = EPOCH - int(rng.expovariate(1 / (200 * DAY)))
+            os.utime(file_path, (used, used))
+            files += 1
+            total += size
+        if level < spec['depth']:
+            for i in range(spec['fanout']):
+                child = os.path.join(path, f"dir_{level}_{i:03d}")
+                os.mkdir(child)
+                stack.append((child, level + 1))
+
+    result = dict(spec, folder_count=folders, file_count=files, bytes=total)
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    return result
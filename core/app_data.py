@@ -0,0 +1,17 @@
+import os
+
+APP_NAME = "VisionOptimizer"
+
+
+def user_data_dir():
+    """
+    Per-user folder for data that must outlive the program (scan index,
+    checkpoints, snapshots): %LOCALAPPDATA%\\VisionOptimizer on Windows,
+    ~/.local/share/VisionOptimizer elsewhere. Never next to the code, which
+    the packaged .exe unpacks to a temporary folder deleted on exit.
+    Callers create it on first use.
+    """
+    base = os.environ.get('LOCALAPPDATA') if os.name == 'nt' else None
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, APP_NAME)
@@ -0,0 +1,250 @@
+import os
+import stat
+import threading
+import time
+
+from core.disk_scanner import DEFAULT_WORKERS
+
+MAX_ERRORS = 100  # Failures reported by path; the rest are only counted
+
+
+def _is_junction(st):
+    """A Windows junction (mount point): removed as a link, never emptied"""
+    return (bool(getattr(st, 'st_file_attributes', 0) & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+            and st.st_reparse_tag == stat.IO_REPARSE_TAG_MOUNT_POINT)
+
+
+def _is_folder(entry):
+    """A real folder to empty and remove; symlinks and junctions are removed as they are"""
+    if not entry.is_dir(follow_symlinks=False):
+        return False
+    return os.name != 'nt' or not _is_junction(entry.stat(follow_symlinks=False))
+
+
+def _retry_writable(remove, path):
+    """Runs remove(path); on Windows clears the read-only attribute and retries if that is what blocks it"""
+    try:
+        remove(path)
+    except PermissionError:
+        if os.name != 'nt':
+            raise  # Permission comes from the folder there, chmod would only damage the file
+        os.chmod(path, stat.S_IWRITE)
+        remove(path)
+
+
+class _Folder:
+    __slots__ = ('path', 'parent', 'pending', 'complete', 'removed')
+
+    def __init__(self, path, parent):
+        self.path = path
+        self.parent = parent  # _Folder, None for a target
+        self.pending = 1  # Its own listing plus subfolders and file batches still in progress
+        self.complete = True  # False once anything inside could not be removed
+        self.removed = []  # Paths removed inside it, reported only if it stays
+
+
+class BulkDeleter:
+    """
+    Deletes files and whole folder trees on a pool of threads.
+
+    Every folder is one work item: a worker lists it, removes its files and
+    queues its subfolders, so a big tree splits into subtrees that the other
+    workers pick up in parallel; a folder with more than FILE_BATCH files also
+    hands its files out in batches. Each folder counts the items below it
+    that are still in progress, and whichever worker finishes the last one
+    removes it, so folders go bottom-up without any thread waiting for
+    another.
+
+    Symlinks and junctions are removed, never followed. Read-only files are
+    made writable and retried, as rmtree on Windows would fail on them.
+
+    on_progress(files, freed_bytes) is called at most once per
+    progress_interval seconds, from a worker thread. should_stop() is checked
+    before every item; a stopped run leaves the rest in place.
+    """
+
+    FILE_BATCH = 2000
+
+    def __init__(self, workers=DEFAULT_WORKERS, should_stop=None, on_progress=None, progress_interval=0.2):
+        self.workers = max(1, int(workers))
+        self.should_stop = should_stop or (lambda: False)
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+
+    def delete(self, paths):
+        """
+        Deletes the given files and folders, with everything in them.
+        Returns a dict {'files', 'folders', 'freed', 'failed', 'errors',
+        'removed', 'stopped'}: removed lists the topmost paths that are gone
+        (the targets, or what went from inside a folder that stays), errors
+        up to MAX_ERRORS (path, message) pairs. Paths that no longer exist
+        are skipped.
+        """
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._items = []  # Folders to list and (folder, [(path, size)]) file batches
+        self._active = 0
+        self._open = set()  # Folders not finished yet
+        self._stopped = False
+        self._next_progress = time.monotonic() + self.progress_interval
+        self._result = {'files': 0, 'folders': 0, 'freed': 0, 'failed': 0, 'errors': [],
+                        'removed': [], 'stopped': False}
+
+        files = []
+        for path in paths:
+            try:
+                st = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self._fail(path, e)
+                continue
+            if stat.S_ISDIR(st.st_mode) and not _is_junction(st):
+                folder = _Folder(path, None)
+                self._open.add(folder)
+                self._items.append(folder)
+            else:
+                files.append((path, st.st_size))
+        for start in range(0, len(files), self.FILE_BATCH):
+            self._items.append((None, files[start:start + self.FILE_BATCH]))
+
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # A stopped run leaves folders half emptied: what went from them still counts
+        for folder in self._open:
+            self._result['removed'].extend(folder.removed)
+        self._result['stopped'] = self._stopped
+        if self.on_progress:
+            self.on_progress(self._result['files'], self._result['freed'])
+        return self._result
+
+    def _work(self):
+        while True:
+            with self._wakeup:
+                while not self._items and self._active and not self._stopped:
+                    self._wakeup.wait(0.05)
+                if self.should_stop():
+                    self._stopped = True
+                if self._stopped or not self._items:
+                    self._wakeup.notify_all()
+                    return
+                item = self._items.pop()  # Depth-first: finishes subtrees before opening new ones
+                self._active += 1
+
+            if isinstance(item, _Folder):
+                self._empty(item)
+            else:
+                self._remove_files(*item)
+
+            with self._wakeup:
+                self._active -= 1
+                if not self._items and not self._active:
+                    self._wakeup.notify_all()
+            self._report()
+
+    def _fail(self, path, error):
+        with self._lock:
+            self._result['failed'] += 1
+            if len(self._result['errors']) < MAX_ERRORS:
+                self._result['errors'].append((path, str(error)))
+
+    def _report(self):
+        if not self.on_progress:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_progress:
+                return
+            self._next_progress = now + self.progress_interval
+            files, freed = self._result['files'], self._result['freed']
+        self.on_progress(files, freed)
+
+    def _empty(self, folder):
+        """Lists a folder, removes or queues its contents, then counts its listing as done"""
+        files = []
+        subfolders = []
+        try:
+            with os.scandir(folder.path) as entries:
+                for entry in entries:
+                    try:
+                        if _is_folder(entry):
+                            subfolders.append(_Folder(entry.path, folder))
+                        else:
+                            files.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+                    except OSError as e:
+                        folder.complete = False
+                        self._fail(entry.path, e)
+        except OSError as e:
+            folder.complete = False
+            self._fail(folder.path, e)
+
+        batches = [files[start:start + self.FILE_BATCH]
+                   for start in range(self.FILE_BATCH, len(files), self.FILE_BATCH)]
+        with self._wakeup:
+            folder.pending += len(subfolders) + len(batches)
+            self._open.update(subfolders)
+            self._items.extend((folder, batch) for batch in batches)
+            self._items.extend(subfolders)
+            if subfolders or batches:
+                self._wakeup.notify(len(subfolders) + len(batches))
+        # The first batch stays with this worker
+        self._remove_files(folder, files[:self.FILE_BATCH])
+
+    def _remove_files(self, folder, files):
+        removed = []
+        freed = 0
+        for path, size in files:
+            try:
+                _retry_writable(os.remove, path)
+            except FileNotFoundError:
+                size = 0  # Gone already
+            except OSError as e:
+                if folder is not None:
+                    folder.complete = False
+                self._fail(path, e)
+                continue
+            removed.append(path)
+            freed += size
+        with self._lock:
+            self._result['files'] += len(removed)
+            self._result['freed'] += freed
+            if folder is None:
+                self._result['removed'].extend(removed)
+            else:
+                folder.removed.extend(removed)
+        if folder is not None:
+            self._finish(folder)
+
+    def _finish(self, folder):
+        """One item of a folder is done; removes the folder, and then its parents, once nothing is left"""
+        while folder is not None:
+            with self._lock:
+                folder.pending -= 1
+                if folder.pending:
+                    return
+                self._open.discard(folder)
+            parent = folder.parent
+            removed = False
+            if folder.complete:
+                try:
+                    _retry_writable(os.rmdir, folder.path)
+                    removed = True
+                except FileNotFoundError:
+                    removed = True
+                except OSError as e:
+                    self._fail(folder.path, e)
+            with self._lock:
+                if removed:
+                    self._result['folders'] += 1
+                    (parent.removed if parent is not None else self._result['removed']).append(folder.path)
+                else:
+                    # The folder stays, so what went from inside it is reported one by one
+                    self._result['removed'].extend(folder.removed)
+                    if parent is not None:
+                        parent.complete = False
+            folder.removed = None
+            folder = parent
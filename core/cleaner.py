@@ -1,83 +1,117 @@
 import os
-import shutil
-import glob
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from core.bulk_delete import BulkDeleter
+
+
+def _scan_location(path, label, throttle=None):
+    """
+    Every file under one junk location as {'path', 'size', 'type'}, with the
+    sizes taken from the scandir entries (no extra stat call on Windows).
+    Links are not followed; unreadable folders and files are skipped.
+    """
+    if throttle:
+        throttle.enter_thread()
+    files = []
+    stack = [path]
+    while stack:
+        folder = stack.pop()
+        if throttle:
+            throttle.wait()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append({
+                                'path': entry.path,
+                                'size': entry.stat(follow_symlinks=False).st_size,
+                                'type': label
+                            })
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
 
 class JunkCleaner:
     @staticmethod
-    def scan_junk():
-        """
-        Scans for junk files in common locations.
-        Returns a list of dicts: {'path': str, 'size': int, 'type': str}
-        """
-        junk_files = []
-        
+    def junk_locations():
+        """(path, label) of the folders scanned for junk, existing and without duplicates"""
         # Resolve properly
         user_temp = os.environ.get('TEMP') or tempfile.gettempdir()
         win_temp = os.path.join(os.environ.get('SystemRoot', 'C:\\Windows'), 'Temp')
+        local_appdata = os.environ.get('LOCALAPPDATA')
         
         locations = [
             (user_temp, 'User Temp'),
             (win_temp, 'Windows Temp'),
-            (os.path.join(os.environ.get('LOCALAPPDATA'), 'Microsoft', 'Windows', 'Explorer'), 'Thumbnail Cache'),
         ]
+        if local_appdata:  # Not set outside Windows
+            locations.append((os.path.join(local_appdata, 'Microsoft', 'Windows', 'Explorer'), 'Thumbnail Cache'))
         
         # Use set to avoid duplicates if paths overlap
+        result = []
         scanned_paths = set()
-        
         for path, label in locations:
             if not path or not os.path.exists(path):
                 continue
-                
             # Normalize path
             path = os.path.abspath(path)
             if path in scanned_paths:
                 continue
             scanned_paths.add(path)
-                
-            try:
-                for root, dirs, files in os.walk(path):
-                    for file in files:
-                        try:
-                            filepath = os.path.join(root, file)
-                            # Skip if file is in use (basic check: try open)
-                            # Actually scanning doesn't need open check, cleaning does.
-                            # Just scan everything suitable.
-                            
-                            size = os.path.getsize(filepath)
-                            junk_files.append({
-                                'path': filepath,
-                                'size': size,
-                                'type': label
-                            })
-                        except:
-                            pass
-            except:
-                pass
-                
-        return junk_files
+            result.append((path, label))
+        return result
 
     @staticmethod
-    def clean_files(file_list):
+    def scan_locations(throttle=None):
         """
-        Deletes the specified files.
-        Returns (success_count, fail_count, total_size_cleaned)
+        Scans all junk locations at once, one thread each.
+        Returns a list of dicts per location: {'path', 'type', 'count', 'size', 'files'},
+        files being the location's entries as returned by scan_junk().
+        With a BackgroundThrottle, every scan thread drops to background
+        priority and every folder waits for the throttle's rate limit.
         """
-        success = 0
-        fail = 0
-        cleaned_size = 0
-        
-        for item in file_list:
-            try:
-                if os.path.isfile(item['path']):
-                    os.remove(item['path'])
-                    success += 1
-                    cleaned_size += item['size']
-                elif os.path.isdir(item['path']):
-                    shutil.rmtree(item['path'])
-                    success += 1
-                    cleaned_size += item['size']
-            except:
-                fail += 1
-                
-        return success, fail, cleaned_size
+        locations = JunkCleaner.junk_locations()
+        if not locations:
+            return []
+        with ThreadPoolExecutor(max_workers=len(locations)) as pool:
+            listings = pool.map(lambda location: _scan_location(location[0], location[1], throttle), locations)
+            return [{
+                'path': path,
+                'type': label,
+                'count': len(files),
+                'size': sum(item['size'] for item in files),
+                'files': files
+            } for (path, label), files in zip(locations, listings)]
+
+    @staticmethod
+    def scan_junk(throttle=None):
+        """
+        Scans for junk files in common locations.
+        Returns a list of dicts: {'path': str, 'size': int, 'type': str}
+        With a BackgroundThrottle, the scan threads drop to background
+        priority and every folder waits for the throttle's rate limit.
+        """
+        return [item for location in JunkCleaner.scan_locations(throttle) for item in location['files']]
+
+    @staticmethod
+    def clean_files(file_list, should_stop=None, on_progress=None):
+        """
+        Deletes the specified files (folders with everything in them) on the
+        BulkDeleter's thread pool.
+        on_progress(files, freed_bytes) reports while it runs.
+        Returns (success_count, fail_count, total_size_cleaned), counted per
+        target: one still there failed, one already gone counts as neither.
+        """
+        result = BulkDeleter(should_stop=should_stop, on_progress=on_progress).delete(
+            [item['path'] for item in file_list])
+        removed = set(result['removed'])
+        success = sum(1 for item in file_list if item['path'] in removed)
+        fail = sum(1 for item in file_list if item['path'] not in removed and os.path.lexists(item['path']))
+        return success, fail, result['freed']
@@ -0,0 +1,308 @@
+"""
+Headless command-line mode.
+
+    python main.py scan <path> [--format json|ndjson] [--max-depth N] [--min-size BYTES] [--ages]
+    python main.py scan <path> --export result.vscan [--no-compress] [--ncdu result.json]
+    python main.py scan result.vscan [--max-depth N] [--ages]
+    python main.py clean [--dry-run] [--format json|ndjson]
+    python main.py monitor [--interval SECONDS] [--count N] [--disk PATH]
+    python main.py diff <old.snap.gz> <new.snap.gz> [--max-depth N] [--min-delta BYTES]
+
+Only the Qt-free core engines are imported here, so the CLI starts quickly and
+runs on machines without a display. Results are written to stdout; ndjson emits
+one JSON object per line as soon as it is available.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# The system drive on Windows, the file system root elsewhere
+DEFAULT_DISK = os.environ.get('SystemDrive', 'C:') + '\\' if os.name == 'nt' else '/'
+
+
+def _emit(obj, out=sys.stdout):
+    out.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+
+def _iter_entries(tree, max_depth, min_size):
+    """Pre-order walk of a finished ScanTree, largest children first"""
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node:
+            yield node, depth
+        if max_depth is not None and depth >= max_depth:
+            continue
+        children = [child for child in tree.children(node) if tree.size[child] >= min_size]
+        stack.extend((child, depth + 1) for child in reversed(children))
+
+
+def _throttle(args):
+    if not args.background:
+        return None
+    from core.throttle import BackgroundThrottle
+    return BackgroundThrottle(rate=args.rate)
+
+
+def cmd_scan(args):
+    from core.disk_scanner import ParallelWalker, list_directory
+
+    root = os.path.abspath(args.path)
+    if os.path.isfile(root):
+        return _analyze_export(args, root)
+    if not os.path.isdir(root):
+        print(f"Not a directory: {root}", file=sys.stderr)
+        return 1
+
+    index = None
+    if args.index:
+        from core.scan_index import ScanIndex
+        index = ScanIndex(args.index)
+
+    def progress(count):
+        print(f"Scanned {count} folders...", file=sys.stderr)
+
+    checkpoint = resume = None
+    if args.checkpoint:
+        from core.scan_checkpoint import ScanCheckpoint
+        checkpoint = ScanCheckpoint(args.checkpoint, root, keep_files=args.keep_files)
+        resume = checkpoint.load(spill_dir=args.spill_dir)
+
+    started = time.time()
+    walker = ParallelWalker(root, workers=args.workers,
+                            on_progress=progress if args.progress else None,
+                            lister=index.list_directory if index else list_directory,
+                            checkpoint=checkpoint, resume=resume, throttle=_throttle(args),
+                            keep_files=args.keep_files, spill_dir=args.spill_dir)
+    tree = walker.run()
+    if index:
+        index.flush()
+        index.close()
+    if args.snapshot:
+        from core.snapshot import save_snapshot
+        save_snapshot(tree, args.snapshot)
+    return _report(args, tree, started)
+
+
+def _analyze_export(args, path):
+    """scan on a file written by --export: the same report, without touching the disk"""
+    from core.scan_export import import_scan
+    started = time.time()
+    try:
+        tree = import_scan(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Cannot read exported scan: {e}", file=sys.stderr)
+        return 1
+    return _report(args, tree, started)
+
+
+def _report(args, tree, started):
+    if args.export:
+        from core.scan_export import export_scan
+        export_scan(tree, args.export, compress=not args.no_compress)
+    if args.ncdu:
+        from core.scan_export import export_ncdu
+        export_ncdu(tree, args.ncdu)
+
+    summary = {
+        'root': tree.root_path,
+        'size': tree.size[0],
+        'dirs': tree.dir_count,
+        'entries': len(tree),
+        'seconds': round(time.time() - started, 3),
+        'types': [{'category': cat['key'], 'count': cat['count'], 'size': cat['size'],
+                   'largest': cat['largest'],
+                   'largest_path': tree.path(cat['largest_node']) if cat['largest_node'] >= 0 else None}
+                  for cat in tree.types.by_category()]
+    }
+    if args.keep_files is not None or tree.omitted:
+        summary['omitted_files'] = sum(count for count, size in tree.omitted.values())
+    if args.ages:
+        from core.file_ages import AgeHistogram
+        from core.scan_export import read_export_header
+        # An exported scan is aged as of its export, not of today
+        ages = AgeHistogram(tree, now=read_export_header(tree.source)['created'] if tree.source else None)
+        summary['ages'] = ages.histogram(0)
+        summary['cold'] = [{'path': tree.path(entry['node']), 'cold': entry['cold'], 'size': entry['size'],
+                            'files': entry['count']} for entry in ages.cold_report()]
+    entries = _iter_entries(tree, args.max_depth, args.min_size)
+
+    if args.format == 'ndjson':
+        _emit(dict(summary, type='summary'))
+        for node, depth in entries:
+            _emit({'path': tree.path(node), 'size': tree.size[node],
+                   'is_dir': tree.is_dir(node), 'depth': depth})
+    else:
+        summary['items'] = [{'path': tree.path(node), 'size': tree.size[node],
+                             'is_dir': tree.is_dir(node), 'depth': depth}
+                            for node, depth in entries]
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+def cmd_clean(args):
+    from core.cleaner import JunkCleaner
+
+    locations = JunkCleaner.scan_locations(throttle=_throttle(args))
+    junk = [item for location in locations for item in location['files']]
+    total = sum(item['size'] for item in junk)
+
+    result = {'files': len(junk), 'size': total, 'dry_run': args.dry_run,
+              'locations': [{key: location[key] for key in ('path', 'type', 'count', 'size')}
+                            for location in locations]}
+    if not args.dry_run:
+        success, fail, cleaned = JunkCleaner.clean_files(junk)
+        result.update({'cleaned': success, 'failed': fail, 'cleaned_size': cleaned})
+
+    if args.format == 'ndjson':
+        for item in junk:
+            _emit(item)
+        _emit(dict(result, type='summary'))
+    else:
+        result['items'] = junk
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+def cmd_monitor(args):
+    from core.system_stats import StatsSampler
+
+    sampler = StatsSampler(disk_path=args.disk)
+    count = 0
+    try:
+        while args.count is None or count < args.count:
+            time.sleep(args.interval)
+            try:
+                stats = sampler.sample()
+            except OSError as e:
+                print(f"Cannot read disk {args.disk}: {e}", file=sys.stderr)
+                return 1
+            stats['time'] = time.time()
+            _emit(stats)
+            sys.stdout.flush()
+            count += 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _iter_growth(diff, max_depth, min_delta):
+    """Pre-order walk of a SnapshotDiff, largest growth first"""
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node:
+            yield node, depth
+        if max_depth is not None and depth >= max_depth:
+            continue
+        children = [child for child in diff.children(node) if abs(diff.delta(child)) >= min_delta]
+        stack.extend((child, depth + 1) for child in reversed(children))
+
+
+def cmd_diff(args):
+    from core.snapshot import SnapshotDiff, iter_snapshot, read_snapshot_header
+
+    try:
+        old_header = read_snapshot_header(args.old)
+        new_header = read_snapshot_header(args.new)
+        started = time.time()
+        diff = SnapshotDiff(iter_snapshot(args.old), iter_snapshot(args.new))
+    except (OSError, ValueError, EOFError) as e:
+        print(f"Cannot read snapshot: {e}", file=sys.stderr)
+        return 1
+
+    summary = {
+        'old': dict(old_header, path=args.old),
+        'new': dict(new_header, path=args.new),
+        'delta': diff.delta(0),
+        'dirs': len(diff),
+        'seconds': round(time.time() - started, 3)
+    }
+    entries = _iter_growth(diff, args.max_depth, max(1, args.min_delta))
+
+    def entry(node, depth):
+        return {'path': diff.path(node), 'delta': diff.delta(node), 'old_size': diff.old_size[node],
+                'new_size': diff.new_size[node], 'depth': depth}
+
+    if args.format == 'ndjson':
+        _emit(dict(summary, type='summary'))
+        for node, depth in entries:
+            _emit(entry(node, depth))
+    else:
+        summary['items'] = [entry(node, depth) for node, depth in entries]
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+def _add_background_arguments(parser):
+    parser.add_argument("--background", action="store_true",
+                        help="Low CPU/I/O priority, rate limited, backs off while the disk is busy")
+    parser.add_argument("--rate", type=float, default=200.0, help="Folders listed per second in background mode")
+
+
+def build_parser():
+    from core.disk_scanner import DEFAULT_WORKERS
+
+    parser = argparse.ArgumentParser(prog="main.py", description="傲視系統優化大師 - headless mode")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="Analyze disk usage under a path")
+    scan.add_argument("path", help="Folder to scan, or a file saved with --export")
+    scan.add_argument("--format", choices=("json", "ndjson"), default="json")
+    scan.add_argument("--max-depth", type=int, default=None, help="Only output entries up to this depth")
+    scan.add_argument("--min-size", type=int, default=0, help="Only output entries of at least this many bytes")
+    scan.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    scan.add_argument("--index", help="Persistent scan index for incremental rescans")
+    scan.add_argument("--progress", action="store_true", help="Report progress on stderr")
+    scan.add_argument("--snapshot", help="Also save a snapshot of folder sizes to this file")
+    scan.add_argument("--checkpoint", help="Journal progress to this file and resume from it if present")
+    scan.add_argument("--keep-files", type=int, default=None,
+                      help="Large volumes: keep only the N largest files per folder in memory, spill the rest")
+    scan.add_argument("--spill-dir", help="Where --keep-files spills the other files (default: temp folder)")
+    scan.add_argument("--export", help="Also save the whole result to this columnar file (analyze it later with scan <file>)")
+    scan.add_argument("--no-compress", action="store_true",
+                      help="Store --export columns uncompressed: larger, but memory-mapped on load")
+    scan.add_argument("--ncdu", help="Also save the result in ncdu's JSON format to this file")
+    scan.add_argument("--ages", action="store_true",
+                      help="Add the file age breakdown and the folders holding the most cold data")
+    _add_background_arguments(scan)
+    scan.set_defaults(func=cmd_scan)
+
+    clean = sub.add_parser("clean", help="Scan (and optionally remove) junk files")
+    clean.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+    clean.add_argument("--format", choices=("json", "ndjson"), default="json")
+    _add_background_arguments(clean)
+    clean.set_defaults(func=cmd_clean)
+
+    monitor = sub.add_parser("monitor", help="Print system stats periodically as ndjson")
+    monitor.add_argument("--interval", type=float, default=1.0)
+    monitor.add_argument("--count", type=int, default=None, help="Stop after this many samples")
+    monitor.add_argument("--disk", default=DEFAULT_DISK, help="Disk to report usage for (default: the system drive)")
+    monitor.set_defaults(func=cmd_monitor)
+
+    diff = sub.add_parser("diff", help="Show which folders grew between two snapshots")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--format", choices=("json", "ndjson"), default="json")
+    diff.add_argument("--max-depth", type=int, default=None, help="Only output folders up to this depth")
+    diff.add_argument("--min-delta", type=int, default=1, help="Only output folders that changed by at least this many bytes")
+    diff.set_defaults(func=cmd_diff)
+
+    return parser
+
+
+COMMANDS = ("scan", "clean", "monitor", "diff")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into head and friends
+        return 0
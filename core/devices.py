@@ -0,0 +1,79 @@
+import ctypes
+import os
+
+# Windows
+FILE_SHARE_READ_WRITE = 0x3
+OPEN_EXISTING = 3
+IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS = 0x00560000
+
+
+class _DiskExtent(ctypes.Structure):
+    _fields_ = [('DiskNumber', ctypes.c_ulong),
+                ('StartingOffset', ctypes.c_longlong),
+                ('ExtentLength', ctypes.c_longlong)]
+
+
+class _VolumeDiskExtents(ctypes.Structure):
+    _fields_ = [('NumberOfDiskExtents', ctypes.c_ulong),
+                ('Extents', _DiskExtent * 8)]
+
+
+def _windows_disk(path):
+    """Number of the first physical disk a volume lives on, or None"""
+    from ctypes import wintypes
+    drive = os.path.splitdrive(os.path.abspath(path))[0]
+    if not drive or drive.startswith('\\\\'):
+        return None  # Network share
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                     wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    handle = kernel32.CreateFileW(f"\\\\.\\{drive}", 0, FILE_SHARE_READ_WRITE, None, OPEN_EXISTING, 0, None)
+    if handle in (None, wintypes.HANDLE(-1).value):
+        return None
+    try:
+        extents = _VolumeDiskExtents()
+        returned = wintypes.DWORD()
+        if not kernel32.DeviceIoControl(wintypes.HANDLE(handle), IOCTL_VOLUME_GET_VOLUME_DISK_EXTENTS, None, 0,
+                                        ctypes.byref(extents), ctypes.sizeof(extents),
+                                        ctypes.byref(returned), None):
+            return None
+        if not extents.NumberOfDiskExtents:
+            return None
+        return extents.Extents[0].DiskNumber
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _linux_disk(st_dev):
+    """Name of the whole disk holding a block device (sda for sda2), or None"""
+    sys_path = f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}"
+    if not os.path.exists(sys_path):
+        return None  # Not backed by a block device (tmpfs, network, ...)
+    real = os.path.realpath(sys_path)
+    if os.path.exists(os.path.join(real, 'partition')):
+        real = os.path.dirname(real)
+    return os.path.basename(real)
+
+
+def physical_device(path):
+    """
+    Key of the physical disk a drive or mount point is stored on, so that
+    volumes sharing one disk can be told apart from volumes on separate disks.
+    Falls back to the volume itself when the disk cannot be determined.
+    """
+    if os.name == 'nt':
+        disk = _windows_disk(path)
+        if disk is not None:
+            return ('disk', disk)
+        return ('volume', os.path.splitdrive(os.path.abspath(path))[0].upper())
+
+    try:
+        st_dev = os.stat(path).st_dev
+    except OSError:
+        return ('path', path)
+    disk = _linux_disk(st_dev)
+    if disk is not None:
+        return ('disk', disk)
+    return ('device', st_dev)
@@ -0,0 +1,380 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from core.devices import physical_device
+from core.file_types import TypeBreakdown
+from core.scan_spill import ScanSpill, keep_largest
+from core.scan_tree import ScanTree
+
+# Priority skip list (only skip if we are sure doing so wont miss user data)
+# We should NOT skip 'Users' or 'Documents and Settings'
+SKIP_DIRS = {'$Recycle.Bin', 'System Volume Information', 'Recovery', '$WinREAgent',
+             'Config.Msi', '$SysReset'}
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 4) + 4)
+
+
+def list_directory(path, log=None):
+    """
+    Lists one directory with scandir.
+    Returns (files, dirs): files as (name, size, mtime, atime), dirs as (name, path).
+    Times are in whole seconds, which is all age filters and reports need.
+    Raises OSError if the directory itself cannot be opened.
+    log is an optional ScanLogger; its debug path is skipped unless enabled.
+    """
+    debug = log is not None and log.debug_enabled
+    files = []
+    dirs = []
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    files.append((entry.name, st.st_size, int(st.st_mtime), int(st.st_atime)))
+                elif entry.is_dir(follow_symlinks=False):
+                    # Debug specific paths
+                    if debug and ("Desktop" in entry.name or "Users" in entry.name or "Jack_Liu" in entry.name):
+                        log.debug(f"[SCAN] Found interesting folder: {entry.path}")
+
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith('$'):
+                        dirs.append((entry.name, entry.path))
+                    elif debug:
+                        log.debug(f"[SKIP] Skipping: {entry.path}")
+            except (PermissionError, OSError):
+                # Individual item error, keep scanning the directory
+                continue
+
+    return files, dirs
+
+
+class ParallelWalker:
+    """
+    Work-stealing parallel directory traversal.
+
+    Every worker thread owns a deque of directories. It pushes the subdirectories
+    it discovers onto the right end and pops from the right (depth-first, keeps
+    the working set small). An idle worker steals from the left end of another
+    worker's deque, which hands over the oldest and usually largest subtrees.
+
+    lister is called as lister(path, log) and must behave like list_directory;
+    the persistent scan index plugs in here.
+
+    on_partial(tree) is called at most once per partial_interval seconds while
+    the walk runs; the tree's running subtotals can be read from it.
+
+    With collect_types, every worker also counts its files per extension and
+    the merged TypeBreakdown ends up in tree.types.
+
+    With a ScanCheckpoint, every listing is journaled and written out at most
+    checkpoint_interval seconds apart; a stopped walk flushes what is left and
+    a complete one deletes the checkpoint. resume=(tree, frontier) from
+    ScanCheckpoint.load() continues a partial walk instead of starting over.
+
+    With a BackgroundThrottle, the worker threads run at the lowest CPU and
+    I/O priority and every listing waits for the throttle's rate limit.
+
+    keep_files=K is the external-memory mode for very large volumes: only the
+    K largest files of every folder become nodes, the others are added to
+    the folder sizes and spilled to a temporary file in spill_dir (see
+    ScanSpill), so memory grows with the number of folders instead of files.
+    File types still count every file; other per-file views (largest files,
+    ages, search, duplicates) only see the kept ones.
+
+    run() returns the finalized ScanTree of everything under root.
+    """
+
+    def __init__(self, root, workers=DEFAULT_WORKERS, log=None, should_stop=None,
+                 on_progress=None, progress_every=1000, lister=list_directory,
+                 on_partial=None, partial_interval=0.5, collect_types=True,
+                 checkpoint=None, checkpoint_interval=10.0, resume=None, throttle=None,
+                 keep_files=None, spill_dir=None):
+        self.root = root
+        self.workers = max(1, int(workers))
+        self.log = log
+        self.should_stop = should_stop or (lambda: False)
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+        self.lister = lister
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+
+        self._deques = [deque() for _ in range(self.workers)]
+        self._types = [TypeBreakdown() for _ in range(self.workers)] if collect_types else None
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.throttle = throttle
+        self.keep_files = keep_files
+        self._resumed = resume is not None
+        if self._resumed:
+            self.tree, self._frontier = resume
+        else:
+            self.tree, self._frontier = ScanTree(root), [(root, 0)]
+        if keep_files is not None and self.tree.spill is None:
+            self.tree.spill = ScanSpill(spill_dir)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = 0  # Directories queued or being listed
+        self._idle = 0
+        self._scan_count = 0
+        self._stopped = False
+        self._next_partial = time.monotonic() + partial_interval
+        self._next_checkpoint = time.monotonic() + checkpoint_interval
+
+    def run(self):
+        if self.checkpoint and not self._resumed:
+            self.checkpoint.start()
+        self.walk()
+
+        if self._types:
+            self.tree.types = self.merge_types(self.tree.types or TypeBreakdown())
+
+        if self.checkpoint:
+            if self._stopped:
+                self.checkpoint.flush()
+            else:
+                self.checkpoint.discard()
+        if not self._stopped:
+            self.tree.finalize()
+        return self.tree
+
+    def walk(self):
+        """Lists everything below the start folders into the tree, without finalizing it"""
+        self._deques[0].extend(self._frontier)
+        self._pending = len(self._frontier)
+        self._frontier = None
+
+        threads = [threading.Thread(target=self._work, args=(i,), daemon=True)
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def merge_types(self, types):
+        """Adds the file types counted by every worker to types and returns it"""
+        for other in self._types or ():
+            types.merge(other)
+        return types
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    @property
+    def scan_count(self):
+        """Folders listed so far"""
+        return self._scan_count
+
+    def _next_dir(self, index):
+        """Pop local work first, then try to steal from the other workers"""
+        own = self._deques[index]
+        try:
+            return own.pop()
+        except IndexError:
+            pass
+
+        victims = list(range(self.workers))
+        random.shuffle(victims)
+        for victim in victims:
+            if victim == index:
+                continue
+            try:
+                return self._deques[victim].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _work(self, index):
+        own = self._deques[index]
+        types = self._types[index] if self._types else None
+        if self.throttle:
+            self.throttle.enter_thread()
+        while True:
+            if self.should_stop():
+                with self._wakeup:
+                    self._stopped = True
+                    self._wakeup.notify_all()
+                return
+
+            item = self._next_dir(index)
+            if item is None:
+                with self._wakeup:
+                    if self._pending == 0 or self._stopped:
+                        self._wakeup.notify_all()
+                        return
+                    self._idle += 1
+                    self._wakeup.wait(0.05)
+                    self._idle -= 1
+                continue
+
+            path, node = item
+            if self.throttle and not self.throttle.wait(self.should_stop):
+                continue  # Stopped while waiting; the folder stays unlisted
+            error = False
+            try:
+                files, dirs = self.lister(path, self.log)
+            except (PermissionError, OSError) as e:
+                if self.log:
+                    self.log.warning(f"[ERROR] Failed to open dir {path}: {e}")
+                # Only if the DIRECTORY ITSELF cannot be opened do we skip it
+                self.tree.mark_error(node)
+                files, dirs = [], []
+                error = True
+
+            omitted = ()
+            if self.keep_files is not None:
+                files, omitted = keep_largest(files, self.keep_files)
+            own.extend(self.tree.add_children(node, files, dirs, omitted))
+            start = self.tree.child_start[node]
+            if types is not None:
+                if files:
+                    types.add_files(files, start + len(dirs))
+                if omitted:
+                    types.add_files(omitted, None)
+            if self.checkpoint:
+                self.checkpoint.record(node, start, files + omitted if omitted else files, dirs, error)
+
+            with self._wakeup:
+                self._pending += len(dirs) - 1
+                self._scan_count += 1
+                count = self._scan_count
+                if dirs and self._idle:
+                    self._wakeup.notify(len(dirs))
+                elif self._pending == 0:
+                    self._wakeup.notify_all()
+
+                push_checkpoint = False
+                if self.checkpoint:
+                    now = time.monotonic()
+                    if now >= self._next_checkpoint:
+                        self._next_checkpoint = now + self.checkpoint_interval
+                        push_checkpoint = True
+
+                push_partial = False
+                if self.on_partial:
+                    now = time.monotonic()
+                    if now >= self._next_partial:
+                        self._next_partial = now + self.partial_interval
+                        push_partial = True
+
+            if self.on_progress and count % self.progress_every == 0:
+                self.on_progress(count)
+            if push_partial:
+                self.on_partial(self.tree)
+            if push_checkpoint:
+                self.checkpoint.flush()
+
+
+
+class MultiDriveWalker:
+    """
+    Scans several drives or mount points at once into one ScanTree.
+
+    Node 0 is a virtual root named label, with one folder per drive below it.
+    Drives are grouped by physical_device(): every disk gets its own thread,
+    which walks its drives one after another with a ParallelWalker. Separate
+    disks are scanned in parallel while two volumes of one disk never make
+    its head seek back and forth between them.
+
+    on_progress(drives) receives a list of dicts {'root', 'folders', 'size',
+    'done'}, one per drive, whenever a drive's walker reports progress or
+    finishes. The other arguments are passed on to every ParallelWalker; a
+    throttle and the spill file of keep_files are shared by all of them.
+
+    run() returns the finalized ScanTree of every drive.
+    """
+
+    def __init__(self, roots, label, workers=DEFAULT_WORKERS, log=None, should_stop=None,
+                 on_progress=None, progress_every=1000, lister=list_directory,
+                 on_partial=None, partial_interval=0.5, collect_types=True, throttle=None,
+                 device_of=physical_device, keep_files=None, spill_dir=None):
+        self.roots = list(roots)
+        self.label = label
+        self.workers = workers
+        self.log = log
+        self.should_stop = should_stop or (lambda: False)
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+        self.lister = lister
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+        self.collect_types = collect_types
+        self.throttle = throttle
+        self.device_of = device_of
+        self.keep_files = keep_files
+
+        self.tree = ScanTree(label)
+        if keep_files is not None:
+            self.tree.spill = ScanSpill(spill_dir)
+        self._lock = threading.Lock()
+        self._drives = {}  # root -> progress dict
+        self._nodes = {}  # root -> node
+        self._stopped = False
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def devices(self):
+        """{device key: [root, ...]} in the order the drives were given"""
+        groups = {}
+        for root in self.roots:
+            groups.setdefault(self.device_of(root), []).append(root)
+        return groups
+
+    def run(self):
+        tree = self.tree
+        self._nodes = dict(zip(self.roots, tree.add_roots(self.roots)))
+        for root in self.roots:
+            self._drives[root] = {'root': root, 'folders': 0, 'size': 0, 'done': False}
+        if self.collect_types:
+            tree.types = TypeBreakdown()
+
+        threads = []
+        for device, roots in self.devices().items():
+            if self.log:
+                self.log.info(f"[MULTI] {device}: {', '.join(roots)}")
+            drives = [(root, self._nodes[root]) for root in roots]
+            threads.append(threading.Thread(target=self._walk_device, args=(drives,), daemon=True))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if self.should_stop():
+            self._stopped = True
+        if not self._stopped:
+            tree.finalize()
+        return tree
+
+    def _walk_device(self, drives):
+        for root, node in drives:
+            if self.should_stop():
+                return
+            walker = ParallelWalker(root, workers=self.workers, log=self.log,
+                                    should_stop=self.should_stop,
+                                    on_progress=lambda count, root=root: self._progress(root, count),
+                                    progress_every=self.progress_every, lister=self.lister,
+                                    on_partial=self.on_partial, partial_interval=self.partial_interval,
+                                    collect_types=self.collect_types, throttle=self.throttle,
+                                    resume=(self.tree, [(root, node)]), keep_files=self.keep_files)
+            walker.walk()
+            with self._lock:
+                if walker.stopped:
+                    self._stopped = True
+                if self.collect_types:
+                    walker.merge_types(self.tree.types)
+            self._progress(root, walker.scan_count, done=not walker.stopped)
+
+    def _progress(self, root, count, done=False):
+        with self._lock:
+            drive = self._drives[root]
+            drive['folders'] = count
+            drive['done'] = done
+            report = [dict(d, size=self.tree.size[self._nodes[d['root']]]) for d in self._drives.values()]
+        if self.on_progress:
+            self.on_progress(report)
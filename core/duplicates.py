@@ -0,0 +1,155 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from core.scan_tree import FLAG_DIR
+
+PARTIAL_BYTES = 4096
+HASH_CHUNK = 1024 * 1024
+
+
+def _partial_hash(path, size, partial_bytes=PARTIAL_BYTES):
+    """
+    Hash of the first and last partial_bytes (the whole file if it is small).
+    Returns (file_id, digest); file_id identifies hard links to the same data.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            file_id = (st.st_dev, st.st_ino)
+            if size <= 2 * partial_bytes:
+                h.update(f.read())
+            else:
+                h.update(f.read(partial_bytes))
+                f.seek(-partial_bytes, os.SEEK_END)
+                h.update(f.read(partial_bytes))
+    except OSError:
+        return None, None
+    return file_id, h.digest()
+
+
+def _full_hash(path):
+    """Content hash through a read-only memory map; runs in a worker process"""
+    h = hashlib.blake2b(digest_size=20)
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m, memoryview(m) as view:
+                    for offset in range(0, size, HASH_CHUNK):
+                        h.update(view[offset:offset + HASH_CHUNK])
+    except (OSError, ValueError):
+        return path, None
+    return path, h.digest()
+
+
+class DuplicateFinder:
+    """
+    Finds duplicate files among the files of a ScanTree in three stages:
+
+    1. group by size (no I/O, straight from the scan result)
+    2. within each size group, hash the first and last few KB on a thread pool
+    3. only for files still colliding, hash the full content with memory-mapped
+       reads on a process pool
+
+    Most files are ruled out by size alone, and most of the rest by the partial
+    hash, so only true duplicate candidates are ever read completely.
+    """
+
+    BATCH = 10000
+
+    def __init__(self, min_size=4096, partial_bytes=PARTIAL_BYTES, threads=8, processes=None,
+                 should_stop=None, on_progress=None):
+        self.min_size = max(1, min_size)
+        self.partial_bytes = partial_bytes
+        self.threads = threads
+        self.processes = processes
+        self.should_stop = should_stop or (lambda: False)
+        self.on_progress = on_progress  # on_progress(stage, done, total)
+
+    def _progress(self, stage, done, total):
+        if self.on_progress:
+            self.on_progress(stage, done, total)
+
+    def find(self, scan_tree):
+        """
+        Returns a list of dicts {'size', 'paths', 'reclaimable'}, largest
+        reclaimable bytes first. Returns [] if stopped.
+        """
+        # Stage 1: size buckets
+        by_size = {}
+        flags = scan_tree.flags
+        sizes = scan_tree.size
+        min_size = self.min_size
+        for node in range(1, len(scan_tree)):
+            size = sizes[node]
+            if size >= min_size and not flags[node] & FLAG_DIR:
+                by_size.setdefault(size, []).append(node)
+        candidates = [(size, nodes) for size, nodes in by_size.items() if len(nodes) > 1]
+        del by_size
+
+        # Stage 2: partial hashes
+        jobs = [(scan_tree.path(node), size) for size, nodes in candidates for node in nodes]
+        del candidates
+        by_partial = {}
+        seen_ids = set()
+        partial_bytes = self.partial_bytes
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            # Submit in batches so millions of candidates never become millions of futures
+            for start in range(0, len(jobs), self.BATCH):
+                if self.should_stop():
+                    return []
+                batch = jobs[start:start + self.BATCH]
+                digests = pool.map(lambda job: _partial_hash(job[0], job[1], partial_bytes), batch)
+                for (path, size), (file_id, digest) in zip(batch, digests):
+                    if digest is None:
+                        continue
+                    # Hard links share their data, deleting one reclaims nothing
+                    if file_id[1] and file_id in seen_ids:
+                        continue
+                    seen_ids.add(file_id)
+                    by_partial.setdefault((size, digest), []).append(path)
+                self._progress("partial", start + len(batch), len(jobs))
+
+        groups = []
+        full_jobs = []
+        for (size, digest), paths in by_partial.items():
+            if len(paths) < 2:
+                continue
+            if size <= 2 * self.partial_bytes:
+                # The partial hash already covered the whole file
+                groups.append((size, paths))
+            else:
+                full_jobs.extend((path, size) for path in paths)
+        del by_partial, seen_ids
+
+        # Stage 3: full hashes for the survivors
+        if full_jobs:
+            by_full = {}
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                # Batched like stage 2: only one batch of paths is queued to the workers at a time
+                for start in range(0, len(full_jobs), self.BATCH):
+                    if self.should_stop():
+                        return []
+                    batch = full_jobs[start:start + self.BATCH]
+                    results = pool.map(_full_hash, [path for path, size in batch], chunksize=16)
+                    for done, ((path, digest), (_, size)) in enumerate(zip(results, batch), start + 1):
+                        if self.should_stop():
+                            pool.shutdown(cancel_futures=True)
+                            return []
+                        if digest is not None:
+                            by_full.setdefault((size, digest), []).append(path)
+                        if done % 100 == 0:
+                            self._progress("full", done, len(full_jobs))
+            self._progress("full", len(full_jobs), len(full_jobs))
+            groups.extend((size, paths) for (size, digest), paths in by_full.items() if len(paths) > 1)
+
+        result = [{
+            'size': size,
+            'paths': sorted(paths),
+            'reclaimable': size * (len(paths) - 1)
+        } for size, paths in groups]
+        result.sort(key=lambda g: g['reclaimable'], reverse=True)
+        return result
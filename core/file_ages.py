@@ -0,0 +1,128 @@
+import time
+from array import array
+from bisect import bisect_right
+
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+
+DAY = 86400
+
+# (key, label, upper age limit in days; None for the last, open-ended bucket)
+AGE_BUCKETS = [
+    ('recent', '30 天內', 30),
+    ('year', '30 天至 1 年', 365),
+    ('old', '超過 1 年', None),
+]
+AGE_LABELS = {key: label for key, label, days in AGE_BUCKETS}
+
+
+class AgeHistogram:
+    """
+    Bytes and file counts per age bucket under every folder of a ScanTree.
+
+    A file's age is the time since it was last used: the later of its
+    modification and access time. Access times alone are unreliable (NTFS and
+    relatime mounts update them lazily or not at all), the modification time
+    keeps a file that was never read back from looking unused forever.
+
+    Filled from the times recorded during the scan in one backwards pass over
+    the node table, like category_sizes(): children come after their parent,
+    so a folder's buckets are complete before they are passed up. Files a
+    large volume scan left out are read back from its spill file. Counts are
+    stored flat, node * len(AGE_BUCKETS) + bucket.
+    """
+
+    def __init__(self, tree, now=None, use_atime=True):
+        self.tree = tree
+        self.now = time.time() if now is None else now
+        buckets = len(AGE_BUCKETS)
+        limits = [days * DAY for key, label, days in AGE_BUCKETS[:-1]]
+        n = len(tree)
+        self.count = n
+        self.bytes = array('q', [0]) * (n * buckets)
+        self.counts = array('q', [0]) * (n * buckets)
+
+        hist = self.bytes
+        counts = self.counts
+        flags = tree.flags
+        parent = tree.parent
+        size = tree.size
+        mtime = tree.mtime
+        atime = tree.atime
+        now = self.now
+        if tree.spill is not None:
+            # Files left out of the table count towards their folder
+            for folder, files in tree.spill:
+                base = folder * buckets
+                for name, fsize, fmtime, fatime in files:
+                    used = max(fmtime, fatime) if use_atime else fmtime
+                    slot = base + bisect_right(limits, now - used)
+                    hist[slot] += fsize
+                    counts[slot] += 1
+        for node in range(n - 1, 0, -1):
+            flag = flags[node]
+            if flag & FLAG_DELETED:
+                continue
+            base = parent[node] * buckets
+            if flag & FLAG_DIR:
+                own = node * buckets
+                for bucket in range(buckets):
+                    if counts[own + bucket]:
+                        hist[base + bucket] += hist[own + bucket]
+                        counts[base + bucket] += counts[own + bucket]
+            else:
+                used = max(mtime[node], atime[node]) if use_atime else mtime[node]
+                slot = base + bisect_right(limits, now - used)
+                hist[slot] += size[node]
+                counts[slot] += 1
+
+    def histogram(self, node):
+        """List of dicts {'key', 'label', 'size', 'count'}, one per bucket, newest first"""
+        base = node * len(AGE_BUCKETS)
+        return [{
+            'key': key,
+            'label': label,
+            'size': self.bytes[base + i],
+            'count': self.counts[base + i]
+        } for i, (key, label, days) in enumerate(AGE_BUCKETS)]
+
+    def cold(self, node):
+        """Bytes under a node in the oldest bucket"""
+        return self.bytes[(node + 1) * len(AGE_BUCKETS) - 1]
+
+    def cold_report(self, limit=100, min_share=0.8, min_size=1024 * 1024):
+        """
+        Folders worth archiving, most cold bytes first: the topmost folders
+        whose files are at least min_share cold by size. A folder inside one
+        that already qualifies is left out, archiving the outer one covers it.
+        List of dicts {'node', 'cold', 'size', 'share', 'count'}.
+        """
+        tree = self.tree
+        flags = tree.flags
+        parent = tree.parent
+        buckets = len(AGE_BUCKETS)
+        hist = self.bytes
+        counts = self.counts
+        n = len(tree)
+        covered = bytearray(n)  # The folder or an ancestor qualifies
+        result = []
+        for node in range(1, n):
+            flag = flags[node]
+            if not flag & FLAG_DIR or flag & FLAG_DELETED:
+                continue
+            if covered[parent[node]]:
+                covered[node] = 1
+                continue
+            base = node * buckets
+            total = sum(hist[base:base + buckets])
+            cold = hist[base + buckets - 1]
+            if cold >= min_size and cold >= total * min_share:
+                covered[node] = 1
+                result.append({
+                    'node': node,
+                    'cold': cold,
+                    'size': total,
+                    'share': cold / total,
+                    'count': counts[base + buckets - 1]
+                })
+        result.sort(key=lambda entry: entry['cold'], reverse=True)
+        return result[:limit]
@@ -0,0 +1,152 @@
+from array import array
+
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+
+# (key, label, extensions)
+CATEGORIES = [
+    ('video', '影片', ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg', '.ts']),
+    ('audio', '音訊', ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma', '.opus']),
+    ('image', '圖片', ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg', '.webp', '.tif', '.tiff',
+                     '.heic', '.raw', '.cr2', '.nef', '.psd']),
+    ('document', '文件', ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', '.rtf', '.odt',
+                        '.ods', '.odp', '.csv', '.md', '.epub']),
+    ('archive', '壓縮檔', ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz', '.zst', '.cab', '.tgz']),
+    ('disk_image', '磁碟映像/虛擬機', ['.iso', '.img', '.vhd', '.vhdx', '.vmdk', '.vdi', '.qcow2', '.wim', '.esd']),
+    ('executable', '程式/安裝檔', ['.exe', '.msi', '.dll', '.sys', '.msix', '.appx', '.bat', '.cmd', '.ps1', '.so']),
+    ('code', '程式碼', ['.py', '.js', '.ts', '.html', '.css', '.java', '.cpp', '.c', '.h', '.hpp', '.cs', '.go',
+                     '.rs', '.json', '.xml', '.yml', '.yaml']),
+    ('build', '建置產物', ['.obj', '.o', '.pdb', '.ilk', '.pch', '.ipch', '.lib', '.a', '.pyc', '.class',
+                       '.tlog', '.idb', '.nupkg', '.jar']),
+    ('log', '記錄檔', ['.log', '.etl', '.dmp', '.mdmp', '.evtx', '.trace']),
+    ('temp', '暫存/備份', ['.tmp', '.temp', '.bak', '.old', '.cache', '.crdownload', '.part']),
+    ('database', '資料庫', ['.db', '.sqlite', '.sqlite3', '.mdf', '.ldf', '.edb', '.pst', '.ost']),
+]
+OTHER = ('other', '其他')
+
+CATEGORY_LABELS = dict([(key, label) for key, label, exts in CATEGORIES] + [OTHER])
+EXTENSION_CATEGORY = {ext: key for key, label, exts in CATEGORIES for ext in exts}
+
+MAX_EXTENSION = 12  # Longer "extensions" are usually just dots in a name
+
+
+def extension(name):
+    """Lowercased extension including the dot, '' if there is none"""
+    dot = name.rfind('.')
+    if dot <= 0 or len(name) - dot > MAX_EXTENSION:
+        return ''
+    return name[dot:].lower()
+
+
+def category_of(ext):
+    return EXTENSION_CATEGORY.get(ext, OTHER[0])
+
+
+class TypeBreakdown:
+    """
+    Per-extension counters (count, total bytes, largest file) for a scan.
+
+    Each walker thread fills its own instance while it lists folders, so the
+    hot path takes no lock; the instances are merged once the walk is done.
+    Category totals are derived from the extension counters on demand.
+    """
+
+    def __init__(self):
+        self.extensions = {}  # ext -> [count, total bytes, largest size, largest node]
+
+    def add_files(self, files, first_node):
+        """
+        files: [(name, size, mtime, atime)] of one listing, stored from node
+        first_node on; None for files that have no node (largest_node -1)
+        """
+        stats = self.extensions
+        step = 0 if first_node is None else 1
+        node = -1 if first_node is None else first_node
+        for name, size, mtime, atime in files:
+            dot = name.rfind('.')
+            ext = name[dot:].lower() if 0 < dot and len(name) - dot <= MAX_EXTENSION else ''
+            entry = stats.get(ext)
+            if entry is None:
+                stats[ext] = [1, size, size, node]
+            else:
+                entry[0] += 1
+                entry[1] += size
+                if size > entry[2]:
+                    entry[2] = size
+                    entry[3] = node
+            node += step
+
+    def merge(self, other):
+        stats = self.extensions
+        for ext, (count, total, largest, node) in other.extensions.items():
+            entry = stats.get(ext)
+            if entry is None:
+                stats[ext] = [count, total, largest, node]
+            else:
+                entry[0] += count
+                entry[1] += total
+                if largest > entry[2]:
+                    entry[2] = largest
+                    entry[3] = node
+
+    def by_extension(self):
+        """
+        List of dicts {'key', 'category', 'count', 'size', 'largest', 'largest_node'}, largest total first.
+        largest_node is -1 if that file was left out of the table.
+        """
+        result = [{
+            'key': ext,
+            'category': category_of(ext),
+            'count': count,
+            'size': total,
+            'largest': largest,
+            'largest_node': node
+        } for ext, (count, total, largest, node) in self.extensions.items()]
+        result.sort(key=lambda e: e['size'], reverse=True)
+        return result
+
+    def by_category(self):
+        """List of dicts {'key', 'label', 'count', 'size', 'largest', 'largest_node'}, largest total first"""
+        totals = {}
+        for ext, (count, total, largest, node) in self.extensions.items():
+            key = category_of(ext)
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [count, total, largest, node]
+            else:
+                entry[0] += count
+                entry[1] += total
+                if largest > entry[2]:
+                    entry[2] = largest
+                    entry[3] = node
+        result = [{
+            'key': key,
+            'label': CATEGORY_LABELS[key],
+            'count': count,
+            'size': total,
+            'largest': largest,
+            'largest_node': node
+        } for key, (count, total, largest, node) in totals.items()]
+        result.sort(key=lambda c: c['size'], reverse=True)
+        return result
+
+
+def category_sizes(tree, category):
+    """
+    Bytes of the given category under every node of a ScanTree, as an array
+    indexed by node. One backwards pass: children always come after their
+    parent, so every subtotal is complete before it is passed up.
+    """
+    n = len(tree)
+    sizes = array('q', [0]) * n
+    flags = tree.flags
+    parent = tree.parent
+    size = tree.size
+    for node in range(n - 1, 0, -1):
+        flag = flags[node]
+        if flag & FLAG_DELETED:
+            continue
+        if not flag & FLAG_DIR and category_of(extension(tree.name(node))) == category:
+            sizes[node] = size[node]
+        if sizes[node]:
+            sizes[parent[node]] += sizes[node]
+    return sizes
@@ -0,0 +1,432 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+
+from core.disk_scanner import SKIP_DIRS, list_directory
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+
+
+def _dir_paths(tree):
+    """(node, path) of every live folder of a ScanTree, parents first"""
+    flags = tree.flags
+    stack = [(0, tree.root_path)]
+    while stack:
+        node, path = stack.pop()
+        yield node, path
+        for child in tree.child_nodes(node):
+            if flags[child] & FLAG_DIR and not flags[child] & FLAG_DELETED:
+                stack.append((child, os.path.join(path, tree.name(child))))
+
+
+class TreeUpdater:
+    """
+    Applies file system changes to a finished ScanTree.
+
+    Changes are reconciled rather than replayed: every changed path is stat'ed
+    once and the tree is brought in line with what is on disk now, so the order
+    of coalesced events and duplicates among them do not matter. New folders
+    are listed together with their subtree, size differences are applied to
+    every ancestor, and the affected folders are re-sorted.
+    """
+
+    def __init__(self, tree, lister=list_directory):
+        self.tree = tree
+        self.lister = lister
+
+    def _kind(self, name, st):
+        if st is None:
+            return None
+        if stat.S_ISDIR(st.st_mode):
+            # Same rules as the scan itself
+            if name in SKIP_DIRS or name.startswith('$'):
+                return None
+            return 'dir'
+        if stat.S_ISREG(st.st_mode):
+            return 'file'
+        return None
+
+    def _list_subtree(self, path, node):
+        stack = [(path, node)]
+        while stack:
+            path, node = stack.pop()
+            try:
+                files, dirs = self.lister(path)
+            except OSError:
+                self.tree.mark_error(node)
+                continue
+            stack.extend(self.tree.add_children(node, files, dirs))
+
+    def apply(self, paths):
+        """Reconciles the given paths with the disk, returns how many folders changed"""
+        tree = self.tree
+        touched = set()
+        # Sorted, so a new folder is added before anything reported inside it
+        for path in sorted(paths):
+            node = tree.find(path)
+            if node == 0:
+                continue
+            name = os.path.basename(path)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                st = None
+            kind = self._kind(name, st)
+
+            if node > 0 and (kind is None or (kind == 'dir') != tree.is_dir(node)):
+                touched.add(tree.parent[node])
+                tree.remove(node)
+                node = -1
+            if kind is None:
+                continue
+
+            if node < 0:
+                parent = tree.find(os.path.dirname(path))
+                if parent < 0 or not tree.is_dir(parent):
+                    continue
+                if kind == 'dir':
+                    self._list_subtree(path, tree.add_entry(parent, name, 0, True))
+                else:
+                    tree.add_entry(parent, name, st.st_size, False, int(st.st_mtime), int(st.st_atime))
+                touched.add(parent)
+            elif kind == 'file':
+                if tree.size[node] != st.st_size:
+                    touched.add(tree.parent[node])
+                tree.set_size(node, st.st_size, int(st.st_mtime), int(st.st_atime))
+
+        if touched:
+            # Ancestors changed size too, so their position among siblings may change
+            folders = set()
+            for node in touched:
+                while node >= 0 and node not in folders:
+                    folders.add(node)
+                    node = tree.parent[node]
+            tree.resort(folders)
+        return len(touched)
+
+
+class ChangeWatcher:
+    """
+    Base class of the change notification backends.
+
+    A backend's _watch() loop reports changed paths with _changed(path). Bursts
+    are coalesced into one set and handed to on_changes(paths, overflow) once
+    nothing new arrived for `quiet` seconds, or at the latest `max_delay`
+    seconds after the first change of the batch. overflow is True when the
+    backend lost events and the batch may be incomplete.
+    """
+
+    def __init__(self, tree, on_changes, quiet=0.5, max_delay=2.0):
+        self.tree = tree
+        self.root = tree.root_path
+        self.on_changes = on_changes
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._pending = set()
+        self._overflow = False
+        self._first = 0.0
+        self._last = 0.0
+        self._cond = threading.Condition()
+        self._running = True
+
+    def run(self):
+        """Watches until stop() is called (blocking)"""
+        flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        flusher.start()
+        try:
+            self._watch()
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+            flusher.join()
+            self._close()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._interrupt()
+
+    def _watch(self):
+        raise NotImplementedError
+
+    def _interrupt(self):
+        """Wakes up a _watch() loop blocked in the OS"""
+
+    def _close(self):
+        """Releases OS resources once the loop has ended"""
+
+    def _mark(self):
+        now = time.monotonic()
+        if not self._pending and not self._overflow:
+            self._first = now
+        self._last = now
+        self._cond.notify()
+
+    def _changed(self, path):
+        with self._cond:
+            self._mark()
+            self._pending.add(path)
+
+    def _lost(self):
+        with self._cond:
+            self._mark()
+            self._overflow = True
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._running and not (self._pending or self._overflow):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                due = min(self._last + self.quiet, self._first + self.max_delay)
+                now = time.monotonic()
+                if now < due:
+                    self._cond.wait(due - now)
+                    continue
+                paths, overflow = self._pending, self._overflow
+                self._pending = set()
+                self._overflow = False
+            self.on_changes(paths, overflow)
+
+
+class InotifyWatcher(ChangeWatcher):
+    """Linux backend: one inotify watch per folder of the scan"""
+
+    IN_MODIFY = 0x2
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x1000000
+    IN_DONT_FOLLOW = 0x2000000
+    IN_EXCL_UNLINK = 0x4000000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    MASK = (IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+            IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, tree, on_changes, **kwargs):
+        super().__init__(tree, on_changes, **kwargs)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}  # wd -> folder path
+        self._wds = {}  # folder path -> wd
+        try:
+            for node, path in _dir_paths(tree):
+                self._add_watch(path)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if errno == 28:  # ENOSPC: out of watches, polling has to take over
+                raise OSError(errno, "inotify watch limit reached")
+            return  # Vanished or unreadable folder
+        self._paths[wd] = path
+        self._wds[path] = wd
+
+    def _add_watch_tree(self, path):
+        """Watches a folder that appeared after the scan, and everything below it"""
+        for dirpath, dirnames, filenames in os.walk(path):
+            self._add_watch(dirpath)
+
+    def _drop_watch_tree(self, path):
+        prefix = path + os.sep
+        for watched in [p for p in self._wds if p == path or p.startswith(prefix)]:
+            wd = self._wds.pop(watched)
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _watch(self):
+        header = self.EVENT.size
+        while self._running:
+            ready, _, _ = select.select([self._fd], [], [], 0.5)
+            if not ready:
+                continue
+            data = os.read(self._fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+                name = data[offset + header:offset + header + length].rstrip(b'\0')
+                offset += header + length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    self._lost()
+                    continue
+                if mask & self.IN_IGNORED:
+                    path = self._paths.pop(wd, None)
+                    if path is not None and self._wds.get(path) == wd:
+                        del self._wds[path]
+                    continue
+                base = self._paths.get(wd)
+                if base is None or not name:
+                    continue
+                path = os.path.join(base, os.fsdecode(name))
+                if mask & self.IN_ISDIR:
+                    try:
+                        if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                            self._add_watch_tree(path)
+                        elif mask & self.IN_MOVED_FROM:
+                            self._drop_watch_tree(path)
+                    except OSError:
+                        self._lost()  # Out of watches, changes below path go unnoticed
+                self._changed(path)
+
+    def _close(self):
+        os.close(self._fd)
+
+
+class WindowsWatcher(ChangeWatcher):
+    """Windows backend: a single ReadDirectoryChangesW on the scan root, whole subtree"""
+
+    FILE_LIST_DIRECTORY = 0x1
+    FILE_SHARE_ALL = 0x7
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    # File and folder names, sizes, last write
+    NOTIFY_FILTER = 0x1 | 0x2 | 0x8 | 0x10
+    ERROR_OPERATION_ABORTED = 995
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, tree, on_changes, **kwargs):
+        super().__init__(tree, on_changes, **kwargs)
+        from ctypes import wintypes
+        self._kernel32 = kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                         wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        kernel32.ReadDirectoryChangesW.argtypes = [wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD,
+                                                   wintypes.BOOL, wintypes.DWORD, ctypes.POINTER(wintypes.DWORD),
+                                                   wintypes.LPVOID, wintypes.LPVOID]
+        kernel32.CancelIoEx.argtypes = [wintypes.HANDLE, wintypes.LPVOID]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._handle = kernel32.CreateFileW(self.root, self.FILE_LIST_DIRECTORY, self.FILE_SHARE_ALL, None,
+                                            self.OPEN_EXISTING, self.FILE_FLAG_BACKUP_SEMANTICS, None)
+        if self._handle in (None, wintypes.HANDLE(-1).value):
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    def _watch(self):
+        from ctypes import wintypes
+        buffer = ctypes.create_string_buffer(self.BUFFER_SIZE)
+        returned = wintypes.DWORD()
+        while self._running:
+            ok = self._kernel32.ReadDirectoryChangesW(self._handle, buffer, len(buffer), True,
+                                                      self.NOTIFY_FILTER, ctypes.byref(returned), None, None)
+            if not ok:
+                error = ctypes.get_last_error()
+                if not self._running or error == self.ERROR_OPERATION_ABORTED:
+                    break
+                raise ctypes.WinError(error)
+            if returned.value == 0:
+                self._lost()  # The system's buffer overflowed
+                continue
+
+            data = buffer.raw[:returned.value]
+            offset = 0
+            while True:
+                next_offset, action, length = struct.unpack_from('<III', data, offset)
+                name = data[offset + 12:offset + 12 + length].decode('utf-16-le', 'surrogatepass')
+                self._changed(os.path.join(self.root, name))
+                if not next_offset:
+                    break
+                offset += next_offset
+
+    def _interrupt(self):
+        self._kernel32.CancelIoEx(self._handle, None)
+
+    def _close(self):
+        self._kernel32.CloseHandle(self._handle)
+
+
+class PollingWatcher(ChangeWatcher):
+    """
+    Fallback backend: stats every folder each `interval` seconds and re-lists
+    the ones whose modification time changed. It notices files and folders
+    being created, deleted or renamed; a file growing in place is picked up
+    the next time its folder changes.
+    """
+
+    def __init__(self, tree, on_changes, interval=30.0, lister=list_directory, **kwargs):
+        super().__init__(tree, on_changes, **kwargs)
+        self.interval = interval
+        self.lister = lister
+        self._wake = threading.Event()
+
+    def _compare(self, path, node):
+        """Reports the entries of one folder that differ from the tree"""
+        tree = self.tree
+        try:
+            files, dirs = self.lister(path)
+        except OSError:
+            self._changed(path)
+            return
+        on_disk = {name: size for name, size, mtime, atime in files}
+        on_disk.update((name, None) for name, dpath in dirs)
+        for child in tree.child_nodes(node):
+            if tree.flags[child] & FLAG_DELETED:
+                continue
+            name = tree.name(child)
+            size = on_disk.pop(name, -1)
+            if size == -1 or (size is None) != tree.is_dir(child) or (size is not None and size != tree.size[child]):
+                self._changed(os.path.join(path, name))
+        for name in on_disk:
+            self._changed(os.path.join(path, name))
+
+    def _watch(self):
+        mtimes = {}
+        while self._running:
+            for node, path in _dir_paths(self.tree):
+                if not self._running:
+                    return
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    if mtimes.pop(path, None) is not None:
+                        self._changed(path)
+                    continue
+                previous = mtimes.get(path)
+                mtimes[path] = mtime
+                if previous is not None and previous != mtime:
+                    self._compare(path, node)
+            self._wake.wait(self.interval)
+
+    def _interrupt(self):
+        self._wake.set()
+
+
+def create_watcher(tree, on_changes, poll_interval=30.0, **kwargs):
+    """
+    Returns the native watcher for this platform, or a PollingWatcher where
+    none is available (other systems, inotify watch limit reached, ...).
+    Setting up the native watcher may take a while on large trees; call this
+    off the UI thread.
+    """
+    if sys.platform == 'win32':
+        native = WindowsWatcher
+    elif sys.platform.startswith('linux'):
+        native = InotifyWatcher
+    else:
+        native = None
+
+    if native is not None:
+        try:
+            return native(tree, on_changes, **kwargs)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(tree, on_changes, interval=poll_interval, **kwargs)
@@ -0,0 +1,196 @@
+import os
+import re
+from array import array
+
+from core.scan_tree import FLAG_DIR
+
+# Category codes, in priority order of the checks
+OTHER = 0
+SYSTEM = 1
+JUNK = 2
+APPDATA = 3
+PERSONAL = 4
+EXECUTABLE = 5
+TEXT = 6
+IMAGE = 7
+MEDIA = 8
+ARCHIVE = 9
+CODE = 10
+
+SYSTEM_PATTERNS = [
+    'windows', 'program files', 'program files (x86)', 'programdata',
+    'users\\default', 'users\\public', 'users\\all users',
+    'boot', 'recovery', 'system volume information',
+    'perflogs', 'intel', 'amd', 'nvidia'
+]
+# Matched against the file or folder name only
+JUNK_PATTERNS = ['temp', 'tmp', 'cache', 'log']
+# Matched against file names only: a folder called desktop.ini is not junk
+JUNK_FILE_PATTERNS = ['.log', '.tmp', '.bak', 'thumbs.db', 'desktop.ini', '.ds_store']
+PERSONAL_PATTERNS = ['downloads', 'desktop', 'documents', 'music', 'pictures', 'videos']
+
+EXTENSIONS = {}
+for _code, _exts in (
+        (EXECUTABLE, ['.exe', '.msi', '.dll', '.sys', '.bat', '.cmd']),
+        (TEXT, ['.txt', '.log', '.ini', '.cfg', '.xml', '.json']),
+        (IMAGE, ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg']),
+        (MEDIA, ['.mp4', '.avi', '.mov', '.mkv', '.mp3', '.wav', '.flac']),
+        (ARCHIVE, ['.zip', '.rar', '.7z', '.tar', '.gz']),
+        (CODE, ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.h'])):
+    EXTENSIONS.update(dict.fromkeys(_exts, _code))
+
+# Match bits
+_SYSTEM = 1
+_JUNK = 2
+_USERS = 4
+_APPDATA = 8
+_PERSONAL = 16
+_JUNK_FILE = 32
+_DIR_BITS = _SYSTEM | _USERS | _APPDATA | _PERSONAL
+
+
+def _alternatives(patterns):
+    # Longest first, so "program files (x86)" is not cut short by "program files"
+    escaped = (re.escape(p).replace(r'\\', r'[\\/]') for p in sorted(patterns, key=len, reverse=True))
+    return "|".join(escaped)
+
+
+# One pass over a lowercased path finds every pattern: the lookahead matches
+# at each position without consuming, so overlapping patterns are all seen.
+# Alternatives are tried in priority order; junk patterns only count in the
+# last path component.
+_MATCHER = re.compile(
+    "(?=(?:"
+    f"(?P<system>{_alternatives(SYSTEM_PATTERNS)})"
+    f"|(?P<junk>(?:{_alternatives(JUNK_PATTERNS)})(?=[^\\\\/]*$))"
+    "|(?P<users>users)"
+    "|(?P<appdata>appdata)"
+    f"|(?P<personal>{_alternatives(PERSONAL_PATTERNS)})"
+    "))")
+_GROUP_BITS = {'system': _SYSTEM, 'junk': _JUNK, 'users': _USERS,
+               'appdata': _APPDATA, 'personal': _PERSONAL}
+# Searched in names on their own, as a folder drops the bit it sets
+_JUNK_FILE_MATCHER = re.compile(_alternatives(JUNK_FILE_PATTERNS))
+# Folder names that can start a pattern spanning a separator ("users" for users\public)
+_SPAN_HEADS = tuple({p.split('\\')[0] for p in SYSTEM_PATTERNS if '\\' in p})
+
+
+def _match_bits(text):
+    bits = 0
+    for match in _MATCHER.finditer(text):
+        bits |= _GROUP_BITS[match.lastgroup]
+    return bits
+
+
+def _extension_code(name):
+    dot = name.rfind('.')
+    # Same as os.path.splitext: leading dots do not start an extension
+    if dot <= 0 or not name[:dot].lstrip('.'):
+        return OTHER
+    return EXTENSIONS.get(name[dot:], OTHER)
+
+
+def _decide(bits, type_code):
+    if bits & _SYSTEM:
+        return SYSTEM
+    if bits & (_JUNK | _JUNK_FILE):
+        return JUNK
+    if bits & _USERS and bits & _APPDATA:
+        return APPDATA
+    if bits & _PERSONAL:
+        return PERSONAL
+    return type_code
+
+
+class PathClassifier:
+    """
+    Assigns a safety category code to paths.
+
+    All path patterns are compiled into one regular expression, and file types
+    come from an extension table. A path's folder part is matched once and the
+    result cached per folder, so classifying the files of a folder only matches
+    their names (names are cached too; patterns spanning a separator, like
+    users\\public, are checked against the folder's last component as well).
+    """
+
+    def __init__(self, cache_size=100000):
+        self.cache_size = cache_size
+        self._dirs = {}  # lowercased folder path -> match bits
+        self._names = {}  # lowercased name -> (match bits, extension code)
+
+    def _dir_bits(self, folder):
+        bits = self._dirs.get(folder)
+        if bits is None:
+            bits = _match_bits(folder) & _DIR_BITS
+            if len(self._dirs) >= self.cache_size:
+                self._dirs = {}
+            self._dirs[folder] = bits
+        return bits
+
+    def _name_info(self, name, parent_name):
+        """Match bits and extension code of a lowercased name inside a folder"""
+        info = self._names.get(name)
+        if info is None:
+            bits = _match_bits(name)
+            if _JUNK_FILE_MATCHER.search(name):
+                bits |= _JUNK_FILE
+            info = (bits, _extension_code(name))
+            if len(self._names) >= self.cache_size:
+                self._names = {}
+            self._names[name] = info
+        if parent_name.endswith(_SPAN_HEADS):
+            info = (info[0] | _match_bits(parent_name + '\\' + name), info[1])
+        return info
+
+    def classify(self, path, is_dir=False):
+        """Category code of one path"""
+        path = path.lower()
+        folder, name = os.path.split(path)
+        bits, type_code = self._name_info(name, os.path.basename(folder))
+        if is_dir:
+            bits &= ~_JUNK_FILE
+        return _decide(self._dir_bits(folder) | bits, type_code)
+
+    def classify_many(self, paths):
+        """Category codes of a batch of paths, as an array of bytes"""
+        return array('B', map(self.classify, paths))
+
+    def classify_tree(self, tree):
+        """
+        Category code of every node of a ScanTree, indexed by node. Walks the
+        tree parents first, so each folder's match bits come from its parent's
+        plus its own name; full paths are never built.
+        """
+        n = len(tree)
+        codes = array('B', [OTHER]) * n
+        bits = {0: _match_bits(tree.root_path.lower()) & _DIR_BITS}
+        lowered = {0: os.path.basename(tree.root_path.rstrip('\\/')).lower()}
+        flags = tree.flags
+        codes[0] = _decide(bits[0], OTHER)
+        name_info = self._name_info
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            parent_bits = bits.pop(node)
+            parent_name = lowered.pop(node)
+            for child in tree.child_nodes(node):
+                if child >= n:
+                    continue  # Added after the tree was sized
+                name = tree.name(child).lower()
+                name_bits, type_code = name_info(name, parent_name)
+                if flags[child] & FLAG_DIR:
+                    name_bits &= ~_JUNK_FILE
+                child_bits = parent_bits | name_bits
+                codes[child] = _decide(child_bits, type_code)
+                if flags[child] & FLAG_DIR:
+                    bits[child] = child_bits & _DIR_BITS
+                    lowered[child] = name
+                    stack.append(child)
+        return codes
+
+    def node_category(self, tree, node):
+        """Category of a scan node, from the scan's precomputed codes when available"""
+        codes = tree.category
+        if node < len(codes):
+            return codes[node]
+        return self.classify(tree.path(node), tree.is_dir(node))
@@ -0,0 +1,175 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+from core.app_data import user_data_dir
+from core.file_types import TypeBreakdown
+from core.scan_spill import ScanSpill, keep_largest
+from core.scan_tree import ScanTree, FLAG_DIR
+
+MAGIC = "VOCKPT3"
+DEFAULT_CHECKPOINT_DIR = os.path.join(user_data_dir(), 'checkpoints')
+
+
+def checkpoint_path(root, directory=DEFAULT_CHECKPOINT_DIR):
+    """Checkpoint file of a scan root, one per drive"""
+    drive = "".join(c for c in root if c.isalnum()) or "root"
+    return os.path.join(directory, f"{drive}.ckpt.gz")
+
+
+class ScanCheckpoint:
+    """
+    Journal of the folder listings of a running scan, for resuming it later.
+
+    The walker records every listing with the node its children block starts
+    at; the records are appended to the file every few seconds as one more
+    gzip member, so writing a checkpoint costs only the listings since the
+    last one. A crash can at worst cut the last member short, which loses
+    those listings and nothing else.
+
+    Blocks are numbered in the order they were added to the tree, so
+    replaying the records by start node rebuilds the exact same node table,
+    subtotals included. Every folder without a record is part of the frontier
+    that still has to be listed. Listings read back from a checkpoint are as
+    old as the checkpoint; folders changed since keep their old contents.
+
+    Listings are recorded in full. With keep_files (the walker's
+    external-memory mode) they are split again while replaying, so a
+    checkpoint only resumes a scan made with the same keep_files.
+    """
+
+    def __init__(self, path, root, keep_files=None):
+        self.path = path
+        self.root = root
+        self.keep_files = keep_files
+        self.lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._records = []
+
+    def header(self):
+        """The checkpoint's header dict, or None if there is no usable checkpoint of this root"""
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8', errors='surrogatepass') as f:
+                first = f.read(4096).split("\0", 1)[0]
+            magic, header = first.split("/", 1)
+            header = json.loads(header)
+        except (OSError, EOFError, ValueError):
+            return None
+        if magic != MAGIC or header.get('root') != self.root or header.get('keep_files') != self.keep_files:
+            return None
+        return header
+
+    def start(self):
+        """Starts a new checkpoint, replacing any previous one"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        header = {'root': self.root, 'created': time.time(), 'keep_files': self.keep_files}
+        with self._write_lock:
+            with gzip.open(self.path, 'wt', encoding='utf-8', errors='surrogatepass', compresslevel=1) as f:
+                f.write(f"{MAGIC}/{json.dumps(header)}\0")
+
+    def record(self, parent, start, files, dirs, error=False):
+        """Queues one listing (thread-safe); files: [(name, size, mtime, atime)], dirs: [(name, path)]"""
+        fields = [str(start), str(parent), "1" if error else "0", str(len(dirs))]
+        fields.extend(name for name, path in dirs)
+        for name, size, mtime, atime in files:
+            fields.append(str(size))
+            fields.append(str(mtime))
+            fields.append(str(atime))
+            fields.append(name)
+        # Names can contain neither '/' nor NUL
+        record = "/".join(fields)
+        with self.lock:
+            self._records.append(record)
+
+    def flush(self):
+        """Appends the queued listings to the file"""
+        with self._write_lock:
+            with self.lock:
+                records, self._records = self._records, []
+            if not records:
+                return
+            with gzip.open(self.path, 'at', encoding='utf-8', errors='surrogatepass', compresslevel=1) as f:
+                f.write("\0".join(records))
+                f.write("\0")
+
+    def discard(self):
+        with self._write_lock:
+            with self.lock:
+                self._records = []
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _iter_records(self):
+        """Raw records of the file, stopping quietly at a cut off end"""
+        carry = b""
+        first = True
+        try:
+            with gzip.open(self.path, 'rb') as f:
+                while True:
+                    # read1() hands out what was decompressed so far, so a
+                    # damaged end only costs the records after the damage
+                    chunk = f.read1(1 << 20)
+                    if not chunk:
+                        break
+                    records = (carry + chunk).split(b"\0")
+                    carry = records.pop()
+                    for record in records:
+                        if first:
+                            first = False
+                            continue  # Header
+                        yield record.decode('utf-8', 'surrogatepass')
+        except (OSError, EOFError):
+            return  # Written while the app was killed
+
+    def load(self, top_n=1000, collect_types=True, spill_dir=None):
+        """
+        Rebuilds the partial scan; returns (tree, frontier) with frontier the
+        [(path, node)] folders still to be listed, or None without a usable
+        checkpoint.
+        """
+        if self.header() is None:
+            return None
+        listings = []
+        for record in self._iter_records():
+            fields = record.split("/")
+            listings.append((int(fields[0]), fields))
+        listings.sort(key=lambda listing: listing[0])
+
+        tree = ScanTree(self.root, top_n=top_n)
+        if self.keep_files is not None:
+            tree.spill = ScanSpill(spill_dir)
+        types = TypeBreakdown() if collect_types else None
+        listed = bytearray(1)
+        for start, fields in listings:
+            parent = int(fields[1])
+            if parent >= len(tree) or listed[parent]:
+                break
+            dir_count = int(fields[3])
+            dirs = [(name, None) for name in fields[4:4 + dir_count]]
+            rest = fields[4 + dir_count:]
+            files = [(rest[i + 3], int(rest[i]), int(rest[i + 1]), int(rest[i + 2])) for i in range(0, len(rest), 4)]
+            if (dirs or files) and start != len(tree):
+                break  # A block before this one was never written
+            if fields[2] == "1":
+                tree.mark_error(parent)
+            omitted = ()
+            if self.keep_files is not None:
+                files, omitted = keep_largest(files, self.keep_files)
+            tree.add_children(parent, files, dirs, omitted)
+            if types is not None:
+                if files:
+                    types.add_files(files, start + dir_count)
+                if omitted:
+                    types.add_files(omitted, None)
+            listed.extend(bytes(len(dirs) + len(files)))
+            listed[parent] = 1
+        tree.types = types
+
+        flags = tree.flags
+        frontier = [(tree.path(node), node) for node in range(len(tree))
+                    if flags[node] & FLAG_DIR and not listed[node]]
+        return tree, frontier
@@ -0,0 +1,217 @@
+import heapq
+import json
+import mmap
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from core.file_types import TypeBreakdown
+from core.scan_tree import ScanTree, FLAG_DIR, FLAG_ERROR, FLAG_DELETED
+
+MAGIC = b"VOSCAN1\n"
+_PREFIX = struct.Struct('<QQ')  # header offset, header length
+CHUNK = 16 * 1024 * 1024
+
+# Node table columns: (ScanTree attribute, array typecode)
+COLUMNS = [
+    ('parent', 'i'),
+    ('size', 'q'),
+    ('mtime', 'q'),
+    ('atime', 'q'),
+    ('flags', 'B'),
+    ('child_start', 'i'),
+    ('child_count', 'i'),
+    ('category', 'B'),
+    ('_name_off', 'q'),
+    ('_pool', 'B'),
+]
+
+
+def _write_column(f, column, compress):
+    """Writes one column 8-byte aligned; returns its entry for the header"""
+    f.write(bytes(-f.tell() % 8))
+    offset = f.tell()
+    data = memoryview(column).cast('B')
+    if compress:
+        packer = zlib.compressobj(1)
+        for start in range(0, len(data), CHUNK):
+            f.write(packer.compress(data[start:start + CHUNK]))
+        f.write(packer.flush())
+    else:
+        f.write(data)
+    return {'offset': offset, 'length': f.tell() - offset, 'raw': len(data), 'compressed': compress}
+
+
+def export_scan(tree, path, compress=True):
+    """
+    Writes a finished ScanTree to a columnar file: the node table columns
+    as they are in memory (parent indexes, sizes, times, flags, name offsets
+    and the name pool), then a JSON header with the scan's metadata and
+    where each column starts.
+
+    Compressed columns (zlib, fast level) make a file several times smaller
+    for moving to another machine; uncompressed ones are used in place by
+    import_scan() through a memory map, which is the fastest to load.
+    Files left out by a large volume scan keep only their counts.
+    """
+    # Holding the lock keeps live updates from growing the arrays while they are written
+    with tree._lock:
+        n = len(tree)
+        omitted = sorted(tree.omitted.items())
+        columns = [(name, typecode, getattr(tree, name)) for name, typecode in COLUMNS]
+        columns += [
+            ('top', 'i', array('i', sorted(node for size, node in tree._top_files))),
+            ('omitted_node', 'i', array('i', (node for node, (count, size) in omitted))),
+            ('omitted_count', 'q', array('q', (count for node, (count, size) in omitted))),
+            ('omitted_bytes', 'q', array('q', (size for node, (count, size) in omitted))),
+        ]
+        header = {
+            'root': tree.root_path,
+            'created': time.time(),
+            'count': n,
+            'dir_count': tree.dir_count,
+            'top_n': tree.top_n,
+            'multi_root': tree.multi_root,
+            'removed': tree.removed,
+            'byteorder': sys.byteorder,
+            'extra': [[parent, nodes] for parent, nodes in tree._extra.items()],
+            'types': tree.types.extensions if tree.types is not None else None,
+            'columns': {},
+        }
+        with open(path, 'wb') as f:
+            f.write(MAGIC + _PREFIX.pack(0, 0))
+            for name, typecode, column in columns:
+                if name == 'category' and len(column) != n:
+                    continue  # Not classified
+                entry = _write_column(f, column, compress)
+                entry['type'] = typecode
+                header['columns'][name] = entry
+            data = json.dumps(header).encode('utf-8')
+            offset = f.tell()
+            f.write(data)
+            f.seek(len(MAGIC))
+            f.write(_PREFIX.pack(offset, len(data)))
+    return path
+
+
+def read_export_header(path):
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + _PREFIX.size)
+        if len(prefix) < len(MAGIC) + _PREFIX.size or not prefix.startswith(MAGIC):
+            raise ValueError(f"Not an exported scan: {path}")
+        offset, length = _PREFIX.unpack_from(prefix, len(MAGIC))
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+
+def _read_column(data, entry, swap):
+    view = data[entry['offset']:entry['offset'] + entry['length']]
+    if entry['compressed']:
+        raw = bytearray(entry['raw'])
+        unpacker = zlib.decompressobj()
+        position = 0
+        for start in range(0, len(view), CHUNK):
+            chunk = unpacker.decompress(view[start:start + CHUNK])
+            raw[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        chunk = unpacker.flush()
+        raw[position:position + len(chunk)] = chunk
+        view = memoryview(raw)
+    if swap:
+        column = array(entry['type'])
+        column.frombytes(view)
+        column.byteswap()
+        return column
+    return view.cast(entry['type'])
+
+
+def import_scan(path):
+    """
+    Loads a file written by export_scan() as a finished ScanTree.
+
+    The file is memory-mapped copy-on-write: uncompressed columns become the
+    tree's arrays without being read or copied, so only the pages the views
+    touch are ever loaded, and marking nodes deleted never writes to the
+    file. Compressed columns are inflated into memory. The tree's source is
+    set to the file, as its paths belong to the machine that was scanned.
+    """
+    header = read_export_header(path)
+    with open(path, 'rb') as f:
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+    swap = header['byteorder'] != sys.byteorder
+    columns = {name: _read_column(data, entry, swap) for name, entry in header['columns'].items()}
+
+    tree = ScanTree(header['root'], header['top_n'])
+    for name, typecode in COLUMNS:
+        if name in columns:
+            setattr(tree, name, columns[name])
+    size = tree.size
+    tree._top_files = [(size[node], node) for node in columns['top']]
+    heapq.heapify(tree._top_files)
+    tree.omitted = {node: (count, total) for node, count, total in
+                    zip(columns['omitted_node'], columns['omitted_count'], columns['omitted_bytes'])}
+    for parent, nodes in header['extra']:
+        tree._extra[parent] = nodes
+        for i, node in enumerate(nodes):
+            tree._extra_slot[node] = tree.child_count[parent] + i
+    if header['types'] is not None:
+        tree.types = TypeBreakdown()
+        tree.types.extensions = header['types']
+    tree.dir_count = header['dir_count']
+    tree.multi_root = header['multi_root']
+    tree.removed = header['removed']
+    tree.source = path
+    tree.finalize()
+    return tree
+
+
+def export_ncdu(tree, path):
+    """
+    Writes a finished ScanTree in ncdu's JSON export format, so the result
+    can be browsed with `ncdu -f` or any tool that reads it. Files a large
+    volume scan left out are written from its spill file while it is still
+    open; otherwise only their bytes are missing from the export.
+    """
+    flags = tree.flags
+    size = tree.size
+    mtime = tree.mtime
+
+    def entry(node):
+        info = {'name': tree.name(node)}
+        flag = flags[node]
+        if flag & FLAG_DIR:
+            if flag & FLAG_ERROR:
+                info['read_error'] = True
+        else:
+            info['asize'] = info['dsize'] = size[node]
+            info['mtime'] = mtime[node]
+        return json.dumps(info)
+
+    def listing(node):
+        for child in tree.child_nodes(node):
+            if not flags[child] & FLAG_DELETED:
+                yield child
+        for name, fsize, fmtime, fatime in tree.omitted_files(node):
+            yield json.dumps({'name': name, 'asize': fsize, 'dsize': fsize, 'mtime': fmtime})
+
+    meta = {'progname': "vision-optimizer", 'progver': "1.0", 'timestamp': int(time.time())}
+    with open(path, 'w', encoding='ascii') as f:
+        # A folder is [info, children...], a file is its info object
+        f.write(f"[1,2,{json.dumps(meta)},\n[{entry(0)}")
+        stack = [listing(0)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                f.write("]")
+            elif isinstance(child, str):
+                f.write(",\n" + child)
+            elif flags[child] & FLAG_DIR:
+                f.write(f",\n[{entry(child)}")
+                stack.append(listing(child))
+            else:
+                f.write(",\n" + entry(child))
+        f.write("]\n")
+    return path
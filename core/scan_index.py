@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import threading
+from array import array
+
+from core.app_data import user_data_dir
+from core.disk_scanner import list_directory
+
+DEFAULT_INDEX_PATH = os.path.join(user_data_dir(), 'scan_index.db')
+
+
+class ScanIndex:
+    """
+    Persistent SQLite index of directory listings.
+
+    Each row keeps one directory's mtime, file names, file sizes, file mtimes,
+    file atimes and subdirectory names. A rescan stats every directory but only re-lists the ones whose mtime
+    changed; everything else is rebuilt from the cached listing.
+
+    A directory's mtime only changes when entries are added, removed or
+    renamed, not when a file grows or is rewritten in place, so only the
+    names are taken from a cached listing: its files are stat'ed again and
+    rows whose sizes or mtimes changed are written back.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            file_names TEXT NOT NULL,
+            file_sizes BLOB NOT NULL,
+            dir_names TEXT NOT NULL,
+            file_mtimes BLOB NOT NULL DEFAULT x'',
+            file_atimes BLOB NOT NULL DEFAULT x''
+        )
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = db_path
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(dirs)")}
+        for column in ('file_mtimes', 'file_atimes'):
+            if column not in columns:
+                # Rows from before file times were kept are re-listed once
+                self.conn.execute(f"ALTER TABLE dirs ADD COLUMN {column} BLOB NOT NULL DEFAULT x''")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.reused = 0
+        self.relisted = 0
+        self._updates = []
+        self._removed = []
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def lookup(self, path):
+        """Returns (mtime_ns, files, dirs) from the index, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT mtime_ns, file_names, file_sizes, file_mtimes, file_atimes, dir_names FROM dirs WHERE path = ?",
+                (path,)).fetchone()
+        if row is None:
+            return None
+        mtime_ns, file_names, file_sizes, file_mtimes, file_atimes, dir_names = row
+        files = self._unpack_files(file_names, file_sizes, file_mtimes, file_atimes)
+        if files is None:
+            return None
+        return mtime_ns, files, self._unpack_dirs(path, dir_names)
+
+    def list_directory(self, path, log=None):
+        """Drop-in replacement for disk_scanner.list_directory backed by the index"""
+        mtime_ns = os.stat(path).st_mtime_ns
+        cached = self.lookup(path)
+        if cached is not None and cached[0] == mtime_ns:
+            files, changed = self._restat(path, cached[1])
+            with self.lock:
+                self.reused += 1
+                if changed:
+                    self._updates.append((path, mtime_ns, *self._pack_files(files),
+                                          '\0'.join(d[0] for d in cached[2])))
+            return files, cached[2]
+
+        files, dirs = list_directory(path, log)
+
+        # Subdirectories that vanished take their whole cached subtree with them
+        removed = []
+        if cached is not None:
+            current = {dname for dname, _ in dirs}
+            removed = [dpath for dname, dpath in cached[2] if dname not in current]
+
+        names, sizes, mtimes, atimes = self._pack_files(files)
+        with self.lock:
+            self._removed.extend(removed)
+            self.relisted += 1
+            self._updates.append((path, mtime_ns, names, sizes, mtimes, atimes, '\0'.join(d[0] for d in dirs)))
+        return files, dirs
+
+    def flush(self):
+        """Writes the listings collected during a scan in one transaction"""
+        with self.lock:
+            with self.conn:
+                for dpath in self._removed:
+                    prefix = dpath.rstrip('\\/') + os.sep
+                    self.conn.execute(
+                        "DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                        (dpath, len(prefix), prefix))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO dirs (path, mtime_ns, file_names, file_sizes, file_mtimes, file_atimes, "
+                    "dir_names) VALUES (?, ?, ?, ?, ?, ?, ?)", self._updates)
+            self._updates = []
+            self._removed = []
+
+    @staticmethod
+    def _restat(path, files):
+        """Current sizes and times of a cached listing's files; returns (files, whether a size or mtime changed)"""
+        join = os.path.join
+        fresh = []
+        changed = False
+        for entry in files:
+            name = entry[0]
+            try:
+                st = os.stat(join(path, name), follow_symlinks=False)
+            except OSError:
+                fresh.append(entry)  # Unreadable now, keep what was listed
+                continue
+            current = (name, st.st_size, int(st.st_mtime), int(st.st_atime))
+            if current[1] != entry[1] or current[2] != entry[2]:
+                changed = True
+            fresh.append(current)
+        return fresh, changed
+
+    @staticmethod
+    def _pack_files(files):
+        names = '\0'.join(f[0] for f in files)
+        sizes = array('q', (f[1] for f in files)).tobytes()
+        mtimes = array('q', (f[2] for f in files)).tobytes()
+        atimes = array('q', (f[3] for f in files)).tobytes()
+        return names, sizes, mtimes, atimes
+
+    @staticmethod
+    def _unpack_files(file_names, file_sizes, file_mtimes, file_atimes):
+        """[(name, size, mtime, atime)], or None for a row written without file times"""
+        if not file_names:
+            return []
+        sizes = array('q')
+        sizes.frombytes(file_sizes)
+        mtimes = array('q')
+        mtimes.frombytes(file_mtimes)
+        atimes = array('q')
+        atimes.frombytes(file_atimes)
+        if len(mtimes) != len(sizes) or len(atimes) != len(sizes):
+            return None
+        return list(zip(file_names.split('\0'), sizes, mtimes, atimes))
+
+    @staticmethod
+    def _unpack_dirs(path, dir_names):
+        if not dir_names:
+            return []
+        join = os.path.join
+        return [(name, join(path, name)) for name in dir_names.split('\0')]
@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+
+class ScanLogger:
+    """
+    Asynchronous buffered log writer for the scanners.
+
+    Callers only pay for a level check and a non-blocking queue put; a background
+    thread drains the bounded queue in batches into a file it keeps open, and
+    rotates it (scan_log.txt -> scan_log.txt.1 ...) once it exceeds max_bytes.
+    When the queue is full, messages are dropped and counted instead of stalling
+    the traversal.
+
+    Hot paths should check debug_enabled before building a debug message, so
+    the disabled debug path costs a single attribute read.
+    """
+
+    def __init__(self, path, level=INFO, max_bytes=5 * 1024 * 1024, backup_count=2,
+                 queue_size=10000, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.level = level
+        self.debug_enabled = level <= DEBUG
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def log(self, level, message):
+        if level < self.level or self._closed:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, message):
+        self.log(DEBUG, message)
+
+    def info(self, message):
+        self.log(INFO, message)
+
+    def warning(self, message):
+        self.log(WARNING, message)
+
+    def error(self, message):
+        self.log(ERROR, message)
+
+    def close(self):
+        """Flushes everything queued so far and stops the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _open(self):
+        try:
+            return open(self.path, "a", encoding="utf-8")
+        except OSError:
+            return None
+
+    def _rotate(self, f):
+        f.close()
+        try:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            if self.backup_count > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        except OSError:
+            pass
+        return self._open()
+
+    def _writer(self):
+        f = self._open()
+        done = False
+        while not done:
+            try:
+                message = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if message is None:
+                    done = True
+                    break
+                batch.append(message)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if done and self.dropped:
+                batch.append(f"[LOG] Dropped {self.dropped} messages (queue full)")
+            if f is None or not batch:
+                continue
+            try:
+                f.write("\n".join(batch) + "\n")
+                f.flush()
+                if self.max_bytes and f.tell() >= self.max_bytes:
+                    f = self._rotate(f)
+            except OSError:
+                pass
+
+        if f is not None:
+            f.close()
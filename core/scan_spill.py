@@ -0,0 +1,102 @@
+import heapq
+import os
+import struct
+import tempfile
+import threading
+
+_ENTRY = struct.Struct('<qqqH')  # size, mtime, atime, name length
+
+
+def keep_largest(files, keep):
+    """Splits a listing into its keep largest files and the rest: (kept, omitted)"""
+    if len(files) <= keep:
+        return files, []
+    kept = heapq.nlargest(keep, files, key=lambda f: f[1])
+    threshold = kept[-1][1] if kept else None
+    omitted = []
+    ties = sum(1 for f in kept if f[1] == threshold)
+    for f in files:
+        size = f[1]
+        if threshold is None or size < threshold:
+            omitted.append(f)
+        elif size == threshold:
+            # nlargest keeps the first ties in listing order, the later ones go
+            if ties:
+                ties -= 1
+            else:
+                omitted.append(f)
+    return kept, omitted
+
+
+class ScanSpill:
+    """
+    Temporary file holding the files left out of the node table when a scan
+    keeps only the largest files of every folder (external-memory mode).
+
+    Each folder's left-out files are written as one block as soon as its
+    listing completes; only the block's offset stays in memory, so memory
+    grows with the number of folders that overflowed, not with the number of
+    files. The folder sizes in the tree already include these files; the
+    block is read back only when someone asks for the full listing.
+
+    The file is deleted when the spill is closed or garbage collected.
+    """
+
+    def __init__(self, directory=None):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.TemporaryFile(prefix="vision_spill_", dir=directory)
+        self._lock = threading.Lock()
+        self._blocks = {}  # node -> (offset, length)
+        self._end = 0
+        self.files = 0
+
+    def write(self, node, files):
+        """Stores the left-out files [(name, size, mtime, atime)] of one folder (thread-safe)"""
+        parts = []
+        for name, size, mtime, atime in files:
+            encoded = name.encode('utf-8', 'surrogatepass')
+            parts.append(_ENTRY.pack(size, mtime, atime, len(encoded)))
+            parts.append(encoded)
+        data = b"".join(parts)
+        with self._lock:
+            self._file.seek(self._end)
+            self._file.write(data)
+            self._blocks[node] = (self._end, len(data))
+            self._end += len(data)
+            self.files += len(files)
+
+    def read(self, node):
+        """The left-out files of one folder, [] if it had none"""
+        with self._lock:
+            block = self._blocks.get(node)
+            if block is None:
+                return []
+            offset, length = block
+            self._file.seek(offset)
+            data = self._file.read(length)
+        return self._decode(data)
+
+    def __iter__(self):
+        """(node, files) for every folder with left-out files"""
+        for node in list(self._blocks):
+            yield node, self.read(node)
+
+    def __len__(self):
+        return len(self._blocks)
+
+    @staticmethod
+    def _decode(data):
+        files = []
+        pos = 0
+        size_of = _ENTRY.size
+        while pos < len(data):
+            size, mtime, atime, length = _ENTRY.unpack_from(data, pos)
+            pos += size_of
+            files.append((data[pos:pos + length].decode('utf-8', 'surrogatepass'), size, mtime, atime))
+            pos += length
+        return files
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,319 @@
+import heapq
+import os
+import threading
+from array import array
+
+FLAG_DIR = 1
+FLAG_ERROR = 2  # Directory could not be opened
+FLAG_DELETED = 4  # Removed from disk after the scan
+
+
+class ScanTree:
+    """
+    Compact node table for disk scan results.
+
+    Every file and folder is one row in a set of parallel arrays (parent index,
+    size, modification and access time, flags, name offset). Names live once in a shared UTF-8 pool and full
+    paths are rebuilt on demand by walking up the parent column. The children of
+    a folder are appended together when it is listed, so they occupy one
+    contiguous block [child_start, child_start + child_count) and always have
+    higher indices than their parent.
+
+    Folder sizes are running subtotals: each listing's file bytes are added to
+    every ancestor as soon as it arrives, so partial results can be read while
+    the scan is still going.
+
+    The top_n largest files are kept in a bounded min-heap while listings
+    arrive, so the whole-drive "largest items" list needs no sorting at all.
+
+    Entries that appear after their folder was listed (live updates) cannot
+    join its block; they are appended at the end of the table and tracked as
+    the folder's extra children. child_nodes() and slot() cover both.
+
+    In external-memory mode the walker keeps only the largest files of a big
+    folder as nodes; the rest are counted in the folder's size and in
+    omitted, and their records go to a ScanSpill on disk (see
+    omitted_files()).
+
+    Node 0 is the scan root; its name is the root path itself. A scan of
+    several drives has a virtual root instead (see add_roots()), with the
+    drives as its children, named by their full root paths.
+    """
+
+    def __init__(self, root_path, top_n=1000):
+        self.root_path = root_path
+        self.top_n = top_n
+        self._top_files = []  # Min-heap of (size, node)
+        self.parent = array('i')
+        self.size = array('q')
+        self.mtime = array('q')  # Whole seconds since the epoch, 0 for folders
+        self.atime = array('q')  # Last access, same unit; only as fresh as the file system keeps it
+        self.flags = array('B')
+        self.child_start = array('i')
+        self.child_count = array('i')
+        self._sorted = {}  # folder -> children largest first, sorted on first access after finalize()
+        self.category = array('B')  # Safety category per node, filled by PathClassifier.classify_tree()
+        self.types = None  # TypeBreakdown, filled by the walker
+        self.ages = None  # AgeHistogram, filled by the scan worker
+        self._name_off = array('q', [0])
+        self._pool = bytearray()
+        self._lock = threading.Lock()
+        self._extra = {}  # parent -> [nodes added after the folder was listed]
+        self._extra_slot = {}  # extra node -> position among its parent's children
+        self._name_index = {}  # parent -> {name: node}, built on first find() below it
+        self.dir_count = 0
+        self.finalized = False
+        self.multi_root = False  # Node 0 is a label over several drives
+        self.removed = 0  # Nodes marked deleted
+        self.omitted = {}  # folder -> (count, bytes) of files left out of the table
+        self.spill = None  # ScanSpill with the left-out files, if they were kept
+        self.source = None  # Exported scan file this tree was imported from (see scan_export)
+        self._append(-1, root_path, 0, FLAG_DIR)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _append(self, parent, name, size, flags, mtime=0, atime=0):
+        self.parent.append(parent)
+        self.size.append(size)
+        self.mtime.append(mtime)
+        self.atime.append(atime)
+        self.flags.append(flags)
+        self.child_start.append(0)
+        self.child_count.append(0)
+        self._pool += name.encode('utf-8', 'surrogatepass')
+        self._name_off.append(len(self._pool))
+        if flags & FLAG_DIR:
+            self.dir_count += 1
+
+    def add_children(self, parent, files, dirs, omitted=()):
+        """
+        Appends the listing of one folder (thread-safe).
+        files: [(name, size, mtime, atime)], dirs: [(name, path)].
+        omitted: further files that only count towards the sizes.
+        Returns [(path, node)] for the subfolders, ready to be walked.
+        """
+        with self._lock:
+            start = len(self.parent)
+            for dname, dpath in dirs:
+                self._append(parent, dname, 0, FLAG_DIR)
+            node = len(self.parent)
+            heap = self._top_files
+            for fname, fsize, fmtime, fatime in files:
+                self._append(parent, fname, fsize, 0, fmtime, fatime)
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, (fsize, node))
+                elif fsize > heap[0][0]:
+                    heapq.heapreplace(heap, (fsize, node))
+                node += 1
+            self.child_start[parent] = start
+            self.child_count[parent] = len(dirs) + len(files)
+            self._name_index.pop(parent, None)
+
+            file_total = sum(f[1] for f in files)
+            if omitted:
+                omitted_total = sum(f[1] for f in omitted)
+                self.omitted[parent] = (len(omitted), omitted_total)
+                file_total += omitted_total
+            if file_total:
+                self._propagate(parent, file_total)
+        if omitted and self.spill is not None:
+            self.spill.write(parent, omitted)
+        return [(dpath, start + i) for i, (dname, dpath) in enumerate(dirs)]
+
+    def omitted_files(self, node):
+        """Files of a folder that were left out of the table, [] if unknown or none"""
+        if self.spill is None or node not in self.omitted:
+            return []
+        return self.spill.read(node)
+
+    def add_roots(self, paths):
+        """Makes node 0 a virtual root over several drives; returns their nodes"""
+        self.multi_root = True
+        return [node for path, node in self.add_children(0, [], [(path, path) for path in paths])]
+
+    def add_entry(self, parent, name, size, is_dir, mtime=0, atime=0):
+        """Adds one file or folder to an already listed folder (thread-safe), returns its node"""
+        with self._lock:
+            node = len(self.parent)
+            self._append(parent, name, size, FLAG_DIR if is_dir else 0, mtime, atime)
+            extra = self._extra.setdefault(parent, [])
+            self._extra_slot[node] = self.child_count[parent] + len(extra)
+            extra.append(node)
+            self._sorted.pop(parent, None)
+            names = self._name_index.get(parent)
+            if names is not None:
+                names[name] = node
+            if not is_dir:
+                heap = self._top_files
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, (size, node))
+                elif size > heap[0][0]:
+                    heapq.heapreplace(heap, (size, node))
+            self._propagate(parent, size)
+        return node
+
+    def set_size(self, node, size, mtime=None, atime=None):
+        """Changes a file's size (and times) and applies the difference to every ancestor"""
+        with self._lock:
+            if mtime is not None:
+                self.mtime[node] = mtime
+            if atime is not None:
+                self.atime[node] = atime
+            delta = size - self.size[node]
+            if delta:
+                self.size[node] = size
+                self._propagate(self.parent[node], delta)
+                heap = self._top_files
+                if delta > 0 and all(n != node for s, n in heap):
+                    if len(heap) < self.top_n:
+                        heapq.heappush(heap, (size, node))
+                    elif size > heap[0][0]:
+                        heapq.heapreplace(heap, (size, node))
+
+    def _propagate(self, node, delta):
+        size = self.size
+        parents = self.parent
+        while node >= 0:
+            size[node] += delta
+            node = parents[node]
+
+    def mark_error(self, node):
+        with self._lock:
+            self.flags[node] |= FLAG_ERROR
+
+    def remove(self, node):
+        """Marks a node deleted and subtracts its size from every ancestor"""
+        with self._lock:
+            self._propagate(self.parent[node], -self.size[node])
+            self.size[node] = 0
+            self.flags[node] |= FLAG_DELETED
+            self.removed += 1
+            # Every ancestor shrank, so its place among its siblings may change
+            while node > 0:
+                node = self.parent[node]
+                self._sorted.pop(node, None)
+
+    def alive(self, node):
+        """False if the node or one of its ancestors has been deleted"""
+        while node >= 0:
+            if self.flags[node] & FLAG_DELETED:
+                return False
+            node = self.parent[node]
+        return True
+
+    def finalize(self):
+        """
+        Marks the scan complete. Sizes no longer change by themselves, so a
+        folder's children are sorted once, the first time they are asked for;
+        the folders nobody opens are never sorted at all.
+        """
+        self._sorted = {}
+        self.finalized = True
+
+    def resort(self, nodes):
+        """Forgets the order of the given folders after their sizes changed; sorted again on next access"""
+        for node in nodes:
+            self._sorted.pop(node, None)
+
+    def name(self, node):
+        # str() rather than .decode(): an imported pool is a memoryview
+        return str(self._pool[self._name_off[node]:self._name_off[node + 1]], 'utf-8', 'surrogatepass')
+
+    def path(self, node):
+        parts = []
+        while node > 0:
+            parts.append(self.name(node))
+            node = self.parent[node]
+        parts.append(self.root_path)
+        return os.path.join(*reversed(parts))
+
+    def is_dir(self, node):
+        return bool(self.flags[node] & FLAG_DIR)
+
+    def has_children(self, node):
+        return self.child_count[node] > 0 or node in self._extra
+
+    def child_nodes(self, node):
+        """Child node indices in table order (listing block, then later additions)"""
+        start = self.child_start[node]
+        block = range(start, start + self.child_count[node])
+        extra = self._extra.get(node)
+        return list(block) + extra if extra else block
+
+    def slot(self, node):
+        """Position of a node in its parent's child_nodes()"""
+        slot = self._extra_slot.get(node)
+        if slot is None:
+            slot = node - self.child_start[self.parent[node]]
+        return slot
+
+    def children(self, node, limit=None):
+        """
+        Child node indices, largest first; only the largest limit if given.
+        A limit on a big folder that was not sorted yet selects the top
+        entries without sorting (and caching) the whole folder.
+        """
+        if not self.finalized:
+            nodes = self.live_children(node)
+            return nodes if limit is None else nodes[:limit]
+        nodes = self._sorted.get(node)
+        if nodes is None:
+            if limit is not None and self.child_count[node] > 2 * limit:
+                with self._lock:
+                    return heapq.nlargest(limit, self.child_nodes(node), key=self.size.__getitem__)
+            nodes = array('i', self.live_children(node))
+            self._sorted[node] = nodes
+        return nodes if limit is None else nodes[:limit]
+
+    def live_children(self, node):
+        """Child node indices sorted by their current subtotal, safe to call mid-scan"""
+        with self._lock:
+            return sorted(self.child_nodes(node), key=self.size.__getitem__, reverse=True)
+
+    def largest_files(self):
+        """The top_n largest files, largest first"""
+        with self._lock:
+            # Sizes in the heap may be stale after live updates, sort by the current ones
+            top = sorted((node for size, node in self._top_files), key=self.size.__getitem__, reverse=True)
+        return [node for node in top if self.alive(node)]
+
+    def largest_dirs(self, n=None):
+        """The n largest folders below the root, largest first (one pass, no full sort)"""
+        flags = self.flags
+        dirs = (node for node in range(1, len(self.parent)) if flags[node] & FLAG_DIR)
+        top = heapq.nlargest(n or self.top_n, dirs, key=self.size.__getitem__)
+        return [node for node in top if self.alive(node)]
+
+    def find(self, path):
+        """Returns the node for a path under the root, or -1"""
+        if not self.multi_root:
+            return self._find_below(0, self.root_path, path)
+        for drive in self.child_nodes(0):
+            node = self._find_below(drive, self.name(drive), path)
+            if node >= 0:
+                return node
+        return -1
+
+    def _find_below(self, node, root, path):
+        try:
+            rel = os.path.relpath(path, root)
+        except ValueError:
+            return -1  # On another drive
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return -1
+        if rel == os.curdir:
+            return node
+        for part in rel.split(os.sep):
+            names = self._name_index.get(node)
+            if names is None:
+                with self._lock:
+                    names = {}
+                    for child in self.child_nodes(node):
+                        if not self.flags[child] & FLAG_DELETED:
+                            names[self.name(child)] = child
+                    self._name_index[node] = names
+            node = names.get(part, -1)
+            if node < 0 or self.flags[node] & FLAG_DELETED:
+                return -1
+        return node
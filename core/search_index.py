@@ -0,0 +1,248 @@
+import heapq
+import re
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+
+SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+              'g': 1024 ** 3, 'gb': 1024 ** 3, 't': 1024 ** 4, 'tb': 1024 ** 4}
+DAY = 86400
+
+
+def parse_size(text):
+    """'1.5G', '500 MB', '4096' -> bytes; None for an empty string, ValueError if unreadable"""
+    text = text.strip().lower()
+    if not text:
+        return None
+    match = re.fullmatch(r"([\d.]+)\s*([a-z]*)", text)
+    if not match or match.group(2) not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def glob_to_regex(pattern):
+    """
+    Regex for a glob over one name per line: * and ? never cross a line, so
+    the match stays within one name. [] is taken literally.
+    """
+    parts = []
+    for char in pattern:
+        if char == '*':
+            parts.append('.*')
+        elif char == '?':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return '^' + ''.join(parts) + '$'
+
+
+def _longest_literal(pattern):
+    """Longest run of a glob without wildcards, searched for before matching whole names"""
+    return max(re.split(r"[*?]", pattern), key=len)
+
+
+class SearchIndex:
+    """
+    Secondary indexes over a finished ScanTree, for searching by name, size
+    and age without walking the tree.
+
+    Names are lowercased into one buffer, one name per line, so a search is a
+    single regex pass in C over the buffer; a glob first looks for its longest
+    literal part with bytes.find and only matches the names around each hit.
+    Sizes and modification times are kept as node lists sorted by value, so a
+    range is two binary searches. A query starts from whichever of its ranges
+    is smallest and checks the remaining conditions per node.
+
+    Case-insensitive for ASCII letters. Entries added after the index was
+    built (live updates) are not found until it is rebuilt; deleted ones are
+    skipped.
+    """
+
+    def __init__(self, tree, should_stop=None):
+        self.tree = tree
+        self.built = False
+        should_stop = should_stop or (lambda: False)
+        n = len(tree)
+        self.count = n
+
+        # Name buffer: one lowercased name per line
+        pool = tree._pool
+        offsets = tree._name_off
+        self.names = b"\n".join([pool[offsets[i]:offsets[i + 1]] for i in range(n)]).lower() + b"\n"
+        if should_stop():
+            return
+
+        size = tree.size
+        self.by_size = array('i', sorted(range(n), key=size.__getitem__))
+        self.sizes = array('q', map(size.__getitem__, self.by_size))
+        if should_stop():
+            return
+
+        # Files only: folders have no mtime of their own
+        mtime = tree.mtime
+        flags = tree.flags
+        files = [node for node in range(n) if not flags[node] & FLAG_DIR]
+        files.sort(key=mtime.__getitem__)
+        self.by_mtime = array('i', files)
+        self.mtimes = array('q', map(mtime.__getitem__, files))
+        self.built = True
+
+    def _name_matches(self, pattern, regex):
+        """Nodes whose name matches, in node order"""
+        names = self.names
+        count = names.count
+        if regex:
+            compiled = re.compile(pattern.encode('utf-8', 'surrogatepass'), re.IGNORECASE | re.MULTILINE)
+            hits = self._regex_hits(compiled)
+        else:
+            pattern = pattern.lower()
+            literal = _longest_literal(pattern)
+            if not literal:
+                compiled = re.compile(glob_to_regex(pattern).encode('utf-8', 'surrogatepass'), re.MULTILINE)
+                return [node for node, name in enumerate(names.split(b"\n")[:-1]) if compiled.match(name)]
+            hits = self._glob_hits(pattern, literal)
+
+        # Hits come in buffer order: a node is the number of newlines before its name
+        nodes = []
+        node = 0
+        position = 0
+        for hit in hits:
+            node += count(b"\n", position, hit)
+            position = hit
+            if not nodes or nodes[-1] != node:
+                nodes.append(node)
+        return nodes
+
+    def _regex_hits(self, compiled):
+        """Buffer offsets inside every name a regex matches; a match running into the next name does not count"""
+        names = self.names
+        find = names.find
+        search = compiled.search
+        position = 0
+        while True:
+            match = search(names, position)
+            if match is None:
+                return
+            start = match.start()
+            end = find(b"\n", start)
+            # Crossed a newline: try again within this name only
+            if match.end() <= end or search(names, start, end) is not None:
+                yield start
+            position = end + 1
+
+    def _glob_hits(self, pattern, literal):
+        """Buffer offsets inside every name matching a glob, found through its longest literal part"""
+        names = self.names
+        find = names.find
+        if pattern.strip('*') == literal:
+            # *literal, literal*, *literal* or literal: the literal alone decides
+            needle = literal.encode('utf-8', 'surrogatepass')
+            if not pattern.startswith('*'):
+                needle = b"\n" + needle
+            if not pattern.endswith('*'):
+                needle += b"\n"
+            offset = 0 if pattern.startswith('*') else 1
+            if names.startswith(needle.lstrip(b"\n")) and not pattern.startswith('*'):
+                yield 0
+            position = find(needle)
+            while position >= 0:
+                yield position + offset
+                position = find(needle, position + 1)
+            return
+
+        compiled = re.compile(glob_to_regex(pattern).encode('utf-8', 'surrogatepass'), re.MULTILINE)
+        needle = literal.encode('utf-8', 'surrogatepass')
+        position = find(needle)
+        while position >= 0:
+            start = names.rfind(b"\n", 0, position) + 1
+            end = find(b"\n", position)
+            if compiled.fullmatch(names, start, end):
+                yield start
+            position = find(needle, end)
+
+    def search(self, pattern=None, regex=False, min_size=None, max_size=None,
+               modified_before=None, modified_after=None, kind=None, limit=1000):
+        """
+        Nodes matching every given condition.
+        pattern: glob over the whole name (e.g. '*.iso'), or a regex searched
+        within it with regex=True. Sizes are in bytes, times in seconds since
+        the epoch (only files have one); kind is 'file', 'dir' or None.
+        Returns a dict {'nodes': the largest `limit` matches, largest first,
+        'count': number of matches, 'size': their total bytes, 'seconds'}.
+        Raises re.error for an invalid regex.
+        """
+        started = time.perf_counter()
+        tree = self.tree
+        size = tree.size
+        mtime = tree.mtime
+        flags = tree.flags
+        if pattern and not regex and not pattern.strip('*'):
+            pattern = None  # Matches every name
+        by_age = modified_before is not None or modified_after is not None
+        if by_age:
+            kind = 'file'
+
+        # Candidates from the narrowest range; a name pattern costs one pass over the names
+        size_lo = 0 if min_size is None else bisect_left(self.sizes, min_size)
+        size_hi = len(self.sizes) if max_size is None else bisect_right(self.sizes, max_size)
+        ranges = [(size_hi - size_lo, self.by_size, size_lo, size_hi, 'size')]
+        if by_age:
+            age_lo = 0 if modified_after is None else bisect_left(self.mtimes, modified_after)
+            age_hi = len(self.mtimes) if modified_before is None else bisect_left(self.mtimes, modified_before)
+            ranges.append((age_hi - age_lo, self.by_mtime, age_lo, age_hi, 'age'))
+        count, column, lo, hi, used = min(ranges, key=lambda r: r[0])
+        if pattern and count > len(self.names) // 1000:
+            nodes = self._name_matches(pattern, regex)
+            used = 'name'
+        else:
+            nodes = column[lo:hi] if hi > lo else []
+            if pattern:
+                check = self._name_check(pattern, regex)
+                nodes = [node for node in nodes if check(node)]
+
+        # Remaining conditions, each one pass over what is left
+        limit_n = len(size)
+        nodes = [node for node in nodes if 0 < node < limit_n]
+        if tree.removed:
+            nodes = [node for node in nodes if not flags[node] & FLAG_DELETED and tree.alive(node)]
+        if kind == 'file':
+            nodes = [node for node in nodes if not flags[node] & FLAG_DIR]
+        elif kind == 'dir':
+            nodes = [node for node in nodes if flags[node] & FLAG_DIR]
+        if used != 'size' or tree.removed:
+            if min_size is not None:
+                nodes = [node for node in nodes if size[node] >= min_size]
+            if max_size is not None:
+                nodes = [node for node in nodes if size[node] <= max_size]
+        if used != 'age':
+            if modified_before is not None:
+                nodes = [node for node in nodes if mtime[node] < modified_before]
+            if modified_after is not None:
+                nodes = [node for node in nodes if mtime[node] >= modified_after]
+
+        return {
+            'nodes': heapq.nlargest(limit, nodes, key=size.__getitem__),
+            'count': len(nodes),
+            'size': sum(map(size.__getitem__, nodes)),
+            'seconds': time.perf_counter() - started
+        }
+
+    def _name_check(self, pattern, regex):
+        """
+        Per-node name test, for when a size or age range already narrowed
+        things down. Matches the same lowercased UTF-8 bytes as the name
+        buffer, so both paths fold case alike (ASCII only).
+        """
+        pool = self.tree._pool
+        offsets = self.tree._name_off
+
+        def name(node):
+            return bytes(pool[offsets[node]:offsets[node + 1]]).lower()
+
+        if regex:
+            search = re.compile(pattern.encode('utf-8', 'surrogatepass'), re.IGNORECASE).search
+            return lambda node: search(name(node)) is not None
+        match = re.compile(glob_to_regex(pattern.lower()).encode('utf-8', 'surrogatepass')).match
+        return lambda node: match(name(node)) is not None
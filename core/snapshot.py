@@ -0,0 +1,209 @@
+import gzip
+import json
+import os
+import time
+from array import array
+
+from core.app_data import user_data_dir
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+
+MAGIC = "VOSNAP1"
+DEFAULT_SNAPSHOT_DIR = os.path.join(user_data_dir(), 'snapshots')
+KEEP_SNAPSHOTS = 10  # Per scan root, see prune_snapshots()
+
+
+def iter_tree_records(tree):
+    """
+    Folder records of a finished ScanTree as (depth, name, size), in snapshot
+    order: pre-order with every folder's subfolders sorted by name. That order
+    is the same for any two scans of a drive, so two snapshots can be diffed in
+    one merge pass.
+    """
+    flags = tree.flags
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield depth, tree.name(node), tree.size[node]
+        subdirs = [child for child in tree.child_nodes(node)
+                   if flags[child] & FLAG_DIR and not flags[child] & FLAG_DELETED]
+        subdirs.sort(key=tree.name, reverse=True)
+        stack.extend((child, depth + 1) for child in subdirs)
+
+
+def save_snapshot(tree, path=None, directory=DEFAULT_SNAPSHOT_DIR):
+    """Writes the folder sizes of a finished scan; returns the file path"""
+    if path is None:
+        os.makedirs(directory, exist_ok=True)
+        drive = "".join(c for c in tree.root_path if c.isalnum()) or "root"
+        path = os.path.join(directory, f"{drive}_{time.strftime('%Y%m%d_%H%M%S')}.snap.gz")
+
+    header = {'root': tree.root_path, 'created': time.time(), 'size': tree.size[0]}
+    # Names can contain neither '/' nor NUL, so they make safe separators
+    with gzip.open(path, 'wt', encoding='utf-8', errors='surrogatepass', compresslevel=1) as f:
+        f.write(f"{MAGIC}/{json.dumps(header)}\0")
+        for depth, name, size in iter_tree_records(tree):
+            f.write(f"{depth}/{size}/{name}\0")
+    return path
+
+
+def read_snapshot_header(path):
+    with gzip.open(path, 'rt', encoding='utf-8', errors='surrogatepass') as f:
+        first = f.read(4096).split("\0", 1)[0]
+    magic, header = first.split("/", 1)
+    if magic != MAGIC:
+        raise ValueError(f"Not a scan snapshot: {path}")
+    return json.loads(header)
+
+
+def iter_snapshot(path):
+    """Records (depth, name, size) of a snapshot file, streamed"""
+    with gzip.open(path, 'rt', encoding='utf-8', errors='surrogatepass') as f:
+        carry = ""
+        first = True
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                break
+            records = (carry + chunk).split("\0")
+            carry = records.pop()
+            for record in records:
+                if first:
+                    first = False
+                    if not record.startswith(MAGIC + "/"):
+                        raise ValueError(f"Not a scan snapshot: {path}")
+                    continue
+                depth, size, name = record.split("/", 2)
+                yield int(depth), name, int(size)
+
+
+def list_snapshots(directory=DEFAULT_SNAPSHOT_DIR, root=None):
+    """Snapshot files in a directory, newest first; only those of one scan root if given"""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".snap.gz")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    if root is not None:
+        paths = [path for path in paths if _snapshot_root(path) == root]
+    return paths
+
+
+def _snapshot_root(path):
+    try:
+        return read_snapshot_header(path)['root']
+    except (OSError, ValueError, EOFError, KeyError):
+        return None  # Unreadable, belongs to no root
+
+
+def prune_snapshots(root, keep=KEEP_SNAPSHOTS, directory=DEFAULT_SNAPSHOT_DIR):
+    """Deletes all but the newest keep snapshots of a scan root; returns the deleted paths"""
+    deleted = []
+    for path in list_snapshots(directory, root)[keep:]:
+        try:
+            os.remove(path)
+            deleted.append(path)
+        except OSError:
+            pass
+    return deleted
+
+
+def _keyed(records):
+    """Adds a merge key to snapshot records: the path below the root, joined by NUL"""
+    parts = []
+    for depth, name, size in records:
+        if depth == 0:
+            parts = []
+            yield "", depth, name, size
+            continue
+        del parts[depth - 1:]
+        parts.append(name)
+        yield "\0".join(parts), depth, name, size
+
+
+class SnapshotDiff:
+    """
+    Per-folder size changes between two snapshots.
+
+    Both inputs are streams in snapshot order, so a single merge pass aligns
+    them; no path is ever looked up in a dictionary. The merged stream is the
+    pre-order of the union of both folder trees, which gives each node its
+    parent and sibling links directly. Children are sorted by growth only when
+    first requested.
+    """
+
+    def __init__(self, old_records, new_records):
+        self.parent = array('i')
+        self.old_size = array('q')
+        self.new_size = array('q')
+        self.names = []
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self._sorted = {}
+        self._merge(old_records, new_records)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _merge(self, old_records, new_records):
+        old_it = _keyed(old_records)
+        new_it = _keyed(new_records)
+        a = next(old_it, None)
+        b = next(new_it, None)
+        parent, old_size, new_size = self.parent, self.old_size, self.new_size
+        names, first_child, next_sibling = self.names, self.first_child, self.next_sibling
+        stack = []
+        node = 0
+        while a is not None or b is not None:
+            if b is None or (a is not None and a[0] < b[0]):
+                key, depth, name, old = a
+                new = 0
+                a = next(old_it, None)
+            elif a is None or b[0] < a[0]:
+                key, depth, name, new = b
+                old = 0
+                b = next(new_it, None)
+            else:
+                key, depth, name, old = a
+                new = b[3]
+                a = next(old_it, None)
+                b = next(new_it, None)
+
+            parent.append(stack[depth - 1] if depth else -1)
+            old_size.append(old)
+            new_size.append(new)
+            names.append(name)
+            first_child.append(-1)
+            next_sibling.append(-1)
+            if len(stack) > depth:
+                # The last node seen at this depth is the previous sibling
+                next_sibling[stack[depth]] = node
+                del stack[depth:]
+            elif depth:
+                first_child[stack[depth - 1]] = node
+            stack.append(node)
+            node += 1
+
+    def has_children(self, node):
+        return self.first_child[node] >= 0
+
+    def delta(self, node):
+        return self.new_size[node] - self.old_size[node]
+
+    def children(self, node):
+        """Child nodes, largest growth first"""
+        ordered = self._sorted.get(node)
+        if ordered is None:
+            ordered = []
+            child = self.first_child[node]
+            while child >= 0:
+                ordered.append(child)
+                child = self.next_sibling[child]
+            ordered.sort(key=self.delta, reverse=True)
+            self._sorted[node] = ordered
+        return ordered
+
+    def path(self, node):
+        parts = []
+        while node >= 0:
+            parts.append(self.names[node])
+            node = self.parent[node]
+        return os.path.join(*reversed(parts))
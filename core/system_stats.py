@@ -0,0 +1,83 @@
+import time
+
+import psutil
+
+
+class DiskBusySampler:
+    """
+    Disk utilization: the share of wall time the busiest disk spent on I/O
+    since the previous sample, in percent. Uses busy_time where the platform
+    reports it (Linux), else read_time + write_time (Windows), which counts
+    overlapping requests twice and so is capped at 100.
+    """
+
+    def __init__(self):
+        self.prev = self._busy_ms()
+        self.prev_time = time.time()
+
+    @staticmethod
+    def _busy_ms():
+        try:
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+        except (RuntimeError, OSError):
+            return {}
+        return {disk: getattr(c, 'busy_time', c.read_time + c.write_time) for disk, c in counters.items()}
+
+    def sample(self):
+        current = self._busy_ms()
+        current_time = time.time()
+        elapsed_ms = (current_time - self.prev_time) * 1000
+        busy = 0.0
+        if elapsed_ms > 0:
+            for disk, ms in current.items():
+                delta = ms - self.prev.get(disk, ms)
+                busy = max(busy, min(100.0, 100.0 * delta / elapsed_ms))
+        self.prev = current
+        self.prev_time = current_time
+        return round(busy, 1)
+
+
+class StatsSampler:
+    """
+    Collects one snapshot of CPU, RAM, disk and network stats.
+    Keeps the previous network counters to turn them into per-second rates.
+    Qt-free, shared by SystemMonitor and the headless CLI.
+    """
+
+    def __init__(self, disk_path='C:'):
+        self.disk_path = disk_path
+        self.prev_net = psutil.net_io_counters()
+        self.prev_time = time.time()
+        self.disk_busy = DiskBusySampler()
+
+    def sample(self):
+        current_time = time.time()
+        cpu = psutil.cpu_percent(interval=None)
+        ram = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        # Network Speed Calculation
+        curr_net = psutil.net_io_counters()
+        time_delta = current_time - self.prev_time
+
+        # Avoid division by zero
+        if time_delta == 0:
+            time_delta = 1
+
+        sent_per_sec = (curr_net.bytes_sent - self.prev_net.bytes_sent) / time_delta
+        recv_per_sec = (curr_net.bytes_recv - self.prev_net.bytes_recv) / time_delta
+
+        self.prev_net = curr_net
+        self.prev_time = current_time
+
+        return {
+            'cpu': cpu,
+            'ram_percent': ram.percent,
+            'ram_used': round(ram.used / (1024**3), 1),
+            'ram_total': round(ram.total / (1024**3), 1),
+            'disk_percent': disk.percent,
+            'disk_free': round(disk.free / (1024**3), 1),
+            'disk_busy': self.disk_busy.sample(),  # Utilization of the busiest disk, %
+            'net_sent': sent_per_sec, # Bytes/sec
+            'net_recv': recv_per_sec  # Bytes/sec
+        }
@@ -0,0 +1,99 @@
+import ctypes
+import os
+import platform
+import threading
+import time
+
+from core.system_stats import DiskBusySampler
+
+# Linux ioprio_set(2), which has no libc wrapper
+IOPRIO_WHO_PROCESS = 1  # A thread id works too
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_SYSCALLS = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'armv7l': 314,
+                   'ppc64le': 273, 'riscv64': 30}
+
+# Windows: lowers the calling thread's CPU, I/O and memory priority
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+def lower_thread_priority():
+    """
+    Gives the calling thread the lowest CPU and I/O priority: nice 19 and
+    ionice best-effort level 7 on Linux (not the idle class, which could stall
+    a scan for good on a busy disk), background mode on Windows.
+    Only this thread is affected, so the UI stays responsive.
+    Returns False where this is not supported.
+    """
+    if os.name == 'nt':
+        kernel32 = ctypes.windll.kernel32
+        return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN))
+
+    if platform.system() != 'Linux':
+        return False
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, 19)
+    except OSError:
+        return False
+    syscall = IOPRIO_SYSCALLS.get(platform.machine())
+    if syscall is not None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syscall(syscall, IOPRIO_WHO_PROCESS, tid, (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | 7)
+    return True
+
+
+class BackgroundThrottle:
+    """
+    Paces a scan so it does not compete with the machine's real workload.
+
+    Every directory listing takes a token from a bucket refilled at rate per
+    second (up to burst tokens saved up). Once per check_interval the disk
+    utilization is sampled: while it is above busy_threshold the rate is
+    halved, down to min_rate, and once the disk calms down it grows back by a
+    quarter per check. Shared by all threads of one scan.
+    """
+
+    def __init__(self, rate=200.0, burst=20, busy_threshold=60.0, min_rate=5.0, check_interval=1.0,
+                 sampler=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.busy_threshold = busy_threshold
+        self.min_rate = min_rate
+        self.check_interval = check_interval
+        self.sampler = sampler or DiskBusySampler()
+        self.busy = 0.0  # Last sampled utilization, %
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._next_check = self._last + check_interval
+        self._lock = threading.Lock()
+
+    def enter_thread(self):
+        """Lowers the priority of the calling scan thread"""
+        return lower_thread_priority()
+
+    def wait(self, should_stop=None):
+        """Takes one token, sleeping until there is one; False if should_stop turned true meanwhile"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._adjust()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if should_stop and should_stop():
+                return False
+            time.sleep(min(delay, 0.1))
+
+    def _adjust(self):
+        self.busy = self.sampler.sample()
+        if self.busy > self.busy_threshold:
+            self.rate = max(self.min_rate, self.rate / 2)
+        else:
+            self.rate = min(self.max_rate, self.rate * 1.25)
@@ -0,0 +1,175 @@
+import heapq
+from array import array
+
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+
+
+def squarify(areas, x, y, w, h):
+    """
+    Squarified layout (Bruls, Huizing, van Wijk) of areas, sorted largest
+    first and summing to at most w * h. Returns one (x, y, w, h) per area.
+    Rows are laid along the shorter side and grown while that keeps their
+    worst aspect ratio from getting worse.
+    """
+    rects = []
+    n = len(areas)
+    i = 0
+    while i < n:
+        short = min(w, h)
+        if short <= 0:
+            rects.extend((x, y, 0.0, 0.0) for _ in range(i, n))
+            break
+        short2 = short * short
+        row_sum = row_min = row_max = areas[i]
+        worst = max(short2 * row_max / (row_sum * row_sum), (row_sum * row_sum) / (short2 * row_min)) \
+            if row_sum > 0 else 0.0
+        j = i + 1
+        while j < n:
+            area = areas[j]
+            total = row_sum + area
+            lo = area if area < row_min else row_min
+            hi = area if area > row_max else row_max
+            if lo <= 0:
+                break
+            ratio = max(short2 * hi / (total * total), (total * total) / (short2 * lo))
+            if ratio > worst:
+                break
+            row_sum, row_min, row_max, worst = total, lo, hi, ratio
+            j += 1
+
+        thickness = row_sum / short if short else 0.0
+        if w >= h:
+            # Column along the left edge
+            top = y
+            for k in range(i, j):
+                length = areas[k] / thickness if thickness else 0.0
+                rects.append((x, top, thickness, length))
+                top += length
+            x += thickness
+            w -= thickness
+        else:
+            # Row along the top edge
+            left = x
+            for k in range(i, j):
+                length = areas[k] / thickness if thickness else 0.0
+                rects.append((left, y, length, thickness))
+                left += length
+            y += thickness
+            h -= thickness
+        i = j
+    return rects
+
+
+class TreemapLayout:
+    """
+    Rectangles of a treemap as parallel arrays, one row per laid out node.
+    The rectangles of a folder's children are stored together, so hit tests
+    descend from the root instead of scanning every rectangle.
+    """
+
+    def __init__(self, root, width, height):
+        self.root = root
+        self.width = width
+        self.height = height
+        self.node = array('i')
+        self.x = array('f')
+        self.y = array('f')
+        self.w = array('f')
+        self.h = array('f')
+        self.depth = array('B')
+        self.first_child = array('i')
+        self.child_count = array('i')
+        self.rect_of = {}  # node -> rectangle index, filled by finish()
+
+    def __len__(self):
+        return len(self.node)
+
+    def add(self, node, x, y, w, h, depth):
+        self.node.append(node)
+        self.x.append(x)
+        self.y.append(y)
+        self.w.append(w)
+        self.h.append(h)
+        self.depth.append(min(depth, 255))
+        self.first_child.append(0)
+        self.child_count.append(0)
+        return len(self.node) - 1
+
+    def finish(self):
+        self.rect_of = dict(zip(self.node, range(len(self.node))))
+
+    def hit(self, px, py):
+        """Index of the deepest rectangle containing the point, or -1"""
+        if not len(self.node) or not (0 <= px < self.width and 0 <= py < self.height):
+            return -1
+        xs, ys, ws, hs = self.x, self.y, self.w, self.h
+        rect = 0
+        while True:
+            start = self.first_child[rect]
+            for child in range(start, start + self.child_count[rect]):
+                if xs[child] <= px < xs[child] + ws[child] and ys[child] <= py < ys[child] + hs[child]:
+                    rect = child
+                    break
+            else:
+                return rect
+
+
+def layout_treemap(tree, root, width, height, sizes=None, min_area=6.0, max_rects=250000,
+                   padding=2.0, should_stop=None):
+    """
+    Squarified treemap of the subtree under root, in a width x height area.
+
+    sizes defaults to the scan's sizes (pass a filtered array to lay out one
+    file type). Folders are subdivided largest rectangle first, so when
+    max_rects is reached it is the smallest details that are left out;
+    children below min_area pixels are not drawn and show as their folder's
+    background. Returns a TreemapLayout, or None if stopped.
+    """
+    sizes = tree.size if sizes is None else sizes
+    flags = tree.flags
+    layout = TreemapLayout(root, width, height)
+    layout.add(root, 0.0, 0.0, float(width), float(height), 0)
+    heap = [(-float(width) * height, 0)]
+    while heap and len(layout) < max_rects:
+        if should_stop and should_stop():
+            return None
+        neg_area, rect = heapq.heappop(heap)
+        node = layout.node[rect]
+        if not flags[node] & FLAG_DIR:
+            continue
+
+        x, y, w, h = layout.x[rect], layout.y[rect], layout.w[rect], layout.h[rect]
+        depth = layout.depth[rect]
+        if rect:
+            # Inset nested folders so their outline stays visible
+            if w <= 2 * padding + 1 or h <= 2 * padding + 1:
+                continue
+            x, y, w, h = x + padding, y + padding, w - 2 * padding, h - 2 * padding
+
+        children = [c for c in tree.child_nodes(node) if sizes[c] > 0 and not flags[c] & FLAG_DELETED]
+        if not children:
+            continue
+        children.sort(key=sizes.__getitem__, reverse=True)
+        total = sum(sizes[c] for c in children)
+        scale = w * h / total
+        areas = []
+        for child in children:
+            area = sizes[child] * scale
+            if area < min_area:
+                break
+            areas.append(area)
+        if not areas:
+            continue
+        kept = len(areas)
+        rest = w * h - sum(areas)
+        if rest > 0:
+            areas.append(rest)  # Left out children keep their share of the space
+
+        layout.first_child[rect] = len(layout)
+        layout.child_count[rect] = kept
+        for child, (cx, cy, cw, ch) in zip(children[:kept], squarify(areas, x, y, w, h)):
+            index = layout.add(child, cx, cy, cw, ch, depth + 1)
+            if flags[child] & FLAG_DIR and cw * ch >= 4 * min_area:
+                heapq.heappush(heap, (-cw * ch, index))
+    layout.finish()
+    return layout
@@ -1,4 +1,17 @@
+import os
 import sys
+import multiprocessing
+
+if __name__ == "__main__":
+    # First thing in the frozen .exe: process pool workers (duplicate finder) re-enter main
+    multiprocessing.freeze_support()
+
+    # Headless mode (scan / clean / monitor): dispatch before any Qt import
+    if len(sys.argv) > 1:
+        from core.cli import COMMANDS, main as cli_main
+        if sys.argv[1] in COMMANDS:
+            sys.exit(cli_main(sys.argv[1:]))
+
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QStackedWidget
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon, QPixmap, QPainter, QColor, QCloseEvent
@@ -12,6 +12,7 @@ class ScanWorker(QThread):
         self.finished.emit(junk)
 
 class CleanWorker(QThread):
+    progress = Signal(int, object)  # files deleted, bytes freed so far
     finished = Signal(tuple) # (success, fail, size)
     
     def __init__(self, files):
@@ -19,7 +20,7 @@ class CleanWorker(QThread):
         self.files = files
         
     def run(self):
-        result = JunkCleaner.clean_files(self.files)
+        result = JunkCleaner.clean_files(self.files, on_progress=self.progress.emit)
         self.finished.emit(result)
 
 class CleanerPage(QWidget):
@@ -202,9 +203,13 @@ class CleanerPage(QWidget):
         self.lbl_summary.setText("🗑️ 正在清理垃圾檔案...")
         
         self.clean_worker = CleanWorker(self.scanned_items)
+        self.clean_worker.progress.connect(self.on_clean_progress)
         self.clean_worker.finished.connect(self.on_clean_finished)
         self.clean_worker.start()
         
+    def on_clean_progress(self, files, freed):
+        self.lbl_summary.setText(f"🗑️ 正在清理垃圾檔案... 已刪除 {files} 個檔案，釋放 {round(freed / (1024*1024), 2)} MB")
+        
     def on_clean_finished(self, result):
         success, fail, size = result
         size_mb = round(size / (1024*1024), 2)
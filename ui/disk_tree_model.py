@@ -0,0 +1,341 @@
+import heapq
+from array import array
+
+from PySide6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from core.scan_tree import FLAG_DELETED
+
+OTHER = 1 << 40  # Internal id of a folder's "other" row: OTHER + folder node
+
+
+class DiskTreeModel(QAbstractItemModel):
+    """
+    Virtual tree model backed directly by a ScanTree.
+
+    No per-row objects are created: an index's internal id is the scan node.
+    A folder's rows are materialised only when the view asks for them, as two
+    compact arrays (visible child nodes in sort order, and row position per
+    child), and handed to the view in BATCH-sized chunks via fetchMore.
+    Display text, colors and tooltips are computed in data() for visible rows.
+
+    A folder shows at most its TOP_K largest children of at least MIN_SIZE;
+    everything else (and files a large volume scan left out) is summed up in
+    one last "other (N items)" row, so huge folders neither need a full sort
+    nor thousands of rows.
+    """
+
+    HEADERS = ["名稱", "大小", "完整路徑"]
+    BATCH = 1000
+    MIN_SIZE = 1024 * 100  # Smaller items go into the "other" row
+    TOP_K = 2000  # Largest children shown per folder, None for all
+    STYLE_CACHE_LIMIT = 20000
+
+    def __init__(self, style_fn, format_size, parent=None):
+        super().__init__(parent)
+        self.style_fn = style_fn  # style_fn(scan_tree, node) -> (icon, QColor, tooltip)
+        self.format_size = format_size
+        self.scan_tree = None
+        self._blocks = {}  # parent node -> (visible child nodes, row per child or -1, (count, bytes) of "other")
+        self._fetched = {}  # parent node -> rows handed to the view so far
+        self._styles = {}
+        self._sizes = None  # Per-node sizes replacing the scan's while a type filter is active
+        self._sort_column = 1
+        self._sort_order = Qt.DescendingOrder
+
+    # --- Data source ---
+
+    def set_tree(self, scan_tree, sizes=None):
+        self.beginResetModel()
+        self.scan_tree = scan_tree
+        self._sizes = sizes
+        self._blocks = {}
+        self._fetched = {}
+        self._styles = {}
+        self.endResetModel()
+
+    def clear(self):
+        self.set_tree(None)
+
+    def set_size_filter(self, sizes):
+        """
+        Shows only what counts towards sizes (an array indexed by node, e.g. the
+        bytes of one file type under each node); None shows everything again.
+        """
+        self.set_tree(self.scan_tree, sizes)
+
+    def size_of(self, node):
+        sizes = self._sizes
+        if sizes is None:
+            return self.scan_tree.size[node]
+        return sizes[node] if node < len(sizes) else 0  # Appeared after the filter was computed
+
+    def node(self, index):
+        """Scan node of an index, 0 for the root and -1 for an "other" row"""
+        if not index.isValid():
+            return 0
+        node = index.internalId()
+        return -1 if node >= OTHER else node
+
+    def index_for_node(self, node, column=0):
+        """Index of a node if its row has been loaded, else an invalid index"""
+        tree = self.scan_tree
+        if tree is None or node <= 0:
+            return QModelIndex()
+        parent = tree.parent[node]
+        block = self._blocks.get(parent)
+        if block is None:
+            return QModelIndex()
+        slot = tree.slot(node)
+        row = block[1][slot] if slot < len(block[1]) else -1  # Added after the block was built
+        if row < 0 or row >= self._fetched[parent]:
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def _index_for_id(self, internal_id, column):
+        """index_for_node() that also finds "other" rows"""
+        if internal_id < OTHER:
+            return self.index_for_node(internal_id, column)
+        folder = internal_id - OTHER
+        block = self._blocks.get(folder)
+        if block is None or block[2] is None or self._fetched[folder] < len(block[0]):
+            return QModelIndex()
+        return self.createIndex(len(block[0]) - 1, column, internal_id)
+
+    def reveal(self, node):
+        """
+        Loads the rows down to a node and returns its index; invalid if the
+        node or one of its ancestors is hidden (too small, filtered out).
+        """
+        tree = self.scan_tree
+        if tree is None or node <= 0:
+            return QModelIndex()
+        chain = []
+        while node > 0:
+            chain.append(node)
+            node = tree.parent[node]
+        parent_index = QModelIndex()
+        for node in reversed(chain):
+            parent = tree.parent[node]
+            positions = self._block(parent)[1]
+            slot = tree.slot(node)
+            row = positions[slot] if slot < len(positions) else -1
+            if row < 0:
+                return QModelIndex()
+            while self._fetched[parent] <= row:
+                self.fetchMore(parent_index)
+            parent_index = self.createIndex(row, 0, node)
+        return parent_index
+
+    def _build_block(self, node):
+        tree = self.scan_tree
+        children = tree.child_nodes(node)
+        size_of = self.size_of
+        flags = tree.flags
+        top_k = self.TOP_K
+
+        # The largest children, sorted lazily by the tree unless a filter changes the sizes
+        if self._sizes is None:
+            ranked = tree.children(node, top_k)
+        elif top_k is not None and len(children) > top_k:
+            ranked = heapq.nlargest(top_k, children, key=size_of)
+        else:
+            ranked = sorted(children, key=size_of, reverse=True)
+        min_size = self.MIN_SIZE
+        nodes = [n for n in ranked if size_of(n) >= min_size and not flags[n] & FLAG_DELETED]
+        if self._sort_column == 0:
+            nodes.sort(key=lambda n: tree.name(n).lower(), reverse=self._sort_order == Qt.DescendingOrder)
+        elif self._sort_order == Qt.AscendingOrder:
+            nodes.reverse()
+
+        # Everything not shown, including files left out of the scan table
+        shown = len(nodes)
+        if self._sizes is None:
+            items = sum(1 for n in children if not flags[n] & FLAG_DELETED) if tree.removed else len(children)
+            items += tree.omitted.get(node, (0, 0))[0]
+        else:
+            items = sum(1 for n in children if size_of(n))
+        other = None
+        if items > shown:
+            other = (items - shown, size_of(node) - sum(map(size_of, nodes)))
+            nodes.append(-1)
+
+        visible = array('i', nodes)
+        positions = array('i', [-1]) * len(children)
+        for row in range(shown):
+            positions[tree.slot(visible[row])] = row
+        return visible, positions, other
+
+    def _block(self, node):
+        block = self._blocks.get(node)
+        if block is None:
+            block = self._build_block(node)
+            self._blocks[node] = block
+            self._fetched[node] = min(self.BATCH, len(block[0]))
+        return block
+
+    def _relayout(self):
+        """Rebuilds every loaded block and moves persistent indexes to their node's new row"""
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        nodes = [(index.internalId(), index.column()) for index in old]
+        for node in list(self._blocks):
+            fetched = self._fetched[node]
+            block = self._build_block(node)
+            self._blocks[node] = block
+            self._fetched[node] = min(max(fetched, self.BATCH), len(block[0]))
+        self._styles = {}
+        self.changePersistentIndexList(old, [self._index_for_id(node, column) for node, column in nodes])
+        self.layoutChanged.emit()
+
+    def refresh(self):
+        """Re-sorts and re-filters loaded folders after sizes changed (streaming, deletion)"""
+        if self.scan_tree is not None:
+            self._relayout()
+
+    def remove_node(self, node):
+        """Drops a deleted node from the view and from its ancestors' sizes"""
+        tree = self.scan_tree
+        index = self.index_for_node(node)
+        if index.isValid():
+            parent = tree.parent[node]
+            self.beginRemoveRows(index.parent(), index.row(), index.row())
+            tree.remove(node)
+            fetched = self._fetched[parent]
+            self._blocks[parent] = self._build_block(parent)
+            self._fetched[parent] = min(fetched - 1, len(self._blocks[parent][0]))
+            self.endRemoveRows()
+        else:
+            tree.remove(node)
+        # Ancestors shrank, which may change their order
+        self.refresh()
+
+    def remove_nodes(self, nodes):
+        """remove_node() for many nodes at once (bulk deletion): one relayout at the end instead of one each"""
+        if len(nodes) == 1:
+            self.remove_node(nodes[0])
+            return
+        for node in nodes:
+            self.scan_tree.remove(node)
+        self.refresh()
+
+    # --- QAbstractItemModel ---
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def rowCount(self, parent=QModelIndex()):
+        if self.scan_tree is None or parent.column() > 0:
+            return 0
+        node = self.node(parent)
+        if node < 0:
+            return 0
+        self._block(node)
+        return self._fetched[node]
+
+    def hasChildren(self, parent=QModelIndex()):
+        if self.scan_tree is None:
+            return False
+        node = self.node(parent)
+        if node < 0 or (self._sizes is not None and not self.size_of(node)):
+            return False
+        return self.scan_tree.is_dir(node) and self.scan_tree.has_children(node)
+
+    def canFetchMore(self, parent):
+        if self.scan_tree is None:
+            return False
+        node = self.node(parent)
+        if node < 0:
+            return False
+        visible = self._block(node)[0]
+        return self._fetched[node] < len(visible)
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        visible = self._block(node)[0]
+        fetched = self._fetched[node]
+        more = min(len(visible), fetched + self.BATCH)
+        if more <= fetched:
+            return
+        self.beginInsertRows(parent, fetched, more - 1)
+        self._fetched[node] = more
+        self.endInsertRows()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        folder = self.node(parent)
+        node = self._block(folder)[0][row]
+        return self.createIndex(row, column, node if node >= 0 else OTHER + folder)
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalId()
+        parent = node - OTHER if node >= OTHER else self.scan_tree.parent[node]
+        return self.index_for_node(parent)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def _style(self, node):
+        style = self._styles.get(node)
+        if style is None:
+            if len(self._styles) > self.STYLE_CACHE_LIMIT:
+                self._styles = {}
+            style = self.style_fn(self.scan_tree, node)
+            self._styles[node] = style
+        return style
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        tree = self.scan_tree
+        node = index.internalId()
+        column = index.column()
+        if node >= OTHER:
+            return self._other_data(node - OTHER, column, role)
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return f"{self._style(node)[0]} {tree.name(node)}"
+            if column == 1:
+                return self.format_size(self.size_of(node))
+            return tree.path(node)
+        if role == Qt.ForegroundRole and column == 0:
+            return self._style(node)[1]
+        if role == Qt.ToolTipRole:
+            if column == 0:
+                return self._style(node)[2]
+            if column == 2:
+                return tree.path(node)
+        if role == Qt.UserRole:
+            return tree.path(node)
+        if role == Qt.UserRole + 1:
+            return tree.is_dir(node)
+        if role == Qt.UserRole + 2:
+            return node
+        return None
+
+    def _other_data(self, folder, column, role):
+        count, size = self._blocks[folder][2]
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return f"📎 其他 ({count:,} 個項目)"
+            if column == 1:
+                return self.format_size(size)
+            return ""
+        if role == Qt.ForegroundRole and column == 0:
+            return QColor("#888")
+        if role == Qt.ToolTipRole and column == 0:
+            return "較小的項目合計，未逐一列出"
+        if role == Qt.UserRole + 2:
+            return -1
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = 1 if column == 1 else 0  # Path order equals name order within a folder
+        self._sort_order = order
+        self.refresh()
@@ -1,141 +1,307 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
-                                 QTreeWidget, QTreeWidgetItem, QHeaderView, QComboBox,
-                                 QFrame, QMenu)
+                                 QTreeWidget, QTreeWidgetItem, QTreeView, QHeaderView, QComboBox,
+                                 QFrame, QMenu, QCheckBox, QTabWidget, QFileDialog, QMessageBox, QLineEdit)
 from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QColor, QAction
 from ui.theme import Theme
+from ui.disk_tree_model import DiskTreeModel
+from ui.treemap_view import TreemapView
+from ui.widgets import CheckableComboBox
+from core.disk_scanner import ParallelWalker, MultiDriveWalker, list_directory, SKIP_DIRS, DEFAULT_WORKERS
+from core.scan_index import ScanIndex
+from core.scan_log import ScanLogger, INFO
+from core.scan_checkpoint import ScanCheckpoint, checkpoint_path
+from core.throttle import BackgroundThrottle
+from core.duplicates import DuplicateFinder
+from core.bulk_delete import BulkDeleter
+from core.fs_watcher import TreeUpdater, create_watcher
+from core.search_index import SearchIndex, parse_size, DAY
+from core.file_ages import AgeHistogram
+from core.file_types import CATEGORIES, CATEGORY_LABELS, category_sizes
+from core.path_classifier import (PathClassifier, SYSTEM, JUNK, APPDATA, PERSONAL, EXECUTABLE,
+                                  TEXT, IMAGE, MEDIA, ARCHIVE, CODE, OTHER)
+from core.scan_export import export_scan, export_ncdu, import_scan, read_export_header
+from core.snapshot import (SnapshotDiff, save_snapshot, iter_snapshot, iter_tree_records,
+                           read_snapshot_header, list_snapshots, prune_snapshots, DEFAULT_SNAPSHOT_DIR)
 import os
+import re
 import string
+import time
 import ctypes
 
 class DiskAnalyzerWorker(QThread):
-    """Fast disk analyzer - single pass algorithm"""
+    """Fast disk analyzer - parallel work-stealing walk, single aggregation pass"""
     progress = Signal(int)
-    finished = Signal(dict, dict)  # folder_sizes, children_map
+    drive_progress = Signal(list)  # [{'root', 'folders', 'size', 'done'}] (several drives)
+    partial = Signal(object)  # ScanTree with running subtotals (streaming mode)
+    finished = Signal(object)  # ScanTree
     
-    SKIP_DIRS = {'$Recycle.Bin', 'System Volume Information', 'Recovery', '$WinREAgent', 
-                 'Config.Msi', '$SysReset'}
+    SKIP_DIRS = SKIP_DIRS
+    MULTI_DRIVE_LABEL = "本機"
+    LARGE_VOLUME_KEEP_FILES = 100  # Files per folder kept in memory in large volume mode
     
-    def __init__(self, drive):
+    def __init__(self, drives, workers=DEFAULT_WORKERS, incremental=True, streaming=False,
+                 log_level=INFO, keep_snapshot=True, resume=False, background=False, large_volume=False):
         super().__init__()
-        self.drive = drive
+        self.drives = drives
+        self.keep_files = self.LARGE_VOLUME_KEEP_FILES if large_volume else None
+        self.resume = resume
+        self.background = background
+        self.workers = workers
+        self.incremental = incremental
+        self.streaming = streaming
+        self.keep_snapshot = keep_snapshot
+        self.snapshot_path = None
         self.running = True
-        # Create/Clear log file
         self.log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scan_log.txt')
-        with open(self.log_path, "w", encoding="utf-8") as f:
-            f.write("Scan Started\n")
-            
-    def log(self, message):
-        try:
-            with open(self.log_path, "a", encoding="utf-8") as f:
-                f.write(message + "\n")
-        except: pass
+        self.log_level = log_level
         
     def stop(self):
         self.running = False
         
     def run(self):
-        root_path = f"{self.drive}\\"
-        folder_sizes = {}
-        children_map = {}  # parent -> [(name, path, size, is_dir)]
-        scan_count = 0
-        
-        # Priority skip list (only skip if we are sure doing so wont miss user data)
-        # We should NOT skip 'Users' or 'Documents and Settings'
-        SKIP_DIRS = {'$Recycle.Bin', 'System Volume Information', 'Recovery', '$WinREAgent', 
-                     'Config.Msi', '$SysReset'}
-        
-        # First pass: Recursively calculate sizes using a safe stack approach
-        # We manually implement walk to ensure we catch hidden items and handle errors gracefully
-        
-        # Stack: (path)
-        stack = [root_path]
-        
-        # Post-process stack for size aggregation: (path, list_of_children_files, list_of_children_dirs)
-        aggregation_stack = []
-        
-        while stack and self.running:
-            current_path = stack.pop()
-            scan_count += 1
-            if scan_count % 1000 == 0:
-                self.progress.emit(scan_count)
-                
+        roots = [f"{drive}\\" for drive in self.drives]
+        logger = ScanLogger(self.log_path, level=self.log_level)
+        logger.info(f"Scan Started: {', '.join(roots)}")
+        
+        # Incremental mode: only re-list directories whose mtime changed
+        index = ScanIndex() if self.incremental else None
+        lister = index.list_directory if index else list_directory
+        throttle = BackgroundThrottle() if self.background else None
+        
+        if len(roots) == 1:
+            tree = self.walk_drive(roots[0], logger, lister, throttle)
+        else:
+            # One walker per physical disk, all drives in one tree
+            walker = MultiDriveWalker(roots, self.MULTI_DRIVE_LABEL, workers=self.workers, log=logger,
+                                      should_stop=lambda: not self.running,
+                                      on_progress=self.drive_progress.emit, lister=lister,
+                                      on_partial=self.partial.emit if self.streaming else None,
+                                      throttle=throttle, keep_files=self.keep_files)
+            tree = walker.run()
+        
+        if index:
+            # Keep partial listings too, they are valid for the next scan
+            logger.info(f"[INDEX] Reused {index.reused} listings, re-listed {index.relisted}")
+            index.flush()
+            index.close()
+            
+        # Safety labels and age buckets for every node, so the UI only formats rows
+        if self.running:
+            tree.category = PathClassifier().classify_tree(tree)
+            tree.ages = AgeHistogram(tree)
+            
+        # Only complete scans are worth comparing against later
+        if self.running and self.keep_snapshot:
             try:
-                files = []
-                dirs = []
-                
-                # Use scandir for performance
-                with os.scandir(current_path) as entries:
-                    for entry in entries:
-                        try:
-                            if entry.is_file(follow_symlinks=False):
-                                size = entry.stat(follow_symlinks=False).st_size
-                                files.append((entry.name, entry.path, size))
-                            elif entry.is_dir(follow_symlinks=False):
-                                # Debug specific paths
-                                if "Desktop" in entry.name or "Users" in entry.name or "Jack_Liu" in entry.name:
-                                    self.log(f"[SCAN] Found interesting folder: {entry.path}")
-                                    
-                                if entry.name not in SKIP_DIRS and not entry.name.startswith('$'):
-                                    dirs.append((entry.name, entry.path))
-                                else:
-                                    self.log(f"[SKIP] Skipping: {entry.path}")
-                        except (PermissionError, OSError) as e:
-                            # Log individual file error but continue scanning directory
-                            # self.log(f"[ERROR] Access denied scanning item {entry.path}: {e}")
-                            continue
-                
-                # Push back to aggregator
-                # self.log(f"[VISIT] Scanned: {current_path} | Found {len(dirs)} subdirs") # Comment out to reduce noise
-                aggregation_stack.append((current_path, files, dirs))
-                
-                # Push children to processing stack
-                for dname, dpath in dirs:
-                    stack.append(dpath)
-                    
-            except (PermissionError, OSError) as e:
-                self.log(f"[ERROR] Failed to open dir {current_path}: {e}")
-                # Only if the DIRECTORY ITSELF cannot be opened do we skip it
-                aggregation_stack.append((current_path, [], []))
-                continue
+                self.snapshot_path = save_snapshot(tree)
+                logger.info(f"[SNAPSHOT] Saved {self.snapshot_path}")
+                for path in prune_snapshots(tree.root_path):
+                    logger.info(f"[SNAPSHOT] Removed old {path}")
+            except OSError as e:
+                logger.warning(f"[SNAPSHOT] Failed to save: {e}")
+        logger.close()
                 
         if not self.running:
             return
-
-        # Second pass: Aggregate sizes from bottom up
-        # aggregation_stack has parents visited before children.
-        # reversing it ensures children are processed before parents.
-        
-        for path, files, dirs in reversed(aggregation_stack):
-            current_size = 0
-            file_items = []
-            dir_items = []
-            
-            # Sum files
-            for fname, fpath, fsize in files:
-                current_size += fsize
-                file_items.append((fname, fpath, fsize, False))
-                
-            # Sum directories
-            for dname, dpath in dirs:
-                dsize = folder_sizes.get(dpath, 0)
-                current_size += dsize
-                dir_items.append((dname, dpath, dsize, True))
-                
-            folder_sizes[path] = current_size
             
-            # Combine and sort for UI
-            all_items = dir_items + file_items
-            all_items.sort(key=lambda x: x[2], reverse=True)
-            children_map[path] = all_items
+        self.finished.emit(tree)
+        
+    def walk_drive(self, root_path, logger, lister, throttle):
+        # Journal the listings, so a stopped or killed scan can pick up where it was
+        checkpoint = ScanCheckpoint(checkpoint_path(root_path), root_path, keep_files=self.keep_files)
+        resume = checkpoint.load() if self.resume else None
+        if resume:
+            logger.info(f"[CHECKPOINT] Resuming with {len(resume[1])} folders left to list")
             
-        self.finished.emit(folder_sizes, children_map)
+        # List every directory on a pool of threads, straight into the node table
+        walker = ParallelWalker(root_path, workers=self.workers, log=logger,
+                                should_stop=lambda: not self.running,
+                                on_progress=self.progress.emit, lister=lister,
+                                on_partial=self.partial.emit if self.streaming else None,
+                                checkpoint=checkpoint, resume=resume, throttle=throttle,
+                                keep_files=self.keep_files)
+        return walker.run()
+
+class DuplicateWorker(QThread):
+    """Runs the staged duplicate finder over a finished scan"""
+    progress = Signal(str, int, int)  # stage, done, total
+    finished = Signal(list)  # [{'size', 'paths', 'reclaimable'}]
+    
+    def __init__(self, scan_tree):
+        super().__init__()
+        self.scan_tree = scan_tree
+        self.running = True
+        
+    def stop(self):
+        self.running = False
+        
+    def run(self):
+        finder = DuplicateFinder(should_stop=lambda: not self.running,
+                                 on_progress=self.progress.emit)
+        groups = finder.find(self.scan_tree)
+        if self.running:
+            self.finished.emit(groups)
+
+class LiveUpdateWorker(QThread):
+    """Keeps a finished scan current by applying file system change notifications"""
+    changed = Signal(int, bool)  # folders changed, events were lost
+    
+    def __init__(self, scan_tree):
+        super().__init__()
+        self.scan_tree = scan_tree
+        self.running = True
+        self.watcher = None
+        
+    def stop(self):
+        self.running = False
+        if self.watcher:
+            self.watcher.stop()
+            
+    def run(self):
+        updater = TreeUpdater(self.scan_tree)
+        
+        def on_changes(paths, overflow):
+            count = updater.apply(paths)
+            if count or overflow:
+                self.changed.emit(count, overflow)
+                
+        # Setting up native watches takes a while on big drives
+        self.watcher = create_watcher(self.scan_tree, on_changes)
+        if not self.running:
+            self.watcher.stop()  # Stopped during setup, run() only cleans up
+        self.watcher.run()
+
+class CategorySizesWorker(QThread):
+    """Computes the bytes of one file type under every folder, for the tree filter"""
+    finished = Signal(str, object)  # category, sizes array
+    
+    def __init__(self, scan_tree, category):
+        super().__init__()
+        self.scan_tree = scan_tree
+        self.category = category
+        
+    def run(self):
+        self.finished.emit(self.category, category_sizes(self.scan_tree, self.category))
+
+class SearchIndexWorker(QThread):
+    """Builds the name/size/age indexes of a finished scan for the search tab"""
+    finished = Signal(object)  # SearchIndex, or None if stopped
+    
+    def __init__(self, scan_tree):
+        super().__init__()
+        self.scan_tree = scan_tree
+        self.running = True
+        
+    def stop(self):
+        self.running = False
+        
+    def run(self):
+        index = SearchIndex(self.scan_tree, should_stop=lambda: not self.running)
+        self.finished.emit(index if index.built else None)
+
+class DeleteWorker(QThread):
+    """Deletes files and folder trees with the bulk deletion engine"""
+    progress = Signal(int, object)  # files deleted, bytes freed so far
+    finished = Signal(dict)  # BulkDeleter.delete() result
+    
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self.running = True
+        
+    def stop(self):
+        self.running = False
+        
+    def run(self):
+        deleter = BulkDeleter(should_stop=lambda: not self.running, on_progress=self.progress.emit)
+        self.finished.emit(deleter.delete(self.paths))
+
+class ScanExportWorker(QThread):
+    """Writes a finished scan to a columnar ('compressed' or 'raw') or ncdu JSON file"""
+    finished = Signal(str)  # Error message, empty on success
+    
+    def __init__(self, scan_tree, path, kind):
+        super().__init__()
+        self.scan_tree = scan_tree
+        self.path = path
+        self.kind = kind
+        
+    def run(self):
+        try:
+            if self.kind == 'ncdu':
+                export_ncdu(self.scan_tree, self.path)
+            else:
+                export_scan(self.scan_tree, self.path, compress=self.kind == 'compressed')
+        except OSError as e:
+            self.finished.emit(str(e))
+            return
+        self.finished.emit("")
+
+class ScanImportWorker(QThread):
+    """Loads an exported scan; its age buckets are counted after it is shown"""
+    loaded = Signal(object)  # ScanTree, or None if the file cannot be read
+    finished = Signal(object)  # AgeHistogram of the loaded scan
+    
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.header = None
+        
+    def run(self):
+        try:
+            self.header = read_export_header(self.path)
+            tree = import_scan(self.path)
+        except (OSError, ValueError, KeyError):
+            self.loaded.emit(None)
+            return
+        self.loaded.emit(tree)
+        # Aged as of the export: the result is a picture of that moment
+        self.finished.emit(AgeHistogram(tree, now=self.header['created']))
+
+class SortableItem(QTreeWidgetItem):
+    """Tree item whose numeric columns sort by the value stored in Qt.UserRole"""
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn()
+        if column == 0:
+            return super().__lt__(other)
+        return self.data(column, Qt.UserRole) < other.data(column, Qt.UserRole)
+
+class SnapshotDiffWorker(QThread):
+    """Diffs a saved snapshot against the current scan in one merge pass"""
+    finished = Signal(object)  # SnapshotDiff, or None on failure
+    
+    def __init__(self, old_path, scan_tree):
+        super().__init__()
+        self.old_path = old_path
+        self.scan_tree = scan_tree
+        
+    def run(self):
+        try:
+            diff = SnapshotDiff(iter_snapshot(self.old_path), iter_tree_records(self.scan_tree))
+        except (OSError, ValueError, EOFError):
+            diff = None
+        self.finished.emit(diff)
 
 class FileScannerPage(QWidget):
+    SAFETY_STYLES = {
+        SYSTEM: ("🔒", "#ff6b6b", "系統檔案，請勿刪除"),
+        JUNK: ("✅", Theme.SUCCESS, "垃圾/暫存檔案 (通常可安全刪除)"),
+        APPDATA: ("⚠️", Theme.WARNING, "應用程式資料，刪除可能導致軟體重設"),
+        PERSONAL: ("📌", Theme.TEXT_PRIMARY, "您的個人檔案 (刪除後系統不會壞，但檔案會消失)"),
+        EXECUTABLE: ("⚙️", Theme.TEXT_SECONDARY, "應用程式/系統檔案"),
+        TEXT: ("📝", Theme.TEXT_SECONDARY, "文字/設定檔"),
+        IMAGE: ("🖼️", Theme.TEXT_PRIMARY, "圖片"),
+        MEDIA: ("🎬", Theme.TEXT_PRIMARY, "影音檔案"),
+        ARCHIVE: ("📦", Theme.TEXT_SECONDARY, "壓縮檔"),
+        CODE: ("💻", Theme.TEXT_PRIMARY, "程式碼"),
+        OTHER: ("❓", Theme.TEXT_SECONDARY, "一般檔案 (請自行確認用途)")
+    }
+    
     def __init__(self):
         super().__init__()
-        self.folder_sizes = {}
-        self.children_map = {}
+        self.classifier = PathClassifier()
+        self.scan_tree = None
         self.drive_root = ""
         
         layout = QVBoxLayout(self)
@@ -182,8 +348,9 @@ class FileScannerPage(QWidget):
         ctrl_layout.setSpacing(15)
         
         ctrl_layout.addWidget(QLabel("磁碟："))
-        self.combo_drive = QComboBox()
-        self.combo_drive.setFixedWidth(80)
+        # Several drives are scanned at once, one walker per physical disk
+        self.combo_drive = CheckableComboBox("選擇磁碟")
+        self.combo_drive.setFixedWidth(160)
         self.combo_drive.setStyleSheet(f"""
             QComboBox {{
                 background-color: {Theme.SURFACE_HOVER};
@@ -197,6 +364,28 @@ class FileScannerPage(QWidget):
         self.populate_drives()
         ctrl_layout.addWidget(self.combo_drive)
         
+        self.chk_incremental = QCheckBox("增量掃描 (沿用上次結果)")
+        self.chk_incremental.setChecked(True)
+        self.chk_incremental.setStyleSheet(f"color: {Theme.TEXT_PRIMARY}; font-size: 14px;")
+        ctrl_layout.addWidget(self.chk_incremental)
+        
+        self.chk_live = QCheckBox("即時更新")
+        self.chk_live.setChecked(True)
+        self.chk_live.setStyleSheet(f"color: {Theme.TEXT_PRIMARY}; font-size: 14px;")
+        self.chk_live.toggled.connect(self.toggle_live_updates)
+        ctrl_layout.addWidget(self.chk_live)
+        
+        self.chk_background = QCheckBox("背景模式")
+        self.chk_background.setToolTip("降低分析的 CPU 與磁碟優先權並限制速度，磁碟忙碌時自動放慢")
+        self.chk_background.setStyleSheet(f"color: {Theme.TEXT_PRIMARY}; font-size: 14px;")
+        ctrl_layout.addWidget(self.chk_background)
+        
+        self.chk_large_volume = QCheckBox("大容量模式")
+        self.chk_large_volume.setToolTip(f"每個資料夾只保留最大的 {DiskAnalyzerWorker.LARGE_VOLUME_KEEP_FILES} 個檔案，"
+                                         "其餘只計入大小並暫存於磁碟，適合數千萬個檔案的磁碟或 NAS")
+        self.chk_large_volume.setStyleSheet(f"color: {Theme.TEXT_PRIMARY}; font-size: 14px;")
+        ctrl_layout.addWidget(self.chk_large_volume)
+        
         ctrl_layout.addStretch()
         
         self.btn_scan = QPushButton("📊 開始分析")
@@ -216,25 +405,81 @@ class FileScannerPage(QWidget):
         self.btn_scan.clicked.connect(self.start_scan)
         ctrl_layout.addWidget(self.btn_scan)
         
+        self.btn_dupes = QPushButton("🔁 尋找重複")
+        self.btn_dupes.setFixedSize(140, 45)
+        self.btn_dupes.setCursor(Qt.PointingHandCursor)
+        self.btn_dupes.setStyleSheet(self.btn_scan.styleSheet().replace(Theme.PRIMARY, Theme.SECONDARY))
+        self.btn_dupes.setEnabled(False)
+        self.btn_dupes.clicked.connect(self.start_duplicates)
+        ctrl_layout.addWidget(self.btn_dupes)
+        
+        self.btn_diff = QPushButton("📈 成長比較")
+        self.btn_diff.setFixedSize(140, 45)
+        self.btn_diff.setCursor(Qt.PointingHandCursor)
+        self.btn_diff.setStyleSheet(self.btn_scan.styleSheet().replace(Theme.PRIMARY, Theme.SECONDARY))
+        self.btn_diff.setEnabled(False)
+        self.btn_diff.clicked.connect(self.start_diff)
+        ctrl_layout.addWidget(self.btn_diff)
+        
+        # Save a finished scan for later or for another machine, or open one
+        self.btn_results = QPushButton("💾 結果檔")
+        self.btn_results.setFixedSize(140, 45)
+        self.btn_results.setCursor(Qt.PointingHandCursor)
+        self.btn_results.setStyleSheet(self.btn_scan.styleSheet().replace(Theme.PRIMARY, Theme.SECONDARY))
+        results_menu = QMenu(self.btn_results)
+        self.action_export = results_menu.addAction("💾 匯出分析結果 (壓縮)")
+        self.action_export.triggered.connect(lambda: self.export_results('compressed'))
+        self.action_export_raw = results_menu.addAction("💾 匯出分析結果 (不壓縮，載入最快)")
+        self.action_export_raw.triggered.connect(lambda: self.export_results('raw'))
+        self.action_export_ncdu = results_menu.addAction("💾 匯出為 ncdu JSON")
+        self.action_export_ncdu.triggered.connect(lambda: self.export_results('ncdu'))
+        results_menu.addSeparator()
+        results_menu.addAction("📂 匯入分析結果").triggered.connect(self.import_results)
+        self.btn_results.setMenu(results_menu)
+        self.set_export_enabled(False)
+        ctrl_layout.addWidget(self.btn_results)
+        
         layout.addWidget(ctrl_frame)
         
         # Status
+        status_layout = QHBoxLayout()
         self.lbl_status = QLabel("📂 選擇磁碟並開始分析")
         self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
-        layout.addWidget(self.lbl_status)
+        status_layout.addWidget(self.lbl_status, 1)
+        
+        # Shown only while a deletion runs
+        self.btn_stop_delete = QPushButton("⏹️ 停止刪除")
+        self.btn_stop_delete.setCursor(Qt.PointingHandCursor)
+        self.btn_stop_delete.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {Theme.SURFACE};
+                color: {Theme.ERROR};
+                border: 1px solid {Theme.ERROR};
+                border-radius: 6px;
+                padding: 4px 12px;
+            }}
+            QPushButton:hover {{ background-color: {Theme.SURFACE_HOVER}; }}
+        """)
+        self.btn_stop_delete.clicked.connect(self.stop_delete)
+        self.btn_stop_delete.hide()
+        status_layout.addWidget(self.btn_stop_delete)
+        layout.addLayout(status_layout)
         
-        # Tree View
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["名稱", "大小", "完整路徑"])
+        # Tree View (virtual model, rows are fetched on demand)
+        self.model = DiskTreeModel(self.node_style, self.format_size, self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(1, Qt.DescendingOrder)
         self.tree.setColumnWidth(0, 400)
         self.tree.setColumnWidth(1, 100)
         self.tree.header().setSectionResizeMode(2, QHeaderView.Stretch)
         self.tree.setAlternatingRowColors(False)  # Disable to avoid color conflicts
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
-        self.tree.itemExpanded.connect(self.on_item_expanded)
-        self.tree.setStyleSheet(f"""
-            QTreeWidget {{
+        tree_style = f"""
+            QTreeView {{
                 background-color: {Theme.SURFACE};
                 border: 1px solid #1f2335;
                 border-radius: 10px;
@@ -248,31 +493,246 @@ class FileScannerPage(QWidget):
                 font-weight: bold;
                 border-bottom: 1px solid #2f334d;
             }}
-            QTreeWidget::item {{
+            QTreeView::item {{
                 padding: 5px;
                 background-color: transparent;
             }}
-            QTreeWidget::item:hover {{
+            QTreeView::item:hover {{
                 background-color: #24283b;
             }}
-            QTreeWidget::item:selected {{
+            QTreeView::item:selected {{
                 background-color: {Theme.PRIMARY};
                 color: #15161e;
             }}
-            QTreeWidget::branch {{
+            QTreeView::branch {{
                 background-color: transparent;
             }}
+        """
+        self.tree.setStyleSheet(tree_style)
+        
+        # Folder panel: type filter above the tree
+        self.folder_panel = QWidget()
+        folder_layout = QVBoxLayout(self.folder_panel)
+        folder_layout.setContentsMargins(0, 10, 0, 0)
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("類型篩選："))
+        self.combo_type = QComboBox()
+        self.combo_type.setFixedWidth(160)
+        self.combo_type.setStyleSheet(self.combo_drive.styleSheet().replace("padding: 10px", "padding: 5px"))
+        self.combo_type.addItem("全部類型", None)
+        for key, label, exts in CATEGORIES:
+            self.combo_type.addItem(label, key)
+        self.combo_type.addItem(CATEGORY_LABELS['other'], 'other')
+        self.combo_type.setEnabled(False)
+        self.combo_type.currentIndexChanged.connect(self.on_type_filter_changed)
+        filter_layout.addWidget(self.combo_type)
+        filter_layout.addStretch()
+        folder_layout.addLayout(filter_layout)
+        folder_layout.addWidget(self.tree)
+        
+        # Largest Items View (flat, straight from the scan's top-N heap)
+        self.largest_panel = QWidget()
+        largest_layout = QVBoxLayout(self.largest_panel)
+        largest_layout.setContentsMargins(0, 10, 0, 0)
+        self.chk_largest_dirs = QCheckBox("包含資料夾")
+        self.chk_largest_dirs.setStyleSheet(f"color: {Theme.TEXT_PRIMARY}; font-size: 14px;")
+        self.chk_largest_dirs.toggled.connect(self.populate_largest)
+        largest_layout.addWidget(self.chk_largest_dirs)
+        
+        self.largest_list = QTreeWidget()
+        self.largest_list.setHeaderLabels(["名稱", "大小", "完整路徑"])
+        self.largest_list.setColumnWidth(0, 400)
+        self.largest_list.setColumnWidth(1, 100)
+        self.largest_list.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.largest_list.setRootIsDecorated(False)
+        self.largest_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.largest_list.customContextMenuRequested.connect(self.show_context_menu)
+        self.largest_list.setStyleSheet(tree_style)
+        largest_layout.addWidget(self.largest_list)
+        
+        # Search View (name glob or regex, size range, age; backed by SearchIndex)
+        self.search_panel = QWidget()
+        search_layout = QVBoxLayout(self.search_panel)
+        search_layout.setContentsMargins(0, 10, 0, 0)
+        search_bar = QHBoxLayout()
+        input_style = f"""
+            QLineEdit {{
+                background-color: {Theme.SURFACE};
+                color: {Theme.TEXT_PRIMARY};
+                border: 1px solid #2f334d;
+                border-radius: 5px;
+                padding: 5px;
+            }}
+        """
+        self.edit_search = QLineEdit()
+        self.edit_search.setPlaceholderText("名稱，例如 *.iso")
+        self.edit_search.setStyleSheet(input_style)
+        self.edit_search.returnPressed.connect(self.run_search)
+        search_bar.addWidget(self.edit_search, 1)
+        self.chk_regex = QCheckBox("正規表示式")
+        self.chk_regex.setStyleSheet(f"color: {Theme.TEXT_PRIMARY}; font-size: 14px;")
+        search_bar.addWidget(self.chk_regex)
+        self.edit_min_size = QLineEdit()
+        self.edit_min_size.setPlaceholderText("最小，例如 100MB")
+        self.edit_min_size.setFixedWidth(130)
+        self.edit_min_size.setStyleSheet(input_style)
+        self.edit_min_size.returnPressed.connect(self.run_search)
+        search_bar.addWidget(self.edit_min_size)
+        self.edit_max_size = QLineEdit()
+        self.edit_max_size.setPlaceholderText("最大")
+        self.edit_max_size.setFixedWidth(100)
+        self.edit_max_size.setStyleSheet(input_style)
+        self.edit_max_size.returnPressed.connect(self.run_search)
+        search_bar.addWidget(self.edit_max_size)
+        self.combo_age = QComboBox()
+        self.combo_age.setStyleSheet(self.combo_type.styleSheet())
+        for label, days in (("不限時間", None), ("超過 30 天未修改", 30),
+                            ("超過 1 年未修改", 365), ("超過 2 年未修改", 730)):
+            self.combo_age.addItem(label, days)
+        search_bar.addWidget(self.combo_age)
+        self.btn_search = QPushButton("🔎 搜尋")
+        self.btn_search.setEnabled(False)
+        self.btn_search.setStyleSheet(self.btn_diff.styleSheet())
+        self.btn_search.clicked.connect(self.run_search)
+        search_bar.addWidget(self.btn_search)
+        search_layout.addLayout(search_bar)
+        
+        self.search_list = QTreeWidget()
+        self.search_list.setHeaderLabels(["名稱", "大小", "完整路徑", "修改時間"])
+        self.search_list.setColumnWidth(0, 400)
+        self.search_list.setColumnWidth(1, 100)
+        self.search_list.setColumnWidth(3, 140)
+        self.search_list.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.search_list.setRootIsDecorated(False)
+        self.search_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.search_list.customContextMenuRequested.connect(self.show_context_menu)
+        self.search_list.setStyleSheet(tree_style)
+        search_layout.addWidget(self.search_list)
+        
+        # Cold Data View (folders ranked by bytes not used for over a year)
+        self.ages_panel = QWidget()
+        ages_layout = QVBoxLayout(self.ages_panel)
+        ages_layout.setContentsMargins(0, 10, 0, 0)
+        self.lbl_ages = QLabel("")
+        self.lbl_ages.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 13px;")
+        self.lbl_ages.setToolTip("依最後修改或存取時間（取較晚者）分類，統計自分析當時")
+        ages_layout.addWidget(self.lbl_ages)
+        
+        self.cold_list = QTreeWidget()
+        self.cold_list.setHeaderLabels(["名稱", "大小", "完整路徑", "冷資料", "佔比"])
+        self.cold_list.setColumnWidth(0, 300)
+        self.cold_list.setColumnWidth(1, 100)
+        self.cold_list.setColumnWidth(3, 100)
+        self.cold_list.setColumnWidth(4, 70)
+        self.cold_list.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.cold_list.setRootIsDecorated(False)
+        self.cold_list.setToolTip("超過 1 年未使用的資料占 80% 以上的資料夾，適合封存")
+        self.cold_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.cold_list.customContextMenuRequested.connect(self.show_context_menu)
+        self.cold_list.setStyleSheet(tree_style)
+        ages_layout.addWidget(self.cold_list)
+        
+        # Duplicates View
+        self.dup_tree = QTreeWidget()
+        self.dup_tree.setHeaderLabels(["名稱", "可回收", "完整路徑"])
+        self.dup_tree.setColumnWidth(0, 400)
+        self.dup_tree.setColumnWidth(1, 100)
+        self.dup_tree.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.dup_tree.setStyleSheet(tree_style)
+        
+        # File Types View (per category, extensions below)
+        self.types_tree = QTreeWidget()
+        self.types_tree.setHeaderLabels(["類型", "檔案數", "大小", "最大檔案"])
+        self.types_tree.setColumnWidth(0, 250)
+        self.types_tree.setColumnWidth(1, 100)
+        self.types_tree.setColumnWidth(2, 100)
+        self.types_tree.header().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.types_tree.setSortingEnabled(True)
+        self.types_tree.sortByColumn(2, Qt.DescendingOrder)
+        self.types_tree.setStyleSheet(tree_style)
+        self.types_tree.setToolTip("雙擊類型可在資料夾檢視中只顯示該類型")
+        self.types_tree.itemDoubleClicked.connect(self.on_type_double_clicked)
+        
+        # Growth View (snapshot diff, children loaded on expand)
+        self.diff_tree = QTreeWidget()
+        self.diff_tree.setHeaderLabels(["名稱", "成長", "之前", "現在", "完整路徑"])
+        self.diff_tree.setColumnWidth(0, 400)
+        for column in (1, 2, 3):
+            self.diff_tree.setColumnWidth(column, 100)
+        self.diff_tree.header().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.diff_tree.setStyleSheet(tree_style)
+        self.diff_tree.itemExpanded.connect(self.on_diff_expanded)
+        
+        # Treemap View (double-click zooms into a folder, right-click zooms out)
+        self.treemap = TreemapView(self.format_size)
+        self.treemap.node_selected.connect(self.on_treemap_selected)
+        self.treemap.root_changed.connect(self.on_treemap_root_changed)
+        self.treemap_panel = QWidget()
+        treemap_layout = QVBoxLayout(self.treemap_panel)
+        treemap_layout.setContentsMargins(0, 10, 0, 0)
+        treemap_bar = QHBoxLayout()
+        self.btn_zoom_out = QPushButton("⬆ 上一層")
+        self.btn_zoom_out.setEnabled(False)
+        self.btn_zoom_out.setStyleSheet(self.btn_diff.styleSheet())
+        self.btn_zoom_out.clicked.connect(self.treemap.zoom_out)
+        treemap_bar.addWidget(self.btn_zoom_out)
+        self.lbl_treemap_root = QLabel("")
+        self.lbl_treemap_root.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 13px;")
+        treemap_bar.addWidget(self.lbl_treemap_root, 1)
+        treemap_layout.addLayout(treemap_bar)
+        treemap_layout.addWidget(self.treemap)
+        self.tree.selectionModel().currentChanged.connect(self.on_tree_current_changed)
+        
+        self.tabs = QTabWidget()
+        self.tabs.setStyleSheet(f"""
+            QTabWidget::pane {{ border: none; }}
+            QTabBar::tab {{
+                background-color: {Theme.SURFACE};
+                color: {Theme.TEXT_SECONDARY};
+                padding: 8px 20px;
+                border-top-left-radius: 8px;
+                border-top-right-radius: 8px;
+                margin-right: 4px;
+            }}
+            QTabBar::tab:selected {{
+                background-color: {Theme.SURFACE_HOVER};
+                color: {Theme.TEXT_PRIMARY};
+                font-weight: bold;
+            }}
         """)
-        layout.addWidget(self.tree)
+        self.tabs.addTab(self.folder_panel, "📁 資料夾")
+        self.tabs.addTab(self.largest_panel, "🏆 最大項目")
+        self.tabs.addTab(self.treemap_panel, "🗺️ 樹狀圖")
+        self.tabs.addTab(self.search_panel, "🔎 搜尋")
+        self.tabs.addTab(self.types_tree, "📊 檔案類型")
+        self.tabs.addTab(self.ages_panel, "🕰️ 冷資料")
+        self.tabs.addTab(self.dup_tree, "🔁 重複檔案")
+        self.tabs.addTab(self.diff_tree, "📈 成長")
+        layout.addWidget(self.tabs)
         
         self.scan_worker = None
+        self.dup_worker = None
+        self.diff_worker = None
+        self.live_worker = None
+        self.type_worker = None
+        self.search_worker = None
+        self.export_worker = None
+        self.import_worker = None
+        self.delete_worker = None
+        self.search_index = None  # SearchIndex of self.scan_tree, None while (re)building
+        self.search_pending = False  # Run the search once the index is built
+        self.diff = None
+        self.diff_header = None
         
     def populate_drives(self):
         bitmask = ctypes.windll.kernel32.GetLogicalDrives()
+        system_drive = os.environ.get('SystemDrive', 'C:').upper()
         for letter in string.ascii_uppercase:
             if bitmask & 1:
-                self.combo_drive.addItem(f"{letter}:")
+                self.combo_drive.addItem(f"{letter}:", checked=f"{letter}:" == system_drive)
             bitmask >>= 1
+        if not self.combo_drive.checked_items() and self.combo_drive.count():
+            self.combo_drive.set_checked(0, True)
             
     def start_scan(self):
         if self.scan_worker and self.scan_worker.isRunning():
@@ -280,163 +740,605 @@ class FileScannerPage(QWidget):
             self.btn_scan.setText("📊 開始分析")
             return
             
-        self.tree.clear()
-        self.folder_sizes = {}
-        self.children_map = {}
+        drives = self.combo_drive.checked_items()
+        if not drives:
+            self.lbl_status.setText("⚠️ 請至少選擇一個磁碟")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+            return
+            
+        self.reset_results()
+        
+        roots = [f"{drive}\\" for drive in drives]
+        self.drive_root = roots[0] if len(roots) == 1 else ""
         
-        drive = self.combo_drive.currentText()
-        self.drive_root = f"{drive}\\"
+        # Offer to continue a scan of this drive that was stopped or interrupted
+        resume = False
+        keep_files = DiskAnalyzerWorker.LARGE_VOLUME_KEEP_FILES if self.chk_large_volume.isChecked() else None
+        header = self.drive_root and ScanCheckpoint(checkpoint_path(self.drive_root), self.drive_root,
+                                                    keep_files=keep_files).header()
+        if header:
+            started = time.strftime('%Y-%m-%d %H:%M', time.localtime(header['created']))
+            reply = QMessageBox.question(self, "繼續分析",
+                                         f"{self.drive_root} 於 {started} 開始的分析尚未完成，要從中斷處繼續嗎？\n\n"
+                                         "選擇「否」將重新分析。",
+                                         QMessageBox.Yes | QMessageBox.No)
+            resume = reply == QMessageBox.Yes
             
         self.btn_scan.setText("⏹️ 停止")
-        self.lbl_status.setText(f"🔍 正在分析 {drive}\\ ...")
+        self.lbl_status.setText(f"🔍 正在分析 {', '.join(roots)} ...")
         self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
         
-        self.scan_worker = DiskAnalyzerWorker(drive)
+        self.scan_worker = DiskAnalyzerWorker(drives, incremental=self.chk_incremental.isChecked(),
+                                              streaming=True, resume=resume,
+                                              background=self.chk_background.isChecked(),
+                                              large_volume=self.chk_large_volume.isChecked())
         self.scan_worker.progress.connect(self.on_progress)
+        self.scan_worker.drive_progress.connect(self.on_drive_progress)
+        self.scan_worker.partial.connect(self.on_partial)
         self.scan_worker.finished.connect(self.on_scan_finished)
         self.scan_worker.start()
         
+    def reset_results(self):
+        """Clear every view and stop the workers of the previous result"""
+        self.stop_live_updates()
+        self.model.clear()
+        self.treemap.set_tree(None)
+        self.largest_list.clear()
+        self.search_list.clear()
+        self.cold_list.clear()
+        self.lbl_ages.setText("")
+        self.stop_search_index()
+        self.btn_search.setEnabled(False)
+        self.types_tree.clear()
+        self.combo_type.blockSignals(True)
+        self.combo_type.setCurrentIndex(0)
+        self.combo_type.blockSignals(False)
+        self.combo_type.setEnabled(False)
+        self.dup_tree.clear()
+        self.diff_tree.clear()
+        self.diff = None
+        self.scan_tree = None
+        self.btn_dupes.setEnabled(False)
+        self.btn_diff.setEnabled(False)
+        self.set_export_enabled(False)
+        if self.dup_worker and self.dup_worker.isRunning():
+            self.dup_worker.stop()
+            
     def on_progress(self, count):
-        self.lbl_status.setText(f"🔍 已掃描 {count} 個資料夾...")
+        total = self.format_size(self.scan_tree.size[0]) if self.scan_tree else "..."
+        self.lbl_status.setText(f"🔍 已掃描 {count} 個資料夾，目前 {total}")
         
-    def on_scan_finished(self, folder_sizes, children_map):
-        self.btn_scan.setText("📊 開始分析")
-        self.folder_sizes = folder_sizes
-        self.children_map = children_map
+    def on_drive_progress(self, drives):
+        parts = []
+        for drive in drives:
+            mark = "✅" if drive['done'] else "🔍"
+            parts.append(f"{mark} {drive['root']} {drive['folders']:,} 個資料夾 {self.format_size(drive['size'])}")
+        self.lbl_status.setText("　".join(parts))
         
-        total_scanned = len(folder_sizes)
+    def on_partial(self, scan_tree):
+        """Show running subtotals for top-level and expanded folders while scanning"""
+        if not (self.scan_worker and self.scan_worker.isRunning()):
+            return  # Late signal after stop/finish
+        if scan_tree is self.model.scan_tree:
+            self.model.refresh()
+        else:
+            self.scan_tree = scan_tree
+            self.model.set_tree(scan_tree)
+        
+    def on_scan_finished(self, scan_tree):
+        self.btn_scan.setText("📊 開始分析")
+        self.scan_tree = scan_tree
         
-        # Calculate total size by summing first level items
-        # The children_map stores items as (name, full_path, size, is_dir)
-        top_level_items = self.children_map.get(self.drive_root, [])
-        total_size = sum(item[2] for item in top_level_items)
+        total_scanned = scan_tree.dir_count
+        total_size = scan_tree.size[0]
         
         self.lbl_status.setText(f"✅ 完成！{total_scanned} 個資料夾，總計 {self.format_size(total_size)}")
         self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
         
-        # Populate root level folders (only direct children of drive)
-        self.populate_children(None, self.drive_root)
+        # Show the final order, keeping whatever the streaming updates expanded
+        if scan_tree is self.model.scan_tree:
+            self.model.refresh()
+        else:
+            self.model.set_tree(scan_tree)
+        self.treemap.set_tree(scan_tree)
+        self.populate_largest()
+        self.populate_types()
+        self.populate_ages()
+        self.combo_type.setEnabled(True)
+        # Duplicates are confirmed by reading the files, which an imported result does not have
+        self.btn_dupes.setEnabled(scan_tree.source is None)
+        self.btn_diff.setEnabled(True)
+        self.btn_search.setEnabled(True)
+        self.set_export_enabled(True)
+        self.build_search_index()
+        self.toggle_live_updates(self.chk_live.isChecked())
+        
+    def toggle_live_updates(self, enabled):
+        self.stop_live_updates()
+        # Watchers follow one root; multi-drive results stay as scanned, and so
+        # do folders whose left-out files the watcher would take for new ones
+        if (enabled and self.scan_tree is not None and self.scan_tree.finalized
+                and not self.scan_tree.multi_root and not self.scan_tree.omitted
+                and self.scan_tree.source is None):
+            self.live_worker = LiveUpdateWorker(self.scan_tree)
+            self.live_worker.setParent(self)
+            self.live_worker.finished.connect(self.live_worker.deleteLater)
+            self.live_worker.changed.connect(self.on_tree_changed)
+            self.live_worker.start()
+            
+    def stop_live_updates(self):
+        if self.live_worker:
+            # Not waiting: setting up watches on a big drive can take a while
+            self.live_worker.changed.disconnect(self.on_tree_changed)
+            self.live_worker.stop()
+            self.live_worker = None
+            
+    def on_tree_changed(self, count, overflow):
+        """Changes on disk were applied to the scan result"""
+        self.model.refresh()
+        self.treemap.invalidate()
+        self.populate_largest()
+        self.search_index = None  # New entries are only found after a rebuild
+        if overflow:
+            self.lbl_status.setText("⚠️ 變更過多，部分結果可能已過時，建議重新分析")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+        else:
+            self.lbl_status.setText(f"🔄 已更新 {count} 個資料夾，總計 {self.format_size(self.scan_tree.size[0])}")
+            self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
+        
+    def set_export_enabled(self, enabled):
+        for action in (self.action_export, self.action_export_raw, self.action_export_ncdu):
+            action.setEnabled(enabled)
+            
+    def export_results(self, kind):
+        """Save the current result as a columnar file ('compressed', 'raw') or as ncdu JSON"""
+        if self.scan_tree is None or (self.export_worker and self.export_worker.isRunning()):
+            return
+        drive = "".join(c for c in self.scan_tree.root_path if c.isalnum()) or "scan"
+        name = f"{drive}_{time.strftime('%Y%m%d_%H%M%S')}"
+        if kind == 'ncdu':
+            path, _ = QFileDialog.getSaveFileName(self, "匯出為 ncdu JSON", f"{name}.json", "ncdu JSON (*.json)")
+        else:
+            path, _ = QFileDialog.getSaveFileName(self, "匯出分析結果", f"{name}.vscan", "分析結果 (*.vscan)")
+        if not path:
+            return
+            
+        self.set_export_enabled(False)
+        self.lbl_status.setText(f"💾 正在匯出至 {path} ...")
+        self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
+        self.export_worker = ScanExportWorker(self.scan_tree, path, kind)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.start()
+        
+    def on_export_finished(self, error):
+        self.set_export_enabled(self.scan_tree is not None)
+        if error:
+            self.lbl_status.setText(f"❌ 匯出失敗：{error}")
+            self.lbl_status.setStyleSheet(f"color: {Theme.ERROR}; font-size: 14px;")
+        else:
+            self.lbl_status.setText(f"💾 已匯出至 {self.export_worker.path}")
+            self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
+            
+    def import_results(self):
+        """Open a result exported here or on another machine, in place of the current one"""
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.lbl_status.setText("⚠️ 請先停止目前的分析")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+            return
+        if self.import_worker and self.import_worker.isRunning():
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "匯入分析結果", "", "分析結果 (*.vscan)")
+        if not path:
+            return
+            
+        self.reset_results()
+        self.drive_root = ""
+        self.lbl_status.setText(f"📂 正在載入 {path} ...")
+        self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
+        self.import_worker = ScanImportWorker(path)
+        self.import_worker.loaded.connect(self.on_import_loaded)
+        self.import_worker.finished.connect(self.on_import_ages)
+        self.import_worker.start()
+        
+    def on_import_loaded(self, scan_tree):
+        if scan_tree is None:
+            self.lbl_status.setText("❌ 無法讀取分析結果檔")
+            self.lbl_status.setStyleSheet(f"color: {Theme.ERROR}; font-size: 14px;")
+            return
+        self.on_scan_finished(scan_tree)
+        exported = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.import_worker.header['created']))
+        self.lbl_status.setText(f"📥 已匯入 {scan_tree.root_path} ({exported} 匯出)，{scan_tree.dir_count} 個資料夾，"
+                                f"總計 {self.format_size(scan_tree.size[0])}")
+        
+    def on_import_ages(self, ages):
+        if ages.tree is self.scan_tree:
+            self.scan_tree.ages = ages
+            self.populate_ages()
+            
+    def on_treemap_selected(self, node):
+        """Show a node clicked in the treemap in the folder tree"""
+        index = self.model.reveal(node)
+        if index.isValid():
+            self.tree.setCurrentIndex(index)
+            self.tree.scrollTo(index)
+            
+    def on_treemap_root_changed(self, node):
+        scan_tree = self.treemap.scan_tree
+        self.btn_zoom_out.setEnabled(scan_tree is not None and node > 0)
+        self.lbl_treemap_root.setText(scan_tree.path(node) if scan_tree is not None else "")
+        
+    def on_tree_current_changed(self, current, previous):
+        node = self.model.node(current)
+        if node < 0:
+            node = self.model.node(current.parent())  # "Other" row: stands for its folder
+        self.treemap.set_selected(node)
+        self.show_age_histogram(node)
         
-    def populate_children(self, parent_item, folder_path):
-        """Add child items to a tree item"""
-        items = self.children_map.get(folder_path, [])
+    def populate_ages(self):
+        """Fill the cold data report from the age buckets counted after the scan"""
+        self.cold_list.clear()
+        scan_tree = self.scan_tree
+        if scan_tree is None or scan_tree.ages is None:
+            return
+        self.show_age_histogram(0)
         
-        for name, fpath, size, is_dir in items:
-            if size < 1024 * 100:  # Skip < 100KB
+        items = []
+        for entry in scan_tree.ages.cold_report():
+            node = entry['node']
+            if not scan_tree.alive(node):
                 continue
-                
             item = QTreeWidgetItem()
+            self.update_item(item, node)
+            item.setText(3, self.format_size(entry['cold']))
+            item.setText(4, f"{entry['share']:.0%}")
+            items.append(item)
+        self.cold_list.addTopLevelItems(items)
+        
+    def show_age_histogram(self, node):
+        scan_tree = self.scan_tree
+        if scan_tree is None or scan_tree.ages is None or node >= scan_tree.ages.count:
+            return  # Added by live updates after the buckets were counted
+        buckets = "・".join(f"{b['label']} {self.format_size(b['size'])}" for b in scan_tree.ages.histogram(node))
+        self.lbl_ages.setText(f"{scan_tree.name(node)}：{buckets}")
+        
+    def populate_largest(self):
+        """Fill the flat largest-items list from the scan's top-N heaps"""
+        self.largest_list.clear()
+        scan_tree = self.scan_tree
+        if scan_tree is None or not scan_tree.finalized:
+            return
             
-            # Get safety info
-            safety_emoji, safety_color, tooltip = self.get_safety_info(fpath, is_dir)
+        nodes = scan_tree.largest_files()
+        if self.chk_largest_dirs.isChecked():
+            nodes = sorted(nodes + scan_tree.largest_dirs(), key=scan_tree.size.__getitem__, reverse=True)
             
-            # Icon based on type and size
-            if is_dir:
-                if self.is_system_path(fpath):
-                    icon = "🔒"
-                    item.setForeground(0, QColor("#666"))
-                elif size > 1024 * 1024 * 1024:  # > 1GB
-                    icon = "📦"
-                    item.setForeground(0, QColor(Theme.ERROR))
-                elif size > 100 * 1024 * 1024:  # > 100MB
-                    icon = "📁"
-                    item.setForeground(0, QColor(Theme.WARNING))
-                else:
-                    icon = "📂"
-                    item.setForeground(0, QColor(Theme.TEXT_PRIMARY))
-            else:
-                # Files: show safety indicator
-                icon = safety_emoji
-                item.setForeground(0, safety_color)
-            
-            item.setText(0, f"{icon} {name}")
-            item.setText(1, self.format_size(size))
-            item.setText(2, fpath)
-            item.setToolTip(0, tooltip)
-            item.setToolTip(2, fpath)
-            item.setData(0, Qt.UserRole, fpath)
-            item.setData(0, Qt.UserRole + 1, is_dir)
-            
-            # Add dummy child for expandable folders
-            if is_dir and fpath in self.children_map and self.children_map[fpath]:
+        items = []
+        for node in nodes[:scan_tree.top_n]:
+            item = QTreeWidgetItem()
+            self.update_item(item, node)
+            items.append(item)
+        self.largest_list.addTopLevelItems(items)
+        
+    def build_search_index(self):
+        self.stop_search_index()
+        self.search_worker = SearchIndexWorker(self.scan_tree)
+        self.search_worker.setParent(self)  # A stopped build may outlive its reference
+        self.search_worker.finished.connect(self.on_search_index_built)
+        self.search_worker.start()
+        
+    def stop_search_index(self):
+        if self.search_worker:
+            self.search_worker.finished.disconnect(self.on_search_index_built)
+            self.search_worker.stop()
+            self.search_worker = None
+        self.search_index = None
+        self.search_pending = False
+        
+    def on_search_index_built(self, index):
+        self.search_worker = None
+        if index is None or index.tree is not self.scan_tree:
+            return
+        self.search_index = index
+        if self.search_pending:
+            self.search_pending = False
+            self.run_search()
+            
+    def run_search(self):
+        """Query the search index with the conditions in the search bar"""
+        if self.scan_tree is None or not self.scan_tree.finalized:
+            return
+        try:
+            min_size = parse_size(self.edit_min_size.text())
+            max_size = parse_size(self.edit_max_size.text())
+        except ValueError:
+            self.lbl_status.setText("⚠️ 無法辨識的大小，請輸入如 500MB、1.5GB")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+            return
+        if self.search_index is None:
+            # Still building, or stale after live updates
+            if self.search_worker is None:
+                self.build_search_index()
+            self.search_pending = True
+            self.lbl_status.setText("🔎 正在建立搜尋索引...")
+            self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
+            return
+            
+        days = self.combo_age.currentData()
+        try:
+            result = self.search_index.search(
+                pattern=self.edit_search.text().strip() or None, regex=self.chk_regex.isChecked(),
+                min_size=min_size, max_size=max_size,
+                modified_before=time.time() - days * DAY if days else None)
+        except re.error as e:
+            self.lbl_status.setText(f"⚠️ 正規表示式錯誤：{e}")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+            return
+            
+        self.search_list.clear()
+        scan_tree = self.scan_tree
+        items = []
+        for node in result['nodes']:
+            item = QTreeWidgetItem()
+            self.update_item(item, node)
+            if not scan_tree.is_dir(node):
+                item.setText(3, time.strftime('%Y-%m-%d %H:%M', time.localtime(scan_tree.mtime[node])))
+            items.append(item)
+        self.search_list.addTopLevelItems(items)
+        
+        shown = f"，顯示最大的 {len(items)} 項" if result['count'] > len(items) else ""
+        self.lbl_status.setText(f"🔎 找到 {result['count']:,} 項，共 {self.format_size(result['size'])}"
+                                f"{shown}（{result['seconds'] * 1000:.0f} 毫秒）")
+        self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
+        
+    def populate_types(self):
+        """Fill the file type breakdown counted during the scan"""
+        self.types_tree.clear()
+        scan_tree = self.scan_tree
+        if scan_tree is None or scan_tree.types is None:
+            return
+            
+        categories = {}
+        for cat in scan_tree.types.by_category():
+            item = self.type_item(cat, cat['label'])
+            item.setData(0, Qt.UserRole + 1, cat['key'])
+            categories[cat['key']] = item
+        for ext in scan_tree.types.by_extension():
+            categories[ext['category']].addChild(self.type_item(ext, ext['key'] or "(無副檔名)"))
+        self.types_tree.addTopLevelItems(list(categories.values()))
+        
+    def type_item(self, stats, label):
+        item = SortableItem()
+        item.setText(0, label)
+        item.setText(1, f"{stats['count']:,}")
+        item.setData(1, Qt.UserRole, stats['count'])
+        item.setText(2, self.format_size(stats['size']))
+        item.setData(2, Qt.UserRole, stats['size'])
+        # No node when the file was left out in large volume mode
+        largest = self.scan_tree.path(stats['largest_node']) if stats['largest_node'] >= 0 else ""
+        item.setText(3, f"{self.format_size(stats['largest'])}  {largest}")
+        item.setData(3, Qt.UserRole, stats['largest'])
+        item.setToolTip(3, largest)
+        return item
+        
+    def on_type_double_clicked(self, item, column):
+        key = item.data(0, Qt.UserRole + 1)
+        if key is None:
+            return  # Extension row
+        self.combo_type.setCurrentIndex(self.combo_type.findData(key))
+        self.tabs.setCurrentWidget(self.folder_panel)
+        
+    def on_type_filter_changed(self, index):
+        if self.scan_tree is None:
+            return
+        category = self.combo_type.itemData(index)
+        if category is None:
+            self.model.set_size_filter(None)
+            self.treemap.set_sizes(None)
+            return
+        self.combo_type.setEnabled(False)
+        self.lbl_status.setText(f"📊 正在篩選 {self.combo_type.itemText(index)}...")
+        self.type_worker = CategorySizesWorker(self.scan_tree, category)
+        self.type_worker.finished.connect(self.on_category_sizes)
+        self.type_worker.start()
+        
+    def on_category_sizes(self, category, sizes):
+        self.combo_type.setEnabled(True)
+        if self.sender().scan_tree is not self.scan_tree or self.combo_type.currentData() != category:
+            return  # Changed or rescanned meanwhile
+        self.model.set_size_filter(sizes)
+        self.treemap.set_sizes(sizes)
+        self.lbl_status.setText(f"📊 {CATEGORY_LABELS[category]}：共 {self.format_size(sizes[0])}")
+        
+    def start_duplicates(self):
+        if self.dup_worker and self.dup_worker.isRunning():
+            self.dup_worker.stop()
+            self.btn_dupes.setText("🔁 尋找重複")
+            return
+            
+        self.dup_tree.clear()
+        self.tabs.setCurrentWidget(self.dup_tree)
+        self.btn_dupes.setText("⏹️ 停止")
+        self.lbl_status.setText("🔁 正在比對重複檔案...")
+        self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
+        
+        self.dup_worker = DuplicateWorker(self.scan_tree)
+        self.dup_worker.progress.connect(self.on_duplicates_progress)
+        self.dup_worker.finished.connect(self.on_duplicates_finished)
+        self.dup_worker.start()
+        
+    def on_duplicates_progress(self, stage, done, total):
+        stage_text = "比對檔頭/檔尾" if stage == "partial" else "完整比對內容"
+        self.lbl_status.setText(f"🔁 {stage_text} {done}/{total}...")
+        
+    def on_duplicates_finished(self, groups):
+        self.btn_dupes.setText("🔁 尋找重複")
+        reclaimable = sum(g['reclaimable'] for g in groups)
+        self.lbl_status.setText(f"✅ 找到 {len(groups)} 組重複檔案，可回收 {self.format_size(reclaimable)}")
+        self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
+        
+        # Only the biggest groups, the rest is rarely worth a look
+        for group in groups[:1000]:
+            paths = group['paths']
+            group_item = QTreeWidgetItem()
+            group_item.setText(0, f"🔁 {os.path.basename(paths[0])} × {len(paths)} ({self.format_size(group['size'])})")
+            group_item.setText(1, self.format_size(group['reclaimable']))
+            group_item.setForeground(1, QColor(Theme.WARNING))
+            for path in paths:
+                child = QTreeWidgetItem()
+                child.setText(0, os.path.basename(path))
+                child.setText(1, self.format_size(group['size']))
+                child.setText(2, path)
+                child.setToolTip(2, path)
+                group_item.addChild(child)
+            self.dup_tree.addTopLevelItem(group_item)
+        
+    def start_diff(self):
+        """Pick an earlier snapshot and show what grew since then"""
+        if self.diff_worker and self.diff_worker.isRunning():
+            return
+        current = self.scan_worker.snapshot_path if self.scan_worker else None
+        # Only snapshots of the same root: C: is never compared against D:
+        earlier = [p for p in list_snapshots(root=self.scan_tree.root_path) if p != current]
+        start = earlier[0] if earlier else DEFAULT_SNAPSHOT_DIR
+        old_path, _ = QFileDialog.getOpenFileName(self, "選擇要比較的快照", start, "掃描快照 (*.snap.gz)")
+        if not old_path:
+            return
+            
+        try:
+            header = read_snapshot_header(old_path)
+        except (OSError, ValueError, EOFError):
+            self.lbl_status.setText("❌ 無法讀取快照")
+            self.lbl_status.setStyleSheet(f"color: {Theme.ERROR}; font-size: 14px;")
+            return
+        if header['root'] != self.scan_tree.root_path:
+            self.lbl_status.setText(f"❌ 此快照屬於 {header['root']}，無法與 {self.scan_tree.root_path} 比較")
+            self.lbl_status.setStyleSheet(f"color: {Theme.ERROR}; font-size: 14px;")
+            return
+        self.diff_header = header
+            
+        self.diff_tree.clear()
+        self.tabs.setCurrentWidget(self.diff_tree)
+        self.btn_diff.setEnabled(False)
+        self.lbl_status.setText("📈 正在比較快照...")
+        self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
+        
+        self.diff_worker = SnapshotDiffWorker(old_path, self.scan_tree)
+        self.diff_worker.finished.connect(self.on_diff_finished)
+        self.diff_worker.start()
+        
+    def on_diff_finished(self, diff):
+        self.btn_diff.setEnabled(self.scan_tree is not None)
+        if diff is None:
+            self.lbl_status.setText("❌ 無法讀取快照")
+            self.lbl_status.setStyleSheet(f"color: {Theme.ERROR}; font-size: 14px;")
+            return
+            
+        self.diff = diff
+        since = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.diff_header['created']))
+        delta = diff.delta(0)
+        sign = "+" if delta >= 0 else "-"
+        self.lbl_status.setText(f"📈 自 {since} 以來 {sign}{self.format_size(abs(delta))}")
+        self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
+        self.add_diff_children(self.diff_tree.invisibleRootItem(), 0)
+        
+    def add_diff_children(self, parent_item, node):
+        """Add a folder's changed children, largest growth first"""
+        diff = self.diff
+        items = []
+        # Only the biggest movers, the rest is rarely worth a look
+        for child in [c for c in diff.children(node) if diff.delta(c)][:500]:
+            delta = diff.delta(child)
+            item = QTreeWidgetItem()
+            item.setText(0, f"{'📈' if delta > 0 else '📉'} {diff.names[child]}")
+            item.setText(1, f"{'+' if delta > 0 else '-'}{self.format_size(abs(delta))}")
+            item.setForeground(1, QColor(Theme.WARNING if delta > 0 else Theme.SUCCESS))
+            item.setText(2, self.format_size(diff.old_size[child]))
+            item.setText(3, self.format_size(diff.new_size[child]))
+            fpath = diff.path(child)
+            item.setText(4, fpath)
+            item.setToolTip(4, fpath)
+            item.setData(0, Qt.UserRole + 2, child)
+            if diff.has_children(child):
                 dummy = QTreeWidgetItem()
                 dummy.setText(0, "載入中...")
                 item.addChild(dummy)
-            
-            if parent_item is None:
-                self.tree.addTopLevelItem(item)
-            else:
-                parent_item.addChild(item)
-                
-    def on_item_expanded(self, item):
-        """Lazy load children when item is expanded"""
-        # Check if it has a dummy child
+            items.append(item)
+        parent_item.addChildren(items)
+        
+    def on_diff_expanded(self, item):
         if item.childCount() == 1 and item.child(0).text(0) == "載入中...":
             item.takeChildren()  # Remove dummy
-            folder_path = item.data(0, Qt.UserRole)
-            self.populate_children(item, folder_path)
+            self.add_diff_children(item, item.data(0, Qt.UserRole + 2))
+        
+    def update_item(self, item, node):
+        """Fill a flat list item from a scan node"""
+        scan_tree = self.scan_tree
+        icon, color, tooltip = self.node_style(scan_tree, node)
+        fpath = scan_tree.path(node)
+        
+        item.setText(0, f"{icon} {scan_tree.name(node)}")
+        item.setForeground(0, color)
+        item.setText(1, self.format_size(scan_tree.size[node]))
+        item.setText(2, fpath)
+        item.setToolTip(0, tooltip)
+        item.setToolTip(2, fpath)
+        item.setData(0, Qt.UserRole, fpath)
+        item.setData(0, Qt.UserRole + 1, scan_tree.is_dir(node))
+        item.setData(0, Qt.UserRole + 2, node)
+        
+    def node_style(self, scan_tree, node):
+        """Return (icon, color, tooltip) for a scan node"""
+        size = scan_tree.size[node]
+        is_dir = scan_tree.is_dir(node)
+        
+        # Get safety info (classified by the scan worker)
+        category = self.classifier.node_category(scan_tree, node)
+        safety_emoji, safety_color, tooltip = self.safety_style(category)
+        
+        # Icon based on type and size
+        if is_dir:
+            if category == SYSTEM:
+                return "🔒", QColor("#666"), tooltip
+            elif size > 1024 * 1024 * 1024:  # > 1GB
+                return "📦", QColor(Theme.ERROR), tooltip
+            elif size > 100 * 1024 * 1024:  # > 100MB
+                return "📁", QColor(Theme.WARNING), tooltip
+            else:
+                return "📂", QColor(Theme.TEXT_PRIMARY), tooltip
+                
+        # Files: show safety indicator
+        return safety_emoji, safety_color, tooltip
             
     def is_system_path(self, path):
         """Check if path is a system/protected location"""
-        path_lower = path.lower()
-        protected = [
-            'windows', 'program files', 'program files (x86)', 'programdata',
-            'users\\default', 'users\\public', 'users\\all users',
-            'boot', 'recovery', 'system volume information',
-            'perflogs', 'intel', 'amd', 'nvidia'
-        ]
-        for p in protected:
-            if p in path_lower:
-                return True
-        return False
+        return self.classifier.classify(path) == SYSTEM
         
     def get_safety_info(self, path, is_dir):
         """Return (emoji, color, tooltip) based on safety"""
-        path_lower = path.lower()
-        name = os.path.basename(path).lower()
-        
-        # Definitely protected
-        if self.is_system_path(path):
-            return ("🔒", QColor("#ff6b6b"), "系統檔案，請勿刪除")
-        
-        # Safe to delete patterns
-        safe_patterns = ['temp', 'tmp', 'cache', 'log', '.log', '.tmp', '.bak', 
-                         'thumbs.db', 'desktop.ini', '.ds_store']
-        if any(p in name for p in safe_patterns):
-            return ("✅", QColor(Theme.SUCCESS), "垃圾/暫存檔案 (通常可安全刪除)")
-        
-        # User folders - be careful
-        if 'users' in path_lower and 'appdata' in path_lower:
-            return ("⚠️", QColor(Theme.WARNING), "應用程式資料，刪除可能導致軟體重設")
-        
-        # Downloads, temp folders
-        if any(x in path_lower for x in ['downloads', 'desktop', 'documents', 'music', 'pictures', 'videos']):
-            return ("📌", QColor(Theme.TEXT_PRIMARY), "您的個人檔案 (刪除後系統不會壞，但檔案會消失)")
-            
-        # Classify by extension
-        ext = os.path.splitext(name)[1].lower()
-        if ext in ['.exe', '.msi', '.dll', '.sys', '.bat', '.cmd']:
-            return ("⚙️", QColor(Theme.TEXT_SECONDARY), "應用程式/系統檔案")
-        elif ext in ['.txt', '.log', '.ini', '.cfg', '.xml', '.json']:
-            return ("📝", QColor(Theme.TEXT_SECONDARY), "文字/設定檔")
-        elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg']:
-            return ("🖼️", QColor(Theme.TEXT_PRIMARY), "圖片")
-        elif ext in ['.mp4', '.avi', '.mov', '.mkv', '.mp3', '.wav', '.flac']:
-            return ("🎬", QColor(Theme.TEXT_PRIMARY), "影音檔案")
-        elif ext in ['.zip', '.rar', '.7z', '.tar', '.gz']:
-            return ("📦", QColor(Theme.TEXT_SECONDARY), "壓縮檔")
-        elif ext in ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.h']:
-            return ("💻", QColor(Theme.TEXT_PRIMARY), "程式碼")
-        
-        return ("❓", QColor(Theme.TEXT_SECONDARY), "一般檔案 (請自行確認用途)")
+        return self.safety_style(self.classifier.classify(path, is_dir))
+        
+    def safety_style(self, category):
+        """Return (emoji, color, tooltip) for a path category code"""
+        emoji, color, tooltip = self.SAFETY_STYLES.get(category, self.SAFETY_STYLES[OTHER])
+        return emoji, QColor(color), tooltip
             
     def show_context_menu(self, pos):
-        item = self.tree.itemAt(pos)
-        if not item:
-            return
+        tree = self.sender()  # Folder tree, largest-items or search list
+        if tree is self.tree:
+            index = self.tree.indexAt(pos)
+            if not index.isValid():
+                return
+            node = self.model.node(index)
+            if node < 0:
+                return  # "Other" row, no single item to act on
+        else:
+            item = tree.itemAt(pos)
+            if not item:
+                return
+            node = item.data(0, Qt.UserRole + 2)
             
-        path = item.data(0, Qt.UserRole)
-        is_dir = item.data(0, Qt.UserRole + 1)
+        path = self.scan_tree.path(node)
+        is_dir = self.scan_tree.is_dir(node)
         
         if not path or not os.path.exists(path):
             return
@@ -471,29 +1373,34 @@ class FileScannerPage(QWidget):
         menu.addSeparator()
         
         # Check if system path
-        is_protected = self.is_system_path(path)
+        is_protected = self.classifier.node_category(self.scan_tree, node) == SYSTEM
         
         if is_protected:
             action_warn = menu.addAction("🔒 系統保護項目，無法刪除")
             action_warn.setEnabled(False)
+        elif self.scan_tree.source is not None:
+            # The result may be from another machine or long out of date
+            action_warn = menu.addAction("📥 匯入的分析結果，無法刪除")
+            action_warn.setEnabled(False)
         else:
             # Delete option
             if is_dir:
                 action_delete = menu.addAction("🗑️ 刪除資料夾")
-                action_delete.triggered.connect(lambda: self.delete_item(item, path, True, False))
+                action_delete.triggered.connect(lambda: self.delete_item(node, path, True, False))
                 
                 action_force = menu.addAction("💀 強制刪除（含子項目）")
-                action_force.triggered.connect(lambda: self.delete_item(item, path, True, True))
+                action_force.triggered.connect(lambda: self.delete_item(node, path, True, True))
             else:
                 action_delete = menu.addAction("🗑️ 刪除檔案")
-                action_delete.triggered.connect(lambda: self.delete_item(item, path, False, False))
+                action_delete.triggered.connect(lambda: self.delete_item(node, path, False, False))
         
-        menu.exec(self.tree.viewport().mapToGlobal(pos))
-        
-    def delete_item(self, item, path, is_dir, force):
-        from PySide6.QtWidgets import QMessageBox
-        import shutil
+        menu.exec(tree.viewport().mapToGlobal(pos))
         
+    def delete_item(self, node, path, is_dir, force):
+        if self.delete_worker and self.delete_worker.isRunning():
+            QMessageBox.information(self, "刪除中", "請等待目前的刪除完成，或先停止它。")
+            return
+            
         name = os.path.basename(path)
         
         if force:
@@ -506,33 +1413,66 @@ class FileScannerPage(QWidget):
         if reply != QMessageBox.Yes:
             return
             
-        try:
-            if is_dir:
-                if force:
-                    shutil.rmtree(path, ignore_errors=True)
+        if is_dir and not force:
+            try:
+                os.rmdir(path)  # Only works if empty
+            except PermissionError:
+                QMessageBox.warning(self, "權限不足", "無法刪除，請確認檔案未被使用中，或以系統管理員身分執行。")
+                return
+            except OSError as e:
+                if "not empty" in str(e).lower() or "目錄不是空的" in str(e):
+                    QMessageBox.warning(self, "資料夾不為空", "資料夾內還有檔案。\n請使用「強制刪除」來刪除整個資料夾。")
                 else:
-                    os.rmdir(path)  # Only works if empty
-            else:
-                os.remove(path)
-                
-            # Remove from tree
-            parent = item.parent()
-            if parent:
-                parent.removeChild(item)
-            else:
-                idx = self.tree.indexOfTopLevelItem(item)
-                self.tree.takeTopLevelItem(idx)
-                
-            self.lbl_status.setText(f"🗑️ 已刪除: {name}")
-            self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
+                    QMessageBox.warning(self, "錯誤", f"無法刪除：{e}")
+                return
+            self.on_delete_finished(self.scan_tree, name, {'files': 0, 'folders': 1, 'freed': 0, 'failed': 0,
+                                                           'errors': [], 'removed': [path], 'stopped': False})
+            return
             
-        except PermissionError:
-            QMessageBox.warning(self, "權限不足", "無法刪除，請確認檔案未被使用中，或以系統管理員身分執行。")
-        except OSError as e:
-            if "not empty" in str(e).lower() or "目錄不是空的" in str(e):
-                QMessageBox.warning(self, "資料夾不為空", "資料夾內還有檔案。\n請使用「強制刪除」來刪除整個資料夾。")
-            else:
-                QMessageBox.warning(self, "錯誤", f"無法刪除：{e}")
+        # Files and whole trees go to worker threads, the window stays responsive
+        self.lbl_status.setText(f"🗑️ 正在刪除 {name} ...")
+        self.lbl_status.setStyleSheet(f"color: {Theme.TEXT_SECONDARY}; font-size: 14px;")
+        self.btn_stop_delete.show()
+        scan_tree = self.scan_tree
+        self.delete_worker = DeleteWorker([path])
+        self.delete_worker.progress.connect(lambda files, freed: self.lbl_status.setText(
+            f"🗑️ 正在刪除 {name}：已刪除 {files:,} 個檔案，釋放 {self.format_size(freed)}"))
+        self.delete_worker.finished.connect(lambda result: self.on_delete_finished(scan_tree, name, result))
+        self.delete_worker.start()
+        
+    def stop_delete(self):
+        if self.delete_worker and self.delete_worker.isRunning():
+            self.delete_worker.stop()
+            self.btn_stop_delete.setEnabled(False)
+            
+    def on_delete_finished(self, scan_tree, name, result):
+        """Take what was deleted out of the scan result, whose sizes shrink in place"""
+        self.btn_stop_delete.hide()
+        self.btn_stop_delete.setEnabled(True)
+        if scan_tree is not None and scan_tree is self.scan_tree:  # Not replaced by a new scan meanwhile
+            nodes = [node for node in map(scan_tree.find, result['removed']) if node > 0]
+            if nodes:
+                self.model.remove_nodes(nodes)
+                self.treemap.invalidate()
+                self.populate_largest()
+                self.populate_ages()
+                if self.search_list.topLevelItemCount():
+                    self.run_search()
+                    
+        freed = self.format_size(result['freed'])
+        if result['stopped']:
+            self.lbl_status.setText(f"⏹️ 已停止刪除 {name}：已刪除 {result['files']:,} 個檔案，釋放 {freed}")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+        elif result['failed']:
+            self.lbl_status.setText(f"⚠️ {name}：已刪除 {result['files']:,} 個檔案，釋放 {freed}，"
+                                    f"{result['failed']:,} 個項目無法刪除")
+            self.lbl_status.setStyleSheet(f"color: {Theme.WARNING}; font-size: 14px;")
+            errors = "\n".join(f"{path}：{error}" for path, error in result['errors'][:5])
+            QMessageBox.warning(self, "部分項目無法刪除",
+                                "請確認檔案未被使用中，或以系統管理員身分執行。\n\n" + errors)
+        else:
+            self.lbl_status.setText(f"🗑️ 已刪除: {name}" + (f"，釋放 {freed}" if result['freed'] else ""))
+            self.lbl_status.setStyleSheet(f"color: {Theme.SUCCESS}; font-size: 14px;")
             
     def format_size(self, size):
         if size < 1024:
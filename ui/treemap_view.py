@@ -0,0 +1,299 @@
+from collections import OrderedDict
+
+from PySide6.QtWidgets import QWidget, QToolTip
+from PySide6.QtCore import Qt, QThread, Signal, QRectF, QTimer
+from PySide6.QtGui import QPainter, QPixmap, QColor, QPen
+
+from ui.theme import Theme
+from core.file_types import category_of, extension
+from core.scan_tree import FLAG_DIR, FLAG_DELETED
+from core.treemap import layout_treemap
+
+
+class TreemapLayoutWorker(QThread):
+    """Computes a treemap layout off the UI thread"""
+    finished = Signal(object, object)  # cache key, TreemapLayout
+
+    def __init__(self, key, scan_tree, root, width, height, sizes):
+        super().__init__()
+        self.key = key
+        self.scan_tree = scan_tree
+        self.root = root
+        self.width = width
+        self.height = height
+        self.sizes = sizes
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        layout = layout_treemap(self.scan_tree, self.root, self.width, self.height, self.sizes,
+                                should_stop=lambda: not self.running)
+        if self.running and layout is not None:
+            self.finished.emit(self.key, layout)
+
+
+class TreemapView(QWidget):
+    """
+    Squarified treemap of a scan, zoomable by folder.
+
+    Layouts are computed on a worker thread and kept per zoom level (root
+    folder, size, type filter), together with a pixmap of all rectangles.
+    Painting only blits that pixmap and outlines the hovered and selected
+    rectangles, so hovering costs a hit test and a partial repaint.
+    """
+
+    node_selected = Signal(int)  # Clicked node
+    root_changed = Signal(int)  # Zoomed into / out of a folder
+
+    CACHE_SIZE = 6
+    CATEGORY_COLORS = {
+        'video': "#f7768e",
+        'audio': "#ff9e64",
+        'image': "#e0af68",
+        'document': "#9ece6a",
+        'archive': "#bb9af7",
+        'disk_image': "#9d7cd8",
+        'executable': "#7aa2f7",
+        'code': "#7dcfff",
+        'build': "#2ac3de",
+        'log': "#73daca",
+        'temp': "#41a6b5",
+        'database': "#db4b4b",
+        'other': "#565f89"
+    }
+
+    def __init__(self, format_size, parent=None):
+        super().__init__(parent)
+        self.format_size = format_size
+        self.setMouseTracking(True)
+        self.setMinimumHeight(200)
+        self.scan_tree = None
+        self.sizes = None
+        self.root = 0
+        self.rects = None
+        self.pixmap = None
+        self.hover = -1  # Rectangle index
+        self.selected_node = -1
+        self._cache = OrderedDict()  # key -> (TreemapLayout, QPixmap or None)
+        self._generation = 0  # Bumped whenever the sizes change, so no older layout matches a key again
+        self._worker = None
+        self._retired = []  # Stopped workers, kept alive until their thread ends
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(150)
+        self._resize_timer.timeout.connect(self.relayout)
+
+    # --- Data ---
+
+    def set_tree(self, scan_tree, sizes=None):
+        self.scan_tree = scan_tree
+        self.sizes = sizes
+        self.root = 0
+        self.invalidate()
+        self.root_changed.emit(self.root)
+
+    def set_sizes(self, sizes):
+        """Lays out a filtered size array (e.g. one file type), None for the scan's sizes"""
+        self.sizes = sizes
+        self._generation += 1
+        self.relayout()
+
+    def set_root(self, node):
+        if self.scan_tree is None or node == self.root or not self.scan_tree.is_dir(node):
+            return
+        self.root = node
+        self.relayout()
+        self.root_changed.emit(self.root)
+
+    def zoom_out(self):
+        if self.scan_tree is not None and self.root > 0:
+            self.set_root(self.scan_tree.parent[self.root])
+
+    def invalidate(self):
+        """Drops every cached layout, e.g. after sizes changed"""
+        self._cache.clear()
+        self._generation += 1
+        tree = self.scan_tree
+        if tree is not None and self.root > 0 and tree.flags[self.root] & FLAG_DELETED:
+            # The zoomed-in folder was deleted: show its closest remaining ancestor
+            while tree.flags[self.root] & FLAG_DELETED:
+                self.root = tree.parent[self.root]
+            self.root_changed.emit(self.root)
+        self.relayout()
+
+    def set_selected(self, node):
+        """Highlights a node (or its nearest drawn ancestor) without emitting node_selected"""
+        self.selected_node = node
+        self.update()
+
+    def _key(self):
+        return (self.root, self.width(), self.height(), self._generation)
+
+    def relayout(self):
+        self.hover = -1
+        self.rects = None
+        self.pixmap = None
+        if self._worker:
+            self._worker.stop()
+            self._retired = [w for w in self._retired if w.isRunning()] + [self._worker]
+            self._worker = None
+        if self.scan_tree is None or self.width() < 10 or self.height() < 10:
+            self.update()
+            return
+
+        key = self._key()
+        cached = self._cache.get(key)
+        if cached:
+            self._cache.move_to_end(key)
+            self.rects, self.pixmap = cached
+        else:
+            self._worker = TreemapLayoutWorker(key, self.scan_tree, self.root, self.width(),
+                                               self.height(), self.sizes)
+            self._worker.finished.connect(self.on_layout_ready)
+            self._worker.start()
+        self.update()
+
+    def on_layout_ready(self, key, layout):
+        if self.sender() is not self._worker:
+            return  # Superseded
+        self._worker = None
+        self._cache[key] = (layout, None)
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        if key == self._key():
+            self.rects = layout
+            self.pixmap = None
+            self.update()
+
+    # --- Painting ---
+
+    def _render(self):
+        """Paints every rectangle of the current layout once into a pixmap"""
+        layout = self.rects
+        tree = self.scan_tree
+        pixmap = QPixmap(self.size())
+        pixmap.fill(QColor(Theme.BACKGROUND))
+        painter = QPainter(pixmap)
+        folder_colors = [QColor(Theme.SURFACE).lighter(100 + 6 * (d % 8)) for d in range(8)]
+        file_colors = {key: QColor(color) for key, color in self.CATEGORY_COLORS.items()}
+        outline = QPen(QColor(Theme.BACKGROUND))
+        outline.setWidth(0)
+        painter.setPen(outline)
+
+        xs, ys, ws, hs = layout.x, layout.y, layout.w, layout.h
+        flags = tree.flags
+        for rect in range(len(layout)):
+            node = layout.node[rect]
+            if flags[node] & FLAG_DIR:
+                color = folder_colors[layout.depth[rect] % 8]
+            else:
+                color = file_colors[category_of(extension(tree.name(node)))]
+            area = QRectF(xs[rect], ys[rect], ws[rect], hs[rect])
+            if ws[rect] >= 3 and hs[rect] >= 3:
+                painter.setBrush(color)
+                painter.drawRect(area)
+            else:
+                painter.fillRect(area, color)
+        painter.end()
+        return pixmap
+
+    def _rect(self, index):
+        layout = self.rects
+        return QRectF(layout.x[index], layout.y[index], layout.w[index], layout.h[index])
+
+    def _selected_rect(self):
+        """Rectangle of the selected node, or of its nearest ancestor that was drawn"""
+        node = self.selected_node
+        tree = self.scan_tree
+        while node >= 0:
+            index = self.rects.rect_of.get(node)
+            if index is not None:
+                return index
+            node = tree.parent[node]
+        return -1
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.rects is None:
+            painter.fillRect(self.rect(), QColor(Theme.BACKGROUND))
+            painter.setPen(QColor(Theme.TEXT_SECONDARY))
+            text = "計算樹狀圖中..." if self.scan_tree is not None else "完成分析後顯示樹狀圖"
+            painter.drawText(self.rect(), Qt.AlignCenter, text)
+            return
+
+        if self.pixmap is None:
+            self.pixmap = self._render()
+            key = self._key()
+            if key in self._cache:
+                self._cache[key] = (self.rects, self.pixmap)
+        painter.drawPixmap(0, 0, self.pixmap)
+
+        selected = self._selected_rect()
+        if selected > 0:
+            pen = QPen(QColor(Theme.PRIMARY))
+            pen.setWidth(3)
+            painter.setPen(pen)
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRect(self._rect(selected).adjusted(1, 1, -1, -1))
+        if self.hover > 0:
+            painter.setPen(QPen(QColor("#ffffff")))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRect(self._rect(self.hover))
+
+    # --- Interaction ---
+
+    def _hit(self, pos):
+        if self.rects is None:
+            return -1
+        return self.rects.hit(pos.x(), pos.y())
+
+    def mouseMoveEvent(self, event):
+        index = self._hit(event.position())
+        if index == self.hover:
+            return
+        old = self.hover
+        self.hover = index
+        for rect in (old, index):
+            if rect > 0:
+                self.update(self._rect(rect).toAlignedRect().adjusted(-2, -2, 2, 2))
+        if index > 0:
+            node = self.rects.node[index]
+            tree = self.scan_tree
+            size = (self.sizes if self.sizes is not None else tree.size)[node]
+            QToolTip.showText(event.globalPosition().toPoint(),
+                              f"{tree.path(node)}\n{self.format_size(size)}", self)
+        else:
+            QToolTip.hideText()
+
+    def leaveEvent(self, event):
+        if self.hover > 0:
+            old = self.hover
+            self.hover = -1
+            self.update(self._rect(old).toAlignedRect().adjusted(-2, -2, 2, 2))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.zoom_out()
+            return
+        index = self._hit(event.position())
+        if index > 0:
+            self.selected_node = self.rects.node[index]
+            self.update()
+            self.node_selected.emit(self.selected_node)
+
+    def mouseDoubleClickEvent(self, event):
+        index = self._hit(event.position())
+        if index <= 0:
+            return
+        # Zoom into the clicked folder, or the folder of a clicked file
+        node = self.rects.node[index]
+        if not self.scan_tree.is_dir(node):
+            node = self.scan_tree.parent[node]
+        self.set_root(node)
+
+    def resizeEvent(self, event):
+        self.rects = None
+        self.pixmap = None
+        self._resize_timer.start()
@@ -1,7 +1,9 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QGraphicsDropShadowEffect, 
-                                 QDialog, QPushButton, QHBoxLayout)
-from PySide6.QtCore import Qt, QRectF, QPointF
-from PySide6.QtGui import QPainter, QPen, QColor, QFont, QPainterPath, QLinearGradient, QBrush
+                                 QDialog, QPushButton, QHBoxLayout, QComboBox, QStylePainter,
+                                 QStyleOptionComboBox, QStyle)
+from PySide6.QtCore import Qt, QRectF, QPointF, QEvent, Signal
+from PySide6.QtGui import (QPainter, QPen, QColor, QFont, QPainterPath, QLinearGradient, QBrush,
+                           QStandardItemModel, QStandardItem)
 from ui.theme import Theme
 import collections
 
@@ -159,6 +161,51 @@ class StatCard(QWidget):
         shadow.setOffset(0, 4)
         self.setGraphicsEffect(shadow)
 
+class CheckableComboBox(QComboBox):
+    """Drop-down list of check boxes; the popup stays open while items are toggled"""
+    checked_changed = Signal()
+    
+    def __init__(self, empty_text="", parent=None):
+        super().__init__(parent)
+        self.empty_text = empty_text
+        self.setModel(QStandardItemModel(self))
+        self.view().viewport().installEventFilter(self)
+        
+    def addItem(self, text, checked=False):
+        item = QStandardItem(text)
+        item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
+        item.setData(Qt.Checked if checked else Qt.Unchecked, Qt.CheckStateRole)
+        self.model().appendRow(item)
+        self.update()
+        
+    def set_checked(self, row, checked):
+        self.model().item(row).setData(Qt.Checked if checked else Qt.Unchecked, Qt.CheckStateRole)
+        self.update()
+        self.checked_changed.emit()
+        
+    def checked_items(self):
+        model = self.model()
+        return [model.item(row).text() for row in range(model.rowCount())
+                if model.item(row).data(Qt.CheckStateRole) == Qt.Checked]
+                
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.MouseButtonRelease:
+            index = self.view().indexAt(event.position().toPoint())
+            if index.isValid():
+                item = self.model().itemFromIndex(index)
+                self.set_checked(index.row(), item.data(Qt.CheckStateRole) != Qt.Checked)
+            return True  # Keep the popup open
+        return super().eventFilter(obj, event)
+        
+    def paintEvent(self, event):
+        # Show the checked items instead of the current one
+        painter = QStylePainter(self)
+        option = QStyleOptionComboBox()
+        self.initStyleOption(option)
+        option.currentText = ", ".join(self.checked_items()) or self.empty_text
+        painter.drawComplexControl(QStyle.CC_ComboBox, option)
+        painter.drawControl(QStyle.CE_ComboBoxLabel, option)
+
 class NetworkWaveform(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)